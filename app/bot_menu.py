@@ -0,0 +1,187 @@
+"""
+Синхронизация меню команд ботов
+
+Меню задается по областям видимости (BotCommandScope): в области по умолчанию
+меню пустое - неавторизованные пользователи его не видят, авторизованному
+пользователю команды устанавливаются в области его чата. Глобальная очистка
+перед каждой установкой больше не нужна.
+
+Для каждой пары (бот, область) хеш последнего примененного набора команд
+сохраняется в файл состояния (db/bot_menu.json): запрос к Telegram API
+выполняется, только если нужный набор отличается от примененного, поэтому
+повторные /start и перезапуски приложения меню не трогают. Запросы из
+обработчиков выполняются с задержкой debounce секунд: серия /start
+объединяется в один проход.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from logger import log_info, log_warning, log_error, log_debug
+
+# Команды меню авторизованного пользователя: (команда, описание)
+AUTHORIZED_COMMANDS: Tuple[Tuple[str, str], ...] = (
+    ("report", "📊 Сформировать отчет по сотруднику"),
+    ("filter", "🔍 Установить фильтр по фамилии"),
+    ("unfilter", "❌ Отключить фильтр"),
+    ("digest", "📬 Дайджест событий (секунды)"),
+    ("start", "🔄 Перезапуск бота"),
+)
+
+# Раньше меню ставилось в области по умолчанию и отдельно для этих языков:
+# при очистке области по умолчанию удаляются и они
+LEGACY_LANGUAGES = ('ru', 'en')
+
+# Через сколько секунд применяются запросы из обработчиков команд
+MENU_SYNC_DEBOUNCE = 2.0
+
+Commands = Sequence[Tuple[str, str]]
+
+
+def menu_hash(commands: Commands) -> str:
+    """Хеш набора команд (порядок важен: в таком порядке их показывает Telegram)"""
+    payload = json.dumps([list(command) for command in commands], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def scope_key(bot: Any, chat_id: Optional[int] = None) -> str:
+    """Ключ области в файле состояния: '<id бота>:default' или '<id бота>:chat:<id чата>'"""
+    # ID бота - часть токена до двоеточия (как в bot_pool.get_bot_id)
+    bot_id = bot.token.split(':', 1)[0]
+    return f"{bot_id}:default" if chat_id is None else f"{bot_id}:chat:{chat_id}"
+
+
+class BotMenuSync:
+    """Применяет меню ботов по областям, пропуская уже примененные наборы команд"""
+
+    def __init__(self, state_path: Optional[str] = None, debounce: float = MENU_SYNC_DEBOUNCE):
+        self.state_path = state_path
+        self.debounce = debounce
+        self.api_calls = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        # Файл состояния пишут обработчики команд и проверки запуска из разных потоков
+        self._save_lock = threading.Lock()
+        # Ключ области -> хеш примененного набора команд
+        self._applied: Dict[str, str] = {}
+        # Ключ области -> (бот, чат, команды, хеш), ожидающие применения
+        self._pending: Dict[str, Tuple[Any, Optional[int], Commands, str]] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._load_state()
+
+    def request(self, bot: Any, chat_id: Optional[int] = None,
+                commands: Commands = AUTHORIZED_COMMANDS) -> bool:
+        """
+        Отложенная синхронизация меню области (через debounce секунд, повторные
+        запросы объединяются). False - нужный набор уже применен.
+        """
+        key = scope_key(bot, chat_id)
+        digest = menu_hash(commands)
+        with self._lock:
+            if key not in self._pending and self._applied.get(key) == digest:
+                self.skipped += 1
+                return False
+            self._pending[key] = (bot, chat_id, tuple(commands), digest)
+            if self._timer is None:
+                self._timer = threading.Timer(self.debounce, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return True
+
+    def sync(self, bot: Any, chat_id: Optional[int] = None, commands: Commands = (),
+             force: bool = False) -> bool:
+        """
+        Немедленная синхронизация меню области; force - без сверки с сохраненным
+        хешем. True - выполнены запросы к API; исключение при ошибке API.
+        """
+        key = scope_key(bot, chat_id)
+        digest = menu_hash(commands)
+        with self._lock:
+            if not force and self._applied.get(key) == digest:
+                self.skipped += 1
+                return False
+        self._apply(bot, chat_id, commands)
+        with self._lock:
+            self._applied[key] = digest
+        self._save_state()
+        return True
+
+    def invalidate(self, bot: Any) -> None:
+        """Забывает примененные меню бота: при следующем запросе они будут установлены заново"""
+        prefix = scope_key(bot).split(':', 1)[0] + ':'
+        with self._lock:
+            self._applied = {key: digest for key, digest in self._applied.items() if not key.startswith(prefix)}
+        self._save_state()
+
+    def flush(self) -> None:
+        """Применяет все ожидающие запросы"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+        applied = 0
+        for key, (bot, chat_id, commands, digest) in pending.items():
+            with self._lock:
+                if self._applied.get(key) == digest:
+                    continue
+            try:
+                self._apply(bot, chat_id, commands)
+            except Exception as e:
+                log_error(f"❌ Ошибка установки меню ({key}): {e}", module='Telegram')
+                continue
+            with self._lock:
+                self._applied[key] = digest
+            applied += 1
+        if applied:
+            self._save_state()
+            log_info("✅ Меню команд обновлено: областей %d", applied, module='Telegram')
+
+    def _apply(self, bot: Any, chat_id: Optional[int], commands: Commands) -> None:
+        from telebot.types import BotCommand, BotCommandScopeChat, BotCommandScopeDefault
+
+        if chat_id is None:
+            scope = BotCommandScopeDefault()
+            languages = (None,) + LEGACY_LANGUAGES
+        else:
+            scope = BotCommandScopeChat(chat_id)
+            languages = (None,)
+        for language_code in languages:
+            if commands:
+                bot.set_my_commands([BotCommand(command, description) for command, description in commands],
+                                    scope=scope, language_code=language_code)
+            else:
+                bot.delete_my_commands(scope=scope, language_code=language_code)
+            with self._lock:
+                self.api_calls += 1
+        log_debug("Меню %s: %d команд", scope_key(bot, chat_id), len(commands), module='Telegram')
+
+    def _load_state(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self._applied = {key: str(digest) for key, digest in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            log_warning(f"Не удалось прочитать состояние меню {self.state_path}: {e}", module='Telegram')
+            self._applied = {}
+
+    def _save_state(self) -> None:
+        if not self.state_path:
+            return
+        with self._save_lock:
+            with self._lock:
+                state = dict(self._applied)
+            try:
+                tmp_path = self.state_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.state_path)
+            except OSError as e:
+                log_warning(f"Не удалось сохранить состояние меню: {e}", module='Telegram')
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {'scopes': len(self._applied), 'pending': len(self._pending),
+                    'api_calls': self.api_calls, 'skipped': self.skipped}
@@ -0,0 +1,220 @@
+"""
+Пул ботов: распределение пользователей между несколькими токенами Telegram
+
+Лимит Telegram на исходящие сообщения действует для каждого бота отдельно,
+поэтому пользователи распределяются между ботами консистентным хешированием.
+У каждого бота свой пул соединений, свой ограничитель частоты и свои очереди
+доставки. При изменении списка токенов переезжает только часть пользователей.
+
+Бот не может написать первым пользователю, который его не открывал (403),
+поэтому пользователь переезжает на бот кольца только после /start в нем;
+до этого сообщения отправляет бот, через который он обращался.
+"""
+
+import bisect
+import hashlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import telebot
+
+from logger import log_info, log_warning, log_error
+from telegram_client import TelegramClientRunner, RateLimiter, create_telegram_client
+from delivery import DeliveryService
+
+# Количество виртуальных узлов каждого бота на кольце
+VIRTUAL_NODES = 100
+
+
+def get_bot_id(token: str) -> str:
+    """ID бота - часть токена до двоеточия"""
+    return token.split(':', 1)[0]
+
+
+class ConsistentHashRing:
+    """Кольцо консистентного хеширования с виртуальными узлами"""
+
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int = VIRTUAL_NODES):
+        self._hashes: List[int] = []
+        self._nodes: List[str] = []
+        points = []
+        for node in nodes:
+            for replica in range(virtual_nodes):
+                points.append((self._hash(f"{node}#{replica}"), node))
+        points.sort()
+        for point, node in points:
+            self._hashes.append(point)
+            self._nodes.append(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def get_node(self, key: Any) -> str:
+        """Узел, отвечающий за ключ (первая точка кольца по часовой стрелке)"""
+        if not self._hashes:
+            raise RuntimeError("Кольцо хеширования пустое")
+        index = bisect.bisect(self._hashes, self._hash(str(key))) % len(self._hashes)
+        return self._nodes[index]
+
+
+class BotInstance:
+    """Один бот пула: TeleBot для команд, клиент и очереди доставки"""
+
+    def __init__(self, token: str, runner: TelegramClientRunner, delivery: DeliveryService):
+        self.token = token
+        self.bot_id = get_bot_id(token)
+        # Обработчики выполняет UpdateDispatcher, собственный пул потоков telebot не нужен
+        self.bot = telebot.TeleBot(token, threaded=False)
+        self.runner = runner
+        self.delivery = delivery
+        self.username: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return f"@{self.username}" if self.username else self.bot_id
+
+
+class BotPool:
+    """Несколько ботов с интерфейсом DeliveryService (submit/stop/get_metrics)"""
+
+    def __init__(self, tokens: List[str], client_settings: Dict[str, int], delivery_settings: Dict[str, int],
+                 on_failure: Optional[Callable[[int, Exception], None]] = None,
+                 on_recovery: Optional[Callable[[int], None]] = None):
+        if not tokens:
+            raise ValueError("Не задан ни один токен бота")
+        self.tokens = tokens
+        self.client_settings = client_settings
+        self.delivery_settings = delivery_settings
+        self.on_failure = on_failure
+        self.on_recovery = on_recovery
+        self.instances: List[BotInstance] = []
+        self._by_id: Dict[str, BotInstance] = {}
+        self.ring = ConsistentHashRing(get_bot_id(token) for token in tokens)
+        self.user_manager = None
+        self._assignments: Dict[int, str] = {}
+
+    @property
+    def primary(self) -> BotInstance:
+        return self.instances[0]
+
+    def start(self) -> None:
+        """Запускает клиент и очереди доставки для каждого токена"""
+        for token in self.tokens:
+            runner = create_telegram_client(token, self.client_settings)
+            delivery = DeliveryService(
+                runner,
+                shard_count=self.delivery_settings['shards'],
+                max_in_flight=self.delivery_settings['max_in_flight_per_shard'],
+                max_retries=self.delivery_settings['max_retries'],
+                send_timeout=self.delivery_settings['send_timeout'],
+                on_failure=self.on_failure,
+                on_recovery=self.on_recovery,
+                rate_limiter=RateLimiter(self.delivery_settings['rate_limit_per_bot'])
+            )
+            delivery.start()
+            instance = BotInstance(token, runner, delivery)
+            try:
+                me = runner.submit(runner.client.get_me()).result(timeout=runner.client.read_timeout)
+                instance.username = me.get('username')
+            except Exception as e:
+                log_warning(f"Не удалось получить имя бота {instance.bot_id}: {e}", module='BotPool')
+            self.instances.append(instance)
+            self._by_id[instance.bot_id] = instance
+        log_info(f"🤖 Пул ботов запущен: {', '.join(i.label for i in self.instances)}", module='BotPool')
+
+    def stop(self) -> None:
+        """Дожидается отправки очередей всех ботов и закрывает их клиенты"""
+        for instance in self.instances:
+            instance.delivery.stop()
+        for instance in self.instances:
+            instance.runner.stop()
+
+    def attach_user_manager(self, user_manager: Any) -> None:
+        """Загружает привязку пользователей к ботам и перераспределяет их при смене токенов"""
+        self.user_manager = user_manager
+        self._assignments = user_manager.get_bot_assignments()
+        self.rebalance(user_manager.get_authorized_users())
+
+    def rebalance(self, user_ids: Iterable[int]) -> List[Tuple[int, Optional[BotInstance], BotInstance]]:
+        """
+        Предлагает пользователям перейти на бота, выбранного кольцом хеширования.
+        Привязка меняется только после /start в новом боте (assign), кроме случая,
+        когда прежний бот удален из конфигурации.
+        """
+        moved = []
+        for user_id in user_ids:
+            # Без сохраненной привязки пользователь работал с основным ботом
+            current_id = self._assignments.get(user_id, self.primary.bot_id)
+            target = self.target_for(user_id)
+            if current_id == target.bot_id:
+                if user_id not in self._assignments:
+                    self._store_assignment(user_id, target.bot_id)
+                continue
+            old = self._by_id.get(current_id)
+            moved.append((user_id, old, target))
+            if old:
+                # Новый бот не может писать первым: до /start в нем сообщения отправляет прежний
+                old.delivery.submit(user_id, (
+                    f"ℹ️ Уведомления о событиях УРВ теперь отправляет бот {target.label}.\n"
+                    f"Откройте его и отправьте команду /start."
+                ))
+            else:
+                self._store_assignment(user_id, target.bot_id)
+                log_warning(f"Бот {current_id} пользователя {user_id} удален из конфигурации, "
+                            f"уведомить о переносе на {target.label} невозможно", module='BotPool')
+        if moved:
+            log_info(f"🔀 Пользователей к переносу на другой бот: {len(moved)}", module='BotPool')
+        return moved
+
+    def _store_assignment(self, user_id: int, bot_id: str) -> None:
+        self._assignments[user_id] = bot_id
+        if self.user_manager:
+            self.user_manager.set_bot_assignment(user_id, bot_id)
+
+    def target_for(self, user_id: int) -> BotInstance:
+        """Бот, которому пользователь принадлежит по кольцу хеширования"""
+        return self._by_id[self.ring.get_node(user_id)]
+
+    def bot_for(self, chat_id: int) -> BotInstance:
+        """Бот, через который отправляются сообщения в чат"""
+        bot_id = self._assignments.get(chat_id)
+        # Чаты без привязки (например, администраторы) обслуживает основной бот
+        return self._by_id.get(bot_id, self.primary) if bot_id else self.primary
+
+    def pin(self, user_id: int, bot_id: str) -> None:
+        """Закрепляет пользователя за ботом, которому он писал (бот может ему отвечать)"""
+        if bot_id in self._by_id and self._assignments.get(user_id) != bot_id:
+            self._store_assignment(user_id, bot_id)
+
+    def assign(self, user_id: int) -> BotInstance:
+        """Закрепляет пользователя за ботом по кольцу хеширования (после /start в этом боте)"""
+        target = self.target_for(user_id)
+        if self._assignments.get(user_id) != target.bot_id:
+            self._store_assignment(user_id, target.bot_id)
+        return target
+
+    def submit(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        """Ставит сообщение в очередь бота, закрепленного за чатом"""
+        self.bot_for(chat_id).delivery.submit(chat_id, text, **kwargs)
+
+    def mark_failing(self, chat_ids) -> None:
+        """Отмечает чаты с ошибками доставки в очередях их ботов"""
+        grouped: Dict[str, set] = {}
+        for chat_id in chat_ids:
+            grouped.setdefault(self.bot_for(chat_id).bot_id, set()).add(chat_id)
+        for bot_id, ids in grouped.items():
+            self._by_id[bot_id].delivery.mark_failing(ids)
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """Метрики шардов всех ботов с меткой бота"""
+        metrics = []
+        for instance in self.instances:
+            try:
+                shard_metrics = instance.delivery.get_metrics()
+            except Exception as e:
+                log_error(f"Ошибка получения метрик бота {instance.label}: {e}", module='BotPool')
+                continue
+            for m in shard_metrics:
+                m['bot'] = instance.label
+                metrics.append(m)
+        return metrics
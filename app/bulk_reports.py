@@ -0,0 +1,179 @@
+"""
+Пакетное формирование отчетов по всем сотрудникам или по префиксу фамилии
+
+События читаются одним упорядоченным проходом по таблице events
+(ORDER BY employee_name, event_timestamp), отчеты формируются параллельно
+в ProcessPoolExecutor и складываются в один zip в порядке фамилий.
+В работе одновременно не больше workers * 2 групп сотрудников, поэтому
+память не растет с числом сотрудников.
+
+Запуск из командной строки (из каталога проекта):
+    python app/bulk_reports.py 30 [префикс] [-o отчеты.zip] [--workers 4]
+"""
+
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, BinaryIO, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from logger import log_info, log_error
+from report_generator import generate_html_report, get_report_filename
+from shift_pairing import ShiftRules, to_datetime
+
+# Период: число дней или месяцы (1m, 3м)
+PERIOD_PATTERN = re.compile(r'^(\d+)\s*([mм]?)$', re.I)
+MAX_PERIOD_DAYS = 366
+
+# Сотрудников в одном задании пула: отчет строится за миллисекунды,
+# поэтому задания укрупняются, чтобы не упираться в передачу между процессами
+BATCH_SIZE = 16
+
+# Прогресс: (готово, всего)
+ProgressCallback = Callable[[int, int], None]
+
+
+def parse_period(text: str) -> Optional[int]:
+    """Период отчета в днях: '30', '90', '1m', '6м'; None при ошибке"""
+    match = PERIOD_PATTERN.match(text.strip())
+    if not match:
+        return None
+    days = int(match.group(1)) * (30 if match.group(2) else 1)
+    if not 1 <= days <= MAX_PERIOD_DAYS:
+        return None
+    return days
+
+
+def render_employee_report(employee_name: str, events: List[Dict[str, Any]], days: int,
+                           rules: Optional[ShiftRules]) -> Tuple[str, str]:
+    """Отчет одного сотрудника: (имя файла, html)"""
+    html_content = generate_html_report(events, employee_name, days, rules)
+    date_to = to_datetime(events[-1]['event_timestamp']).date()
+    return get_report_filename(employee_name, days, date_to), html_content
+
+
+def render_batch(batch: List[Tuple[str, List[Dict[str, Any]]]], days: int,
+                 rules: Optional[ShiftRules]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Отчеты группы сотрудников (выполняется в процессе пула): (сотрудник, имя файла, html или ошибка)"""
+    results = []
+    for employee_name, events in batch:
+        try:
+            filename, html_content = render_employee_report(employee_name, events, days, rules)
+            results.append((employee_name, filename, html_content))
+        except Exception as e:
+            results.append((employee_name, None, str(e)))
+    return results
+
+
+def get_bulk_filename(days: int, name_prefix: str = '', date_to: Optional[date] = None) -> str:
+    """Имя архива пакетного отчета"""
+    date_str = (date_to or date.today()).strftime('%Y-%m-%d')
+    suffix = f" {name_prefix}" if name_prefix else ''
+    return f"{date_str} отчеты УРВ{suffix} {days} дней.zip"
+
+
+def build_bulk_reports(events_db, days: int, output: Union[str, BinaryIO], name_prefix: str = '',
+                       workers: Optional[int] = None, rules: Optional[ShiftRules] = None,
+                       progress: Optional[ProgressCallback] = None,
+                       progress_interval: float = 2.0) -> Dict[str, Any]:
+    """
+    Формирует отчеты по всем сотрудникам с событиями за период в один zip (путь или файловый объект).
+    progress вызывается не чаще раза в progress_interval секунд и в конце.
+    Возвращает статистику: employees, reports, errors, elapsed.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = events_db.count_employees_in_period(days, name_prefix)
+    started = time.monotonic()
+    done = errors = 0
+    last_progress = 0.0
+
+    def report_progress(force: bool = False) -> None:
+        nonlocal last_progress
+        now = time.monotonic()
+        if progress and (force or now - last_progress >= progress_interval):
+            last_progress = now
+            progress(done, total)
+
+    # spawn: пул не наследует потоки и соединения бота
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor, \
+            zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        pending: Deque[Any] = deque()
+        batch: List[Tuple[str, List[Dict[str, Any]]]] = []
+
+        def write_oldest() -> None:
+            nonlocal done, errors
+            for employee_name, filename, content in pending.popleft().result():
+                if filename is None:
+                    errors += 1
+                    log_error(f"Ошибка отчета по сотруднику {employee_name}: {content}", module='BulkReports')
+                else:
+                    archive.writestr(filename, content)
+                done += 1
+            report_progress()
+
+        report_progress(force=True)
+        for employee in events_db.iter_events_grouped_by_employee(days, name_prefix):
+            batch.append(employee)
+            if len(batch) < BATCH_SIZE:
+                continue
+            pending.append(executor.submit(render_batch, batch, days, rules))
+            batch = []
+            # Ограниченное окно: архив пишется в порядке фамилий, память не растет
+            while len(pending) >= workers * 2:
+                write_oldest()
+        if batch:
+            pending.append(executor.submit(render_batch, batch, days, rules))
+        while pending:
+            write_oldest()
+
+    total = done
+    report_progress(force=True)
+    elapsed = time.monotonic() - started
+    log_info(f"📦 Пакетный отчет за {days} дней: {done - errors} сотрудников за {elapsed:.1f} сек "
+             f"({workers} процессов, ошибок: {errors})", module='BulkReports')
+    return {'employees': done, 'reports': done - errors, 'errors': errors, 'elapsed': elapsed}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Командная строка: отчеты по всем сотрудникам в zip"""
+    import argparse
+    from config import get_events_database_path, get_report_settings, get_shift_pairing_settings
+    from events_database import EventsDatabaseManager
+
+    parser = argparse.ArgumentParser(description='Пакетное формирование отчетов УРВ в zip')
+    parser.add_argument('period', help='период: число дней (30, 90, 180) или месяцы (1m, 3m, 6m)')
+    parser.add_argument('prefix', nargs='?', default='', help='начало фамилии (например, отдел по префиксу)')
+    parser.add_argument('-o', '--output', help='путь к zip (по умолчанию - имя по дате и периоду)')
+    parser.add_argument('--workers', type=int, default=None, help='количество процессов')
+    args = parser.parse_args(argv)
+
+    days = parse_period(args.period)
+    if days is None:
+        print(f"❌ Неверный период '{args.period}'")
+        return 2
+
+    events_db = EventsDatabaseManager(get_events_database_path())
+    shift_settings = get_shift_pairing_settings()
+    rules = ShiftRules(incomplete_grace_days=shift_settings['incomplete_grace_days'],
+                       max_shift_hours=shift_settings['max_shift_hours'] or None)
+    output = args.output or get_bulk_filename(days, args.prefix)
+
+    def print_progress(done: int, total: int) -> None:
+        print(f"\r⏳ Отчеты: {done}/{total}", end='', flush=True)
+
+    stats = build_bulk_reports(events_db, days, output, args.prefix,
+                               workers=args.workers or get_report_settings()['bulk_workers'],
+                               rules=rules, progress=print_progress)
+    print()
+    print(f"✅ {stats['reports']} отчетов за {stats['elapsed']:.1f} сек -> {output}")
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,50 @@
+"""
+Настройки из config.ini
+
+Файл разбирается один раз в неизменяемый снимок (Settings). Каждый геттер
+get_*() проверяет свои значения при первом обращении к снимку и дальше
+возвращает готовый результат: словари - только для чтения, списки - кортежи.
+
+reload_settings() перечитывает файл, если изменилось время его изменения:
+новый снимок заранее проверяется всеми уже использованными геттерами и
+заменяет прежний целиком; при ошибке действуют прежние настройки.
+Подписчики add_reload_listener() получают (прежний, новый) снимок.
+Файл проверяет поток ConfigWatcher раз в RELOAD_CHECK_SECONDS секунд.
+"""
+
 import os
 import configparser
+import functools
+import threading
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional
 
-def get_config():
-    """Получение конфигурации из config.ini"""
-    config = configparser.ConfigParser()
-    config_path = Path(__file__).parent.parent / 'config.ini'
-    
-    if not config_path.exists():
+CONFIG_PATH = Path(__file__).parent.parent / 'config.ini'
+
+# Период проверки времени изменения config.ini
+RELOAD_CHECK_SECONDS = 5
+
+
+def _freeze(value: Any) -> Any:
+    """Значение настройки только для чтения (общий снимок используют все потоки)"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _file_mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read_config(path: Path) -> configparser.ConfigParser:
+    """Разбор config.ini (utf-8, BOM от Блокнота Windows допускается)"""
+    if not path.exists():
         raise RuntimeError(
             'Файл config.ini не найден!\n'
             'Создайте файл config.ini в корне проекта со следующим содержимым:\n'
@@ -31,51 +68,150 @@ def get_config():
             'user_filters_file = db/user_filters.txt'
         )
     
+    config = configparser.ConfigParser()
     try:
-        # Пробуем прочитать с автоматическим определением кодировки
-        config.read(config_path, encoding='utf-8')
-        print("[DEBUG] Успешно прочитано config.ini с utf-8")
+        config.read(path, encoding='utf-8-sig')
+    except (UnicodeDecodeError, configparser.Error) as e:
+        raise RuntimeError(f"Не удалось прочитать config.ini: {e}")
+    return config
+
+
+class Settings:
+    """Неизменяемый снимок config.ini: разобранный файл и проверенные значения геттеров"""
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or CONFIG_PATH
+        # Время изменения берется до чтения: запись во время чтения вызовет повторную загрузку
+        self.mtime = _file_mtime(self.path)
+        self.parser = _read_config(self.path)
+        self._values: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+    
+    def value(self, name: str) -> Any:
+        """Значение геттера name для этого снимка (проверка - при первом обращении)"""
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        previous = getattr(_evaluating, 'settings', None)
+        _evaluating.settings = self
+        try:
+            value = _freeze(_SETTING_GETTERS[name]())
+        finally:
+            _evaluating.settings = previous
+        with self._lock:
+            return self._values.setdefault(name, value)
+    
+    def used(self) -> List[str]:
+        """Геттеры, к которым уже обращались"""
+        return list(self._values)
+
+
+# Снимок, который проверяет текущий поток (вложенные геттеры читают тот же снимок)
+_evaluating = threading.local()
+
+# Геттеры настроек по имени: исходные функции проверки
+_SETTING_GETTERS: Dict[str, Callable[[], Any]] = {}
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+_reload_listeners: List[Callable[[Settings, Settings], None]] = []
+_failed_mtime: Optional[int] = None
+
+
+def setting(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Геттер настройки: значение вычисляется один раз на снимок config.ini"""
+    _SETTING_GETTERS[func.__name__] = func
+    
+    @functools.wraps(func)
+    def getter():
+        settings = getattr(_evaluating, 'settings', None) or current_settings()
+        return settings.value(func.__name__)
+    return getter
+
+
+def current_settings() -> Settings:
+    """Текущий снимок настроек (файл читается при первом обращении)"""
+    global _settings
+    settings = _settings
+    if settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings()
+            settings = _settings
+    return settings
+
+
+def get_config() -> configparser.ConfigParser:
+    """Разобранный config.ini текущего снимка (только для чтения)"""
+    settings = getattr(_evaluating, 'settings', None) or current_settings()
+    return settings.parser
+
+
+def add_reload_listener(listener: Callable[[Settings, Settings], None]) -> None:
+    """Подписка на замену снимка: listener(прежний, новый) после перечитывания файла"""
+    _reload_listeners.append(listener)
+
+
+def reload_settings(force: bool = False) -> bool:
+    """Перечитывает config.ini, если файл изменился; True - настройки заменены"""
+    global _settings, _failed_mtime
+    old = current_settings()
+    mtime = _file_mtime(old.path)
+    if not force and (mtime == old.mtime or mtime == _failed_mtime):
+        return False
+    try:
+        new = Settings(old.path)
+        # Новый снимок проверяется всеми используемыми геттерами до замены
+        for name in old.used():
+            new.value(name)
     except Exception as e:
-        print(f"[DEBUG] Ошибка чтения config.ini с utf-8: {e}")
+        _failed_mtime = mtime
+        print(f"⚠️  Ошибка в config.ini, действуют прежние настройки: {e}")
+        return False
+    with _settings_lock:
+        _settings = new
+    _failed_mtime = None
+    for listener in list(_reload_listeners):
         try:
-            # Если не получилось, пробуем с utf-8-sig (автоматически убирает BOM)
-            config.read(config_path, encoding='utf-8-sig')
-            print("[DEBUG] Успешно прочитано с utf-8-sig")
-        except Exception as e2:
-            print(f"[DEBUG] Ошибка чтения config.ini с utf-8-sig: {e2}")
-            # Если и это не помогло, читаем как bytes и декодируем вручную
+            listener(old, new)
+        except Exception as e:
+            print(f"⚠️  Ошибка применения новых настроек: {e}")
+    return True
+
+
+def changed_settings(old: Settings, new: Settings) -> List[str]:
+    """Геттеры, значения которых различаются в двух снимках"""
+    return [name for name in old.used() if old.value(name) != new.value(name)]
+
+
+class ConfigWatcher:
+    """Фоновая проверка изменений config.ini (одно обращение к stat за период)"""
+    
+    def __init__(self, interval: float = RELOAD_CHECK_SECONDS):
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='ConfigWatcher', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+    
+    def _loop(self) -> None:
+        while not self._stop_event.wait(self.interval):
             try:
-                with open(config_path, 'rb') as f:
-                    content = f.read()
-                    print(f"[DEBUG] Прочитано {len(content)} байт из config.ini")
-                    
-                    # Убираем BOM если есть
-                    if content.startswith(b'\xef\xbb\xbf'):
-                        print("[DEBUG] Обнаружен BOM, убираем...")
-                        content = content[3:]
-                    
-                    # Декодируем как UTF-8
-                    content_str = content.decode('utf-8')
-                    print(f"[DEBUG] Декодировано в строку длиной {len(content_str)}")
-                    
-                    # Создаем временный файл для configparser
-                    import tempfile
-                    with tempfile.NamedTemporaryFile(mode='w', suffix='.ini', delete=False, encoding='utf-8') as temp_file:
-                        temp_file.write(content_str)
-                        temp_file.flush()
-                        print(f"[DEBUG] Создан временный файл: {temp_file.name}")
-                        config.read(temp_file.name, encoding='utf-8')
-                        print("[DEBUG] Успешно прочитано из временного файла")
-                        # Удаляем временный файл
-                        import os
-                        os.unlink(temp_file.name)
-                        print("[DEBUG] Временный файл удален")
-            except Exception as e3:
-                print(f"[DEBUG] Критическая ошибка при обработке config.ini: {e3}")
-                raise RuntimeError(f"Не удалось прочитать config.ini: {e3}")
-    
-    return config
+                reload_settings()
+            except Exception as e:
+                print(f"⚠️  Ошибка проверки config.ini: {e}")
 
+@setting
 def get_telegram_token():
     config = get_config()
     
@@ -97,6 +233,30 @@ def get_telegram_token():
     
     return token
 
+@setting
+def get_telegram_tokens():
+    """Получение списка токенов ботов (первый токен - основной бот)"""
+    config = get_config()
+    
+    tokens_str = config.get('Telegram', 'bot_tokens', fallback='') if 'Telegram' in config else ''
+    tokens = []
+    for token in tokens_str.split(','):
+        token = token.strip()
+        if not token:
+            continue
+        if ':' not in token:
+            print(f"⚠️  Неверный формат токена в bot_tokens: '{token[:10]}...'. Токен пропущен.")
+            continue
+        if token not in tokens:
+            tokens.append(token)
+    
+    if not tokens:
+        # Один бот из bot_token
+        return [get_telegram_token()]
+    
+    return tokens
+
+@setting
 def get_admin_ids():
     """Получение списка ID администраторов"""
     config = get_config()
@@ -122,6 +282,7 @@ def get_admin_ids():
         print(f"⚠️  Ошибка парсинга ID администраторов: {e}")
         return []
 
+@setting
 def get_users_database_path():
     """Получение пути к базе данных пользователей"""
     config = get_config()
@@ -138,6 +299,7 @@ def get_users_database_path():
     
     return db_path
 
+@setting
 def get_events_database_path():
     """Получение пути к базе данных событий"""
     config = get_config()
@@ -154,6 +316,7 @@ def get_events_database_path():
     
     return db_path
 
+@setting
 def get_events_retention_days():
     """Получение количества дней для хранения событий"""
     config = get_config()
@@ -172,6 +335,7 @@ def get_events_retention_days():
         print(f"⚠️  Неверный формат количества дней. Используется 180.")
         return 180
 
+@setting
 def get_cleanup_enabled():
     """Получение настройки включения автоматической очистки"""
     config = get_config()
@@ -186,6 +350,7 @@ def get_cleanup_enabled():
         print(f"⚠️  Неверный формат настройки cleanup_enabled. Используется True.")
         return True
 
+@setting
 def get_cleanup_time():
     """Получение времени запуска очистки"""
     config = get_config()
@@ -204,11 +369,56 @@ def get_cleanup_time():
     
     return cleanup_time
 
+@setting
+def get_scheduler_settings():
+    """Получение настроек планировщика фоновых задач"""
+    config = get_config()
+    
+    settings = {
+        'vacuum_schedule': 'sun 03:30',
+        'aggregates_schedule': '04:30',
+        'jitter_seconds': 60,
+        'catch_up': True
+    }
+    
+    if 'Scheduler' not in config:
+        return settings
+    
+    # Расписание проверяется тем же разбором, что и в планировщике; пустое значение отключает задачу
+    from scheduler import Schedule
+    for key in ('vacuum_schedule', 'aggregates_schedule'):
+        spec = config.get('Scheduler', key, fallback=settings[key]).strip()
+        if spec:
+            try:
+                Schedule(spec)
+            except ValueError as e:
+                print(f"⚠️  {e}. Используется {settings[key]}.")
+                spec = settings[key]
+        settings[key] = spec
+    
+    try:
+        jitter = config.getint('Scheduler', 'jitter_seconds', fallback=60)
+        if jitter < 0:
+            print(f"⚠️  Неверное значение jitter_seconds = '{jitter}'. Используется 60.")
+            jitter = 60
+        settings['jitter_seconds'] = jitter
+    except ValueError:
+        print(f"⚠️  Неверный формат jitter_seconds. Используется 60.")
+    
+    try:
+        settings['catch_up'] = config.getboolean('Scheduler', 'catch_up', fallback=True)
+    except ValueError:
+        print(f"⚠️  Неверный формат настройки catch_up. Используется True.")
+    
+    return settings
+
 # Для обратной совместимости
+@setting
 def get_database_path():
     """Получение пути к базе данных пользователей (обратная совместимость)"""
     return get_users_database_path()
 
+@setting
 def get_authorized_users_file():
     config = get_config()
     
@@ -223,6 +433,7 @@ def get_authorized_users_file():
     
     return config.get('Paths', 'authorized_users_file', fallback='db/authorized_users.txt')
 
+@setting
 def get_user_filters_file():
     config = get_config()
     
@@ -237,6 +448,7 @@ def get_user_filters_file():
     
     return config.get('Paths', 'user_filters_file', fallback='db/user_filters.txt')
 
+@setting
 def get_logging_level():
     config = get_config()
     
@@ -254,6 +466,7 @@ def get_logging_level():
     
     return level
 
+@setting
 def get_logging_backup_logs_count():
     """Получение количества дней для хранения логов"""
     config = get_config()
@@ -270,4 +483,359 @@ def get_logging_backup_logs_count():
         return backup_logs_count
     except ValueError:
         print(f"⚠️  Неверный формат количества дней. Используется 5.")
-        return 5 
\ No newline at end of file
+        return 5
+
+@setting
+def get_logging_queue_settings():
+    """Получение настроек очереди логов (запись в файл и консоль в отдельном потоке)"""
+    config = get_config()
+    
+    settings = {
+        'queue_size': 10000,
+        'queue_policy': 'drop'
+    }
+    
+    if 'Logging' not in config:
+        return settings
+    
+    try:
+        queue_size = config.getint('Logging', 'queue_size', fallback=10000)
+        if queue_size < 1:
+            print(f"⚠️  Неверное значение queue_size = '{queue_size}'. Используется 10000.")
+            queue_size = 10000
+        settings['queue_size'] = queue_size
+    except ValueError:
+        print(f"⚠️  Неверный формат queue_size. Используется 10000.")
+    
+    queue_policy = config.get('Logging', 'queue_policy', fallback='drop').strip().lower()
+    if queue_policy not in ('drop', 'block'):
+        print(f"⚠️  Неверное значение queue_policy '{queue_policy}'. Используется drop.")
+        queue_policy = 'drop'
+    settings['queue_policy'] = queue_policy
+    
+    return settings
+
+@setting
+def get_logging_rotation_settings():
+    """Получение настроек ротации файлов логов (в полночь и по размеру) и хранения сжатых частей"""
+    config = get_config()
+    
+    defaults = {
+        'max_file_size_mb': 50,
+        'max_files': 30,
+        'max_total_size_mb': 500
+    }
+    settings = dict(defaults)
+    settings['compress'] = True
+    
+    if 'Logging' not in config:
+        return settings
+    
+    for key, default in defaults.items():
+        try:
+            value = config.getint('Logging', key, fallback=default)
+            if value < 0:
+                print(f"⚠️  Неверное значение {key} = '{value}'. Используется {default}.")
+                value = default
+            settings[key] = value
+        except ValueError:
+            print(f"⚠️  Неверный формат {key}. Используется {default}.")
+    
+    try:
+        settings['compress'] = config.getboolean('Logging', 'compress', fallback=True)
+    except ValueError:
+        print(f"⚠️  Неверное значение compress. Используется true.")
+    
+    return settings
+
+@setting
+def get_logging_format_settings():
+    """
+    Получение формата файла логов и выборки массовых записей по категориям
+    (ingest - прием событий, delivery - отправка, filter - фильтры пользователей)
+    """
+    from logger import LOG_CATEGORIES
+    config = get_config()
+    
+    settings = {
+        'log_format': 'text',
+        'sampling': {category: 1.0 for category in LOG_CATEGORIES},
+        'rate_limits': {category: 0 for category in LOG_CATEGORIES}
+    }
+    
+    if 'Logging' not in config:
+        return settings
+    
+    log_format = config.get('Logging', 'format', fallback='text').strip().lower()
+    if log_format not in ('text', 'json'):
+        print(f"⚠️  Неверное значение format '{log_format}'. Используется text.")
+        log_format = 'text'
+    settings['log_format'] = log_format
+    
+    for category in LOG_CATEGORIES:
+        key = f'sample_{category}'
+        try:
+            rate = config.getfloat('Logging', key, fallback=1.0)
+            if not 0.0 <= rate <= 1.0:
+                print(f"⚠️  Неверное значение {key} = '{rate}'. Используется 1.0.")
+                rate = 1.0
+            settings['sampling'][category] = rate
+        except ValueError:
+            print(f"⚠️  Неверный формат {key}. Используется 1.0.")
+        
+        key = f'rate_limit_{category}'
+        try:
+            limit = config.getint('Logging', key, fallback=0)
+            if limit < 0:
+                print(f"⚠️  Неверное значение {key} = '{limit}'. Используется 0.")
+                limit = 0
+            settings['rate_limits'][category] = limit
+        except ValueError:
+            print(f"⚠️  Неверный формат {key}. Используется 0.")
+    
+    return settings
+
+@setting
+def get_telegram_client_settings():
+    """Получение настроек пула соединений Telegram клиента"""
+    config = get_config()
+    
+    defaults = {
+        'connection_limit': 100,
+        'connect_timeout': 10,
+        'read_timeout': 30,
+        'keepalive_timeout': 60,
+        'polling_timeout': 25
+    }
+    
+    if 'TelegramClient' not in config:
+        return dict(defaults)
+    
+    settings = {}
+    for key, default in defaults.items():
+        try:
+            value = config.getint('TelegramClient', key, fallback=default)
+            if value < 1:
+                print(f"⚠️  Неверное значение {key} = '{value}'. Используется {default}.")
+                value = default
+        except ValueError:
+            print(f"⚠️  Неверный формат {key}. Используется {default}.")
+            value = default
+        settings[key] = value
+    
+    return settings
+
+@setting
+def get_delivery_settings():
+    """Получение настроек очередей доставки сообщений"""
+    config = get_config()
+    
+    defaults = {
+        'shards': 4,
+        'max_in_flight_per_shard': 8,
+        'max_retries': 5,
+        'send_timeout': 30,
+        'suspend_after_failures': 3,
+        'rate_limit_per_bot': 25
+    }
+    
+    if 'Delivery' not in config:
+        return dict(defaults)
+    
+    settings = {}
+    for key, default in defaults.items():
+        try:
+            value = config.getint('Delivery', key, fallback=default)
+            if value < 1:
+                print(f"⚠️  Неверное значение {key} = '{value}'. Используется {default}.")
+                value = default
+        except ValueError:
+            print(f"⚠️  Неверный формат {key}. Используется {default}.")
+            value = default
+        settings[key] = value
+    
+    return settings
+
+@setting
+def get_webhook_settings():
+    """Получение настроек приема обновлений через webhook"""
+    config = get_config()
+    
+    settings = {
+        'enabled': False,
+        'url': '',
+        'listen_host': '127.0.0.1',
+        'listen_port': 8443,
+        'path': '/telegram',
+        'secret_token': ''
+    }
+    
+    if 'Webhook' not in config:
+        return settings
+    
+    try:
+        settings['enabled'] = config.getboolean('Webhook', 'enabled', fallback=False)
+    except ValueError:
+        print(f"⚠️  Неверный формат настройки enabled в [Webhook]. Используется long polling.")
+    
+    settings['url'] = config.get('Webhook', 'url', fallback='').strip().rstrip('/')
+    settings['listen_host'] = config.get('Webhook', 'listen_host', fallback='127.0.0.1').strip()
+    settings['path'] = config.get('Webhook', 'path', fallback='/telegram').strip() or '/telegram'
+    settings['secret_token'] = config.get('Webhook', 'secret_token', fallback='').strip()
+    
+    try:
+        port = config.getint('Webhook', 'listen_port', fallback=8443)
+        if not 1 <= port <= 65535:
+            print(f"⚠️  Неверное значение listen_port = '{port}'. Используется 8443.")
+            port = 8443
+    except ValueError:
+        print(f"⚠️  Неверный формат listen_port. Используется 8443.")
+        port = 8443
+    settings['listen_port'] = port
+    
+    if settings['enabled'] and not settings['url'].startswith('https://'):
+        print(f"⚠️  Для webhook нужен публичный https url в секции [Webhook]. Используется long polling.")
+        settings['enabled'] = False
+    
+    # Telegram допускает в секрете только A-Z, a-z, 0-9, _ и -
+    import re
+    if settings['secret_token'] and not re.fullmatch(r'[A-Za-z0-9_-]{1,256}', settings['secret_token']):
+        print(f"⚠️  Недопустимые символы в secret_token. Будет сгенерирован случайный секрет.")
+        settings['secret_token'] = ''
+    
+    return settings
+
+@setting
+def get_dispatcher_settings():
+    """Получение настроек пула обработчиков команд бота"""
+    config = get_config()
+    
+    defaults = {
+        'workers': 8
+    }
+    
+    if 'Dispatcher' not in config:
+        return dict(defaults)
+    
+    settings = {}
+    for key, default in defaults.items():
+        try:
+            value = config.getint('Dispatcher', key, fallback=default)
+            if value < 1:
+                print(f"⚠️  Неверное значение {key} = '{value}'. Используется {default}.")
+                value = default
+        except ValueError:
+            print(f"⚠️  Неверный формат {key}. Используется {default}.")
+            value = default
+        settings[key] = value
+    
+    return settings
+
+@setting
+def get_report_settings():
+    """Получение настроек сервиса формирования отчетов"""
+    config = get_config()
+    
+    defaults = {
+        'workers': 2,
+        'max_queue': 20,
+        'cache_memory_items': 32,
+        'cache_disk_items': 500,
+        'compress_threshold_kb': 64,
+        'bulk_workers': os.cpu_count() or 2
+    }
+    
+    if 'Reports' not in config:
+        settings = dict(defaults)
+        settings['compress'] = 'none'
+        return settings
+    
+    settings = {}
+    for key, default in defaults.items():
+        try:
+            value = config.getint('Reports', key, fallback=default)
+            if value < 1:
+                print(f"⚠️  Неверное значение {key} = '{value}'. Используется {default}.")
+                value = default
+        except ValueError:
+            print(f"⚠️  Неверный формат {key}. Используется {default}.")
+            value = default
+        settings[key] = value
+    
+    # Упаковка больших отчетов перед отправкой: none, gzip или zip
+    compress = config.get('Reports', 'compress', fallback='none').strip().lower()
+    if compress not in ('none', 'gzip', 'zip'):
+        print(f"⚠️  Неверное значение compress = '{compress}'. Используется none.")
+        compress = 'none'
+    settings['compress'] = compress
+    
+    return settings
+
+@setting
+def get_report_warmup_settings():
+    """Получение настроек ночного прогрева кеша отчетов"""
+    config = get_config()
+    
+    settings = {
+        'enabled': True,
+        'time': '05:00',
+        'active_days': 7,
+        'workers': 1
+    }
+    
+    if 'Reports' not in config:
+        return settings
+    
+    try:
+        settings['enabled'] = config.getboolean('Reports', 'warmup_enabled', fallback=True)
+    except ValueError:
+        print(f"⚠️  Неверный формат настройки warmup_enabled. Используется True.")
+    
+    # Проверяем формат времени HH:MM
+    import re
+    warmup_time = config.get('Reports', 'warmup_time', fallback='05:00').strip()
+    if not re.match(r'^([0-1]?[0-9]|2[0-3]):[0-5][0-9]$', warmup_time):
+        print(f"⚠️  Неверный формат времени warmup_time '{warmup_time}'. Используется 05:00.")
+        warmup_time = '05:00'
+    settings['time'] = warmup_time
+    
+    for key, option in (('active_days', 'warmup_active_days'), ('workers', 'warmup_workers')):
+        default = settings[key]
+        try:
+            value = config.getint('Reports', option, fallback=default)
+            if value < 1:
+                print(f"⚠️  Неверное значение {option} = '{value}'. Используется {default}.")
+                value = default
+        except ValueError:
+            print(f"⚠️  Неверный формат {option}. Используется {default}.")
+            value = default
+        settings[key] = value
+    
+    return settings
+
+@setting
+def get_shift_pairing_settings():
+    """Получение правил сопоставления входов и выходов в отчетах"""
+    config = get_config()
+    
+    defaults = {
+        'incomplete_grace_days': 1,
+        'max_shift_hours': 0
+    }
+    
+    if 'Reports' not in config:
+        return dict(defaults)
+    
+    settings = {}
+    for key, default in defaults.items():
+        try:
+            value = config.getint('Reports', key, fallback=default)
+            if value < 0:
+                print(f"⚠️  Неверное значение {key} = '{value}'. Используется {default}.")
+                value = default
+        except ValueError:
+            print(f"⚠️  Неверный формат {key}. Используется {default}.")
+            value = default
+        settings[key] = value
+    
+    return settings
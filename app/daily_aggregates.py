@@ -0,0 +1,270 @@
+"""
+Дневные сводки событий для отчетов за произвольный период
+
+Для каждого сотрудника и дня входа хранятся готовые смены дня (таблица
+daily_aggregates), поэтому отчет за период читает по строке на день, а не
+все события сотрудника.
+
+Смены сопоставляются по всей истории сотрудника. В сводки попадают только
+окончательные смены - до последнего события, после которого не осталось
+входов, ожидающих выхода (checkpoint в aggregate_state). Хвост после
+checkpoint досчитывается из событий при каждом запросе.
+
+add_event помечает сводки сотрудника устаревшими (aggregate_state.dirty_since),
+пересчет выполняется при запросе отчета:
+- события после checkpoint - новые смены дописываются к сводкам;
+- события задним числом или изменение правил - сводки сотрудника строятся заново.
+"""
+
+import json
+import re
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from logger import log_debug, log_error
+from report_generator import build_day_blocks, new_day_block
+from shift_pairing import ShiftPairer, ShiftRules, to_datetime
+
+# Период в команде: /report Иванов 2026-09-01..2026-09-30
+RANGE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})\s*\.\.\s*(\d{4}-\d{2}-\d{2})\s*$')
+MAX_RANGE_DAYS = 366
+
+DateRange = Tuple[date, date]
+
+
+def split_date_range(text: str) -> Tuple[str, Optional[DateRange]]:
+    """
+    Отделяет период в конце строки: ('Иванов', (начало, конец)) или ('Иванов', None).
+    ValueError с понятным пользователю текстом, если период задан неверно.
+    """
+    match = RANGE_PATTERN.search(text)
+    if not match:
+        return text.strip(), None
+    try:
+        date_from = date.fromisoformat(match.group(1))
+        date_to = date.fromisoformat(match.group(2))
+    except ValueError:
+        raise ValueError("Неверная дата. Формат периода: ГГГГ-ММ-ДД..ГГГГ-ММ-ДД")
+    if date_from > date_to:
+        raise ValueError("Начало периода позже его конца")
+    if (date_to - date_from).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"Период длиннее {MAX_RANGE_DAYS} дней")
+    return text[:match.start()].strip(), (date_from, date_to)
+
+
+def month_range(year: int, month: int) -> DateRange:
+    """Первый и последний день календарного месяца"""
+    first = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return first, next_month - timedelta(days=1)
+
+
+def month_presets(today: Optional[date] = None, count: int = 3) -> List[DateRange]:
+    """Текущий и предыдущие календарные месяцы (от новых к старым)"""
+    today = today or date.today()
+    year, month = today.year, today.month
+    presets = []
+    for _ in range(count):
+        presets.append(month_range(year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return presets
+
+
+def rules_key(rules: ShiftRules) -> str:
+    """Правила, от которых зависят сохраненные смены (срок неполных смен применяется при запросе)"""
+    max_shift = rules.max_shift.total_seconds() if rules.max_shift else 0
+    return f"{rules.entry_direction}|{rules.exit_direction}|{max_shift:g}"
+
+
+class DailyAggregates:
+    """Дневные сводки смен сотрудников в базе событий"""
+
+    def __init__(self, events_db):
+        self.events_db = events_db
+
+    def refresh(self, employee_name: str, rules: ShiftRules) -> bool:
+        """Пересчитывает сводки сотрудника, если они устарели; True - был пересчет"""
+        key = rules_key(rules)
+        conn = self.events_db.get_connection()
+        try:
+            # Запись блокируется на время пересчета: новые события дождутся его конца
+            conn.execute("BEGIN IMMEDIATE")
+            state = conn.execute("""
+                SELECT checkpoint_ts, checkpoint_id, rules, dirty_since
+                FROM aggregate_state WHERE employee_name = ?
+            """, (employee_name,)).fetchone()
+            if state is not None and state[3] is None and state[2] == key:
+                conn.rollback()
+                return False
+
+            checkpoint_ts, checkpoint_id = (state[0], state[1]) if state else (None, None)
+            # События задним числом или другие правила - полный пересчет сотрудника
+            full = (state is None or state[2] != key or checkpoint_ts is None
+                    or (state[3] is not None and state[3] < checkpoint_ts))
+            if full:
+                conn.execute("DELETE FROM daily_aggregates WHERE employee_name = ?", (employee_name,))
+                checkpoint_ts = checkpoint_id = None
+            events = self._load_events(conn, employee_name, checkpoint_ts, checkpoint_id)
+
+            # Неполные смены сохраняются все, срок incomplete_grace_days применяется при запросе
+            pairer = ShiftPairer(rules, today=date.max)
+            settled_pairs = settled_incomplete = 0
+            for event in events:
+                pairer.feed(event)
+                if pairer.idle:
+                    checkpoint_ts, checkpoint_id = event['event_timestamp'], event['id']
+                    settled_pairs, settled_incomplete = len(pairer.pairs), len(pairer.incomplete)
+
+            days = self._group_by_day(pairer.pairs[:settled_pairs], pairer.incomplete[:settled_incomplete])
+            self._merge_days(conn, employee_name, days)
+            conn.execute("""
+                INSERT INTO aggregate_state (employee_name, checkpoint_ts, checkpoint_id, rules, dirty_since)
+                VALUES (?, ?, ?, ?, NULL)
+                ON CONFLICT(employee_name) DO UPDATE SET
+                    checkpoint_ts = excluded.checkpoint_ts,
+                    checkpoint_id = excluded.checkpoint_id,
+                    rules = excluded.rules,
+                    dirty_since = NULL
+            """, (employee_name, checkpoint_ts, checkpoint_id, key))
+            conn.commit()
+            log_debug("Сводки %s: %s (%d событий, %d дней)", employee_name,
+                      'пересчитаны' if full else 'дополнены', len(events), len(days), module='Aggregates')
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def refresh_all(self, rules: ShiftRules) -> int:
+        """Пересчитывает все устаревшие сводки (и сотрудников без сводок); возвращает число сотрудников"""
+        conn = self.events_db.get_connection()
+        try:
+            names = [row[0] for row in conn.execute("""
+                SELECT employee_name FROM aggregate_state
+                WHERE dirty_since IS NOT NULL OR rules IS NOT ?
+                UNION
+                SELECT DISTINCT employee_name FROM events
+                WHERE employee_name NOT IN (SELECT employee_name FROM aggregate_state)
+            """, (rules_key(rules),))]
+        finally:
+            conn.close()
+        refreshed = 0
+        for name in names:
+            try:
+                refreshed += self.refresh(name, rules)
+            except Exception as e:
+                log_error(f"Ошибка пересчета сводок {name}: {e}", module='Aggregates')
+        return refreshed
+
+    def _load_events(self, conn, employee_name: str, after_ts: Optional[str],
+                     after_id: Optional[int]) -> List[Dict[str, Any]]:
+        """События сотрудника по времени; после checkpoint, если он задан"""
+        if after_ts is None:
+            rows = conn.execute("""
+                SELECT id, direction, event_timestamp FROM events
+                WHERE employee_name = ?
+                ORDER BY event_timestamp, id
+            """, (employee_name,))
+        else:
+            rows = conn.execute("""
+                SELECT id, direction, event_timestamp FROM events
+                WHERE employee_name = ?
+                  AND (event_timestamp > ? OR (event_timestamp = ? AND id > ?))
+                ORDER BY event_timestamp, id
+            """, (employee_name, after_ts, after_ts, after_id))
+        return [{'id': row[0], 'direction': row[1], 'event_timestamp': row[2], 'ts_dt': to_datetime(row[2])}
+                for row in rows]
+
+    def _group_by_day(self, pairs, incomplete) -> Dict[str, Dict[str, Any]]:
+        """Смены по дню входа в формате строк daily_aggregates"""
+        days: Dict[str, Dict[str, Any]] = OrderedDict()
+
+        def day_for(entry) -> Dict[str, Any]:
+            day = entry['ts_dt'].date().isoformat()
+            if day not in days:
+                days[day] = {'work_seconds': 0.0, 'pairs': [], 'incomplete': []}
+            return days[day]
+
+        for entry, exit_ev in pairs:
+            row = day_for(entry)
+            row['pairs'].append([entry['ts_dt'].strftime('%H:%M'), exit_ev['ts_dt'].strftime('%H:%M'),
+                                 int(exit_ev['ts_dt'].date() != entry['ts_dt'].date())])
+            seconds = (exit_ev['ts_dt'] - entry['ts_dt']).total_seconds()
+            if seconds > 0:
+                row['work_seconds'] += seconds
+        for entry, _ in incomplete:
+            day_for(entry)['incomplete'].append(entry['ts_dt'].strftime('%H:%M'))
+        return days
+
+    def _merge_days(self, conn, employee_name: str, days: Dict[str, Dict[str, Any]]) -> None:
+        """Дописывает смены к сводкам дней (новые смены всегда позже сохраненных)"""
+        for day, row in days.items():
+            existing = conn.execute("""
+                SELECT work_seconds, pairs, incomplete FROM daily_aggregates
+                WHERE employee_name = ? AND day = ?
+            """, (employee_name, day)).fetchone()
+            if existing:
+                row['work_seconds'] += existing[0]
+                row['pairs'] = json.loads(existing[1]) + row['pairs']
+                row['incomplete'] = json.loads(existing[2]) + row['incomplete']
+            conn.execute("""
+                INSERT OR REPLACE INTO daily_aggregates (employee_name, day, work_seconds, pairs, incomplete)
+                VALUES (?, ?, ?, ?, ?)
+            """, (employee_name, day, row['work_seconds'],
+                  json.dumps(row['pairs'], separators=(',', ':')), json.dumps(row['incomplete'], separators=(',', ':'))))
+
+    def get_day_blocks(self, employee_name: str, date_from: date, date_to: date, rules: ShiftRules,
+                       today: Optional[date] = None) -> Dict[date, Dict[str, Any]]:
+        """Блоки дней отчета за период: сводки из базы плюс незавершенный хвост событий"""
+        self.refresh(employee_name, rules)
+        today = today or date.today()
+        incomplete_since = today - timedelta(days=rules.incomplete_grace_days)
+
+        conn = self.events_db.get_connection()
+        try:
+            rows = conn.execute("""
+                SELECT day, work_seconds, pairs, incomplete FROM daily_aggregates
+                WHERE employee_name = ? AND day BETWEEN ? AND ?
+            """, (employee_name, date_from.isoformat(), date_to.isoformat())).fetchall()
+            state = conn.execute("SELECT checkpoint_ts, checkpoint_id FROM aggregate_state WHERE employee_name = ?",
+                                 (employee_name,)).fetchone()
+            tail = self._load_events(conn, employee_name, *(state or (None, None)))
+        finally:
+            conn.close()
+
+        day_blocks: Dict[date, Dict[str, Any]] = OrderedDict()
+        for day_str, work_seconds, pairs_json, incomplete_json in rows:
+            day = date.fromisoformat(day_str)
+            block = new_day_block(day)
+            for in_time, out_time, night_shift in json.loads(pairs_json):
+                block['events'].append(('in', in_time, False))
+                block['events'].append(('out', out_time, bool(night_shift)))
+                block['total_in'] += 1
+                block['total_out'] += 1
+            block['work_time'] = timedelta(seconds=work_seconds)
+            if day < incomplete_since:
+                for in_time in json.loads(incomplete_json):
+                    block['events'].append(('in', in_time, False))
+                    block['events'].append(('no_exit', None, False))
+                    block['total_in'] += 1
+            if block['events']:
+                day_blocks[day] = block
+
+        # Хвост после checkpoint: входы без выхода, сопоставляются с учетом сегодняшней даты
+        pairer = ShiftPairer(rules, today)
+        for event in tail:
+            pairer.feed(event)
+        for day, tail_block in build_day_blocks(*pairer.finish()).items():
+            if not date_from <= day <= date_to:
+                continue
+            block = day_blocks.get(day)
+            if block is None:
+                day_blocks[day] = tail_block
+                continue
+            block['events'].extend(tail_block['events'])
+            block['work_time'] += tail_block['work_time']
+            block['total_in'] += tail_block['total_in']
+            block['total_out'] += tail_block['total_out']
+        return day_blocks
@@ -6,37 +6,17 @@ import os
 import sqlite3
 from pathlib import Path
 from typing import Optional
-# Простые функции логирования для Windows
-def log_info(message, module='Database'):
-    print(f"[INFO] {module}: {message}")
 
-def log_error(message, module='Database'):
-    print(f"[ERROR] {module}: {message}")
-
-# Пытаемся получить логгер только для Unix систем
-logger = None
-if os.name != 'nt':  # Не Windows
-    try:
-        from logger import get_logger
-        logger = get_logger('Database')
-        # Переопределяем функции если логгер доступен
-        def log_info(message, module='Database'):
-            logger.info(message)
-        def log_error(message, module='Database'):
-            logger.error(message)
-    except ImportError:
-        pass  # Используем простые функции
+from logger import log_info, log_error, log_debug
 
 
 class DatabaseManager:
     """Менеджер базы данных с автоматическим созданием схемы"""
     
     def __init__(self, db_path: str):
-        print(f"[DEBUG] Database: DatabaseManager.__init__ called with path: {db_path}")
+        log_debug("DatabaseManager: %s", db_path, module='Database')
         self.db_path = db_path
-        print("[DEBUG] Database: Calling _ensure_database_exists...")
         self._ensure_database_exists()
-        print("[DEBUG] Database: _ensure_database_exists completed")
     
     def _ensure_database_exists(self) -> None:
         """Создает базу данных и таблицы если их нет"""
@@ -101,6 +81,39 @@ class DatabaseManager:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (user_id) REFERENCES authorized_users(user_id)
                 )
+            ''',
+            'user_digest': '''
+                CREATE TABLE IF NOT EXISTS user_digest (
+                    user_id INTEGER PRIMARY KEY,
+                    window_seconds INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES authorized_users(user_id)
+                )
+            ''',
+            'delivery_failures': '''
+                CREATE TABLE IF NOT EXISTS delivery_failures (
+                    user_id INTEGER NOT NULL,
+                    error_class TEXT NOT NULL,
+                    failure_count INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    last_failure_at TIMESTAMP,
+                    PRIMARY KEY (user_id, error_class)
+                )
+            ''',
+            'suspended_chats': '''
+                CREATE TABLE IF NOT EXISTS suspended_chats (
+                    user_id INTEGER PRIMARY KEY,
+                    error_class TEXT NOT NULL,
+                    reason TEXT,
+                    suspended_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''',
+            'user_bots': '''
+                CREATE TABLE IF NOT EXISTS user_bots (
+                    user_id INTEGER PRIMARY KEY,
+                    bot_id TEXT NOT NULL,
+                    assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
             '''
         }
         
@@ -190,14 +203,8 @@ class DatabaseManager:
 
 def init_database(db_path: str) -> DatabaseManager:
     """Инициализация базы данных"""
-    print(f"[DEBUG] Database: init_database called with path: {db_path}")
     try:
-        print("[DEBUG] Database: Creating DatabaseManager...")
-        db_manager = DatabaseManager(db_path)
-        print("[DEBUG] Database: DatabaseManager created successfully")
-        return db_manager
+        return DatabaseManager(db_path)
     except Exception as e:
-        print(f"[DEBUG] Database: Error creating DatabaseManager: {e}")
-        import traceback
-        traceback.print_exc()
-        raise 
\ No newline at end of file
+        log_error("Ошибка инициализации базы пользователей %s: %s", db_path, e, module='Database')
+        raise
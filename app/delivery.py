@@ -0,0 +1,258 @@
+"""
+Модуль доставки сообщений: очереди, шардированные по chat_id
+
+Внутри одного чата сообщения отправляются строго по порядку (FIFO),
+разные чаты обслуживаются параллельно. Медленный или недоступный чат
+занимает не больше одного слота своего шарда и не задерживает соседей.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import aiohttp
+
+from logger import log_info, log_warning, log_error, log_debug
+from telegram_client import TelegramAPIError, TelegramClientRunner, RateLimiter
+
+# Ограничения задержки повторной отправки (секунды)
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 60
+
+# Сколько последних задержек доставки хранить для метрик
+LATENCY_WINDOW = 500
+
+
+class _Delivery:
+    """Одно сообщение в очереди доставки"""
+
+    __slots__ = ('chat_id', 'text', 'kwargs', 'enqueued_at', 'attempts')
+
+    def __init__(self, chat_id: int, text: str, kwargs: Dict[str, Any]):
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class _Shard:
+    """Шард доставки: очереди своих чатов и ограничение одновременных отправок"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.queues: Dict[int, Deque[_Delivery]] = {}
+        self.ready: Deque[int] = deque()
+        # Чаты, которые уже стоят в ready, отправляются или ждут повтора
+        self.scheduled: set = set()
+        self.in_flight = 0
+        self.tasks: set = set()
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        if latencies:
+            avg_ms = sum(latencies) / len(latencies) * 1000
+            p95_ms = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            max_ms = latencies[-1] * 1000
+        else:
+            avg_ms = p95_ms = max_ms = 0.0
+        return {
+            'shard': self.index,
+            'depth': self.depth,
+            'chats': len(self.queues),
+            'in_flight': self.in_flight,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'latency_avg_ms': round(avg_ms, 1),
+            'latency_p95_ms': round(p95_ms, 1),
+            'latency_max_ms': round(max_ms, 1)
+        }
+
+
+class DeliveryService:
+    """Доставка сообщений через очереди, шардированные по хешу chat_id"""
+
+    def __init__(self, telegram_client: TelegramClientRunner, shard_count: int = 4,
+                 max_in_flight: int = 8, max_retries: int = 5, send_timeout: int = 30,
+                 on_failure: Optional[Callable[[int, Exception], None]] = None,
+                 on_recovery: Optional[Callable[[int], None]] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.telegram_client = telegram_client
+        self.rate_limiter = rate_limiter
+        self.shard_count = shard_count
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        self.on_recovery = on_recovery
+        # Чаты с неудачными доставками: об успешной отправке в них сообщаем on_recovery
+        self._failing_chats: set = set()
+        self.shards: List[_Shard] = []
+        self._workers: List[asyncio.Task] = []
+        self.running = False
+
+    def start(self) -> None:
+        """Создает шарды и запускает их обработчики в event loop клиента"""
+        self.telegram_client.submit(self._start()).result()
+        self.running = True
+        log_info(f"📮 Сервис доставки запущен ({self.shard_count} шард., до {self.max_in_flight} отправок на шард)", module='Delivery')
+
+    async def _start(self) -> None:
+        self.shards = [_Shard(index) for index in range(self.shard_count)]
+        self._workers = [asyncio.create_task(self._shard_worker(shard)) for shard in self.shards]
+
+    def stop(self, timeout: float = 3) -> None:
+        """Дожидается отправки очередей (не дольше timeout) и останавливает шарды"""
+        if not self.running:
+            return
+        self.running = False
+        try:
+            self.telegram_client.submit(self._stop(timeout)).result(timeout=timeout + 1)
+        except Exception as e:
+            log_warning(f"Ошибка остановки сервиса доставки: {e}", module='Delivery')
+        log_info("🛑 Сервис доставки остановлен", module='Delivery')
+
+    async def _stop(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(shard.depth for shard in self.shards):
+            await asyncio.sleep(0.05)
+        remaining = sum(shard.depth for shard in self.shards)
+        if remaining:
+            log_warning(f"⚠️  Не доставлено сообщений при остановке: {remaining}", module='Delivery')
+        for worker in self._workers:
+            worker.cancel()
+
+    def submit(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        """Ставит сообщение в очередь чата (потокобезопасно)"""
+        item = _Delivery(chat_id, text, kwargs)
+        self.telegram_client.loop.call_soon_threadsafe(self._enqueue, item)
+
+    def mark_failing(self, chat_ids) -> None:
+        """Отмечает чаты, у которых есть незакрытые ошибки доставки"""
+        self.telegram_client.loop.call_soon_threadsafe(self._failing_chats.update, set(chat_ids))
+
+    def _shard_for(self, chat_id: int) -> _Shard:
+        return self.shards[hash(chat_id) % self.shard_count]
+
+    def _enqueue(self, item: _Delivery) -> None:
+        shard = self._shard_for(item.chat_id)
+        shard.queues.setdefault(item.chat_id, deque()).append(item)
+        if item.chat_id not in shard.scheduled:
+            shard.scheduled.add(item.chat_id)
+            shard.ready.append(item.chat_id)
+            shard.wakeup.set()
+
+    async def _shard_worker(self, shard: _Shard) -> None:
+        """Раздает готовые чаты шарда по свободным слотам отправки"""
+        while True:
+            shard.wakeup.clear()
+            while shard.ready and shard.in_flight < self.max_in_flight:
+                chat_id = shard.ready.popleft()
+                shard.in_flight += 1
+                task = asyncio.create_task(self._deliver(shard, chat_id))
+                shard.tasks.add(task)
+                task.add_done_callback(shard.tasks.discard)
+            await shard.wakeup.wait()
+
+    async def _deliver(self, shard: _Shard, chat_id: int) -> None:
+        """Отправляет первое сообщение из очереди чата"""
+        queue = shard.queues[chat_id]
+        item = queue[0]
+        retry_delay = None
+        try:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+            await asyncio.wait_for(
+                self.telegram_client.client.send_message(chat_id, item.text, **item.kwargs),
+                timeout=self.send_timeout
+            )
+        except TelegramAPIError as e:
+            if e.error_code == 429 or e.error_code >= 500:
+                retry_delay = self._retry_delay(shard, item, e, e.retry_after)
+            else:
+                # 400/403 и подобные ошибки повтором не исправить
+                self._drop(shard, queue, item, e)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            retry_delay = self._retry_delay(shard, item, e)
+        except Exception as e:
+            self._drop(shard, queue, item, e)
+        else:
+            queue.popleft()
+            shard.sent += 1
+            latency = time.monotonic() - item.enqueued_at
+            shard.latencies.append(latency)
+            log_debug("Сообщение доставлено в чат %s", chat_id, module='Delivery', category='delivery',
+                      user_id=chat_id, latency_ms=round(latency * 1000, 1))
+            if chat_id in self._failing_chats:
+                self._failing_chats.discard(chat_id)
+                if self.on_recovery:
+                    asyncio.get_running_loop().run_in_executor(None, self._run_callback, self.on_recovery, chat_id)
+        finally:
+            shard.in_flight -= 1
+
+        if retry_delay is not None and queue and queue[0] is item:
+            # Чат ждет повтора, остальные чаты шарда продолжают отправку
+            asyncio.get_running_loop().call_later(retry_delay, self._release, shard, chat_id)
+        else:
+            self._release(shard, chat_id)
+        shard.wakeup.set()
+
+    def _retry_delay(self, shard: _Shard, item: _Delivery, error: Exception,
+                     retry_after: Optional[int] = None) -> Optional[float]:
+        """Возвращает задержку повтора или None, если попытки исчерпаны"""
+        item.attempts += 1
+        queue = shard.queues[item.chat_id]
+        if item.attempts > self.max_retries:
+            self._drop(shard, queue, item, error)
+            return None
+        shard.retried += 1
+        delay = retry_after or min(RETRY_BASE_DELAY * 2 ** (item.attempts - 1), RETRY_MAX_DELAY)
+        log_warning(f"Повтор отправки в чат {item.chat_id} через {delay} сек. ({item.attempts}/{self.max_retries}): {error!r}", module='Delivery')
+        return delay
+
+    def _drop(self, shard: _Shard, queue: Deque[_Delivery], item: _Delivery, error: Exception) -> None:
+        """Удаляет сообщение из очереди после неустранимой ошибки"""
+        if queue and queue[0] is item:
+            queue.popleft()
+        shard.failed += 1
+        log_error(f"Ошибка при отправке сообщения пользователю {item.chat_id}: {error}", module='Delivery')
+        self._failing_chats.add(item.chat_id)
+        if self.on_failure:
+            # Обработчик может обращаться к БД - выполняем его вне event loop
+            asyncio.get_running_loop().run_in_executor(None, self._run_callback, self.on_failure, item.chat_id, error)
+
+    def _run_callback(self, callback: Callable, *args: Any) -> None:
+        try:
+            callback(*args)
+        except Exception as e:
+            log_error(f"Ошибка обработчика результата доставки: {e}", module='Delivery')
+
+    def _release(self, shard: _Shard, chat_id: int) -> None:
+        """Возвращает чат в очередь готовых или освобождает его"""
+        if shard.queues.get(chat_id):
+            shard.ready.append(chat_id)
+        else:
+            shard.queues.pop(chat_id, None)
+            shard.scheduled.discard(chat_id)
+        shard.wakeup.set()
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """Метрики по шардам: глубина очередей, счетчики и задержка доставки"""
+        if not self.running:
+            return []
+
+        async def collect():
+            return [shard.snapshot() for shard in self.shards]
+
+        return self.telegram_client.submit(collect()).result(timeout=2)
@@ -0,0 +1,129 @@
+"""
+Модуль режима дайджеста: объединение событий в одно сообщение Telegram
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from logger import log_info, log_error, log_debug
+
+# Максимальная длина одного сообщения Telegram
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+# Допустимые границы окна дайджеста (секунды)
+MIN_DIGEST_WINDOW = 5
+MAX_DIGEST_WINDOW = 3600
+
+
+def split_digest(lines: List[str], limit: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> List[str]:
+    """Разбивает строки дайджеста на сообщения не длиннее limit символов"""
+    messages = []
+    current = ""
+    for line in lines:
+        if len(line) > limit:
+            line = line[:limit - 1] + "…"
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            messages.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        messages.append(current)
+    return messages
+
+
+class DigestManager:
+    """Буферизация событий для пользователей с включенным дайджестом"""
+
+    def __init__(self, send_func: Callable[[int, str], None]):
+        self.send_func = send_func
+        self.running = False
+        self.flush_thread: Optional[threading.Thread] = None
+        self._buffers: Dict[int, List[str]] = {}
+        self._deadlines: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def start(self) -> None:
+        """Запуск потока отправки дайджестов"""
+        self.running = True
+        self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flush_thread.start()
+        log_info("📬 Менеджер дайджестов запущен", module='Digest')
+
+    def stop(self) -> None:
+        """Остановка потока с отправкой всех накопленных событий"""
+        if not self.running:
+            return
+        self.running = False
+        self._wakeup.set()
+        if self.flush_thread and self.flush_thread.is_alive():
+            self.flush_thread.join(timeout=3)
+        self.flush_all()
+        log_info("🛑 Менеджер дайджестов остановлен", module='Digest')
+
+    def add(self, user_id: int, text: str, window_seconds: int) -> None:
+        """Добавляет событие в буфер пользователя"""
+        with self._lock:
+            buffer = self._buffers.setdefault(user_id, [])
+            if not buffer:
+                # Окно отсчитывается от первого события в буфере
+                self._deadlines[user_id] = time.monotonic() + window_seconds
+                self._wakeup.set()
+            buffer.append(text)
+        log_debug("Событие добавлено в дайджест пользователя %s", user_id, module='Digest')
+
+    def pending_count(self, user_id: int) -> int:
+        """Количество событий, ожидающих отправки пользователю"""
+        with self._lock:
+            return len(self._buffers.get(user_id, []))
+
+    def flush_user(self, user_id: int) -> None:
+        """Немедленная отправка дайджеста пользователя"""
+        with self._lock:
+            lines = self._buffers.pop(user_id, [])
+            self._deadlines.pop(user_id, None)
+        if lines:
+            self._send_digest(user_id, lines)
+
+    def flush_all(self) -> None:
+        """Отправка всех накопленных дайджестов"""
+        with self._lock:
+            user_ids = list(self._buffers.keys())
+        for user_id in user_ids:
+            self.flush_user(user_id)
+
+    def _send_digest(self, user_id: int, lines: List[str]) -> None:
+        """Отправляет накопленные события одним или несколькими сообщениями"""
+        header = f"📬 Дайджест событий ({len(lines)})"
+        messages = split_digest([header] + lines)
+        for text in messages:
+            try:
+                self.send_func(user_id, text)
+            except Exception as e:
+                log_error(f"Ошибка отправки дайджеста пользователю {user_id}: {e}", module='Digest')
+                return
+        log_info("Дайджест из %d событий отправлен пользователю %s (%d сообщ.)", len(lines), user_id, len(messages),
+                 module='Digest')
+
+    def _flush_loop(self) -> None:
+        """Основной цикл: ждет ближайшего дедлайна и отправляет готовые дайджесты"""
+        while self.running:
+            with self._lock:
+                next_deadline = min(self._deadlines.values()) if self._deadlines else None
+            timeout = None if next_deadline is None else max(0.0, next_deadline - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            if not self.running:
+                break
+
+            now = time.monotonic()
+            with self._lock:
+                due = [user_id for user_id, deadline in self._deadlines.items() if deadline <= now]
+            for user_id in due:
+                try:
+                    self.flush_user(user_id)
+                except Exception as e:
+                    log_error(f"Ошибка в цикле отправки дайджестов: {e}", module='Digest')
@@ -0,0 +1,199 @@
+"""
+Диспетчер обновлений Telegram: обработчики выполняются в пуле потоков
+
+Обновления одного чата обрабатываются строго по порядку, разные чаты -
+параллельно. Долгий обработчик (например, отчет за 6 месяцев) занимает
+один поток и не задерживает остальных пользователей. Приоритетные
+обновления (ответы администраторов на заявки) обслуживаются вне очереди.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from logger import log_info, log_warning, log_error, log_debug
+
+
+class _QueuedUpdate:
+    """Обновление в очереди чата"""
+
+    __slots__ = ('bot', 'update', 'command', 'priority', 'enqueued_at')
+
+    def __init__(self, bot: Any, update: Any, command: str, priority: bool):
+        self.bot = bot
+        self.update = update
+        self.command = command
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class _CommandStats:
+    """Время ожидания и выполнения обработчиков одной команды"""
+
+    __slots__ = ('count', 'errors', 'queue_total', 'queue_max', 'run_total', 'run_max')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.queue_total = 0.0
+        self.queue_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def add(self, queued: float, run: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += int(failed)
+        self.queue_total += queued
+        self.queue_max = max(self.queue_max, queued)
+        self.run_total += run
+        self.run_max = max(self.run_max, run)
+
+    def snapshot(self, command: str) -> Dict[str, Any]:
+        return {
+            'command': command,
+            'count': self.count,
+            'errors': self.errors,
+            'queue_avg_ms': round(self.queue_total / self.count * 1000, 1) if self.count else 0.0,
+            'queue_max_ms': round(self.queue_max * 1000, 1),
+            'run_avg_ms': round(self.run_total / self.count * 1000, 1) if self.count else 0.0,
+            'run_max_ms': round(self.run_max * 1000, 1)
+        }
+
+
+def get_update_chat_id(update: Any) -> Optional[int]:
+    """ID чата, к которому относится обновление"""
+    if update.message is not None:
+        return update.message.chat.id
+    if update.callback_query is not None:
+        if update.callback_query.message is not None:
+            return update.callback_query.message.chat.id
+        return update.callback_query.from_user.id
+    if update.edited_message is not None:
+        return update.edited_message.chat.id
+    return None
+
+
+def get_update_command(update: Any) -> str:
+    """Метка обновления для метрик: команда, префикс callback или тип"""
+    if update.message is not None:
+        text = update.message.text or ''
+        if text.startswith('/'):
+            return text.split(maxsplit=1)[0].split('@', 1)[0]
+        return 'message'
+    if update.callback_query is not None:
+        data = update.callback_query.data or ''
+        for separator in (':', '_'):
+            if separator in data:
+                return 'callback:' + data.split(separator, 1)[0]
+        return 'callback'
+    return 'other'
+
+
+class UpdateDispatcher:
+    """Пул потоков для обработчиков telebot с порядком обновлений внутри чата"""
+
+    def __init__(self, workers: int = 8, priority_func: Optional[Callable[[Any], bool]] = None):
+        self.workers = workers
+        self.priority_func = priority_func
+        self.running = False
+        self._threads: List[threading.Thread] = []
+        self._queues: Dict[Any, Deque[_QueuedUpdate]] = {}
+        # Чаты, готовые к обработке; занятые чаты в эти очереди не попадают
+        self._ready_priority: Deque[Any] = deque()
+        self._ready: Deque[Any] = deque()
+        self._scheduled: set = set()
+        self._condition = threading.Condition()
+        self._stats: Dict[str, _CommandStats] = {}
+
+    def start(self) -> None:
+        """Запуск потоков обработки"""
+        self.running = True
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'UpdateWorker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        log_info(f"🧵 Диспетчер обновлений запущен ({self.workers} потоков)", module='Dispatcher')
+
+    def stop(self, timeout: float = 3) -> None:
+        """Остановка потоков (текущие обработчики дорабатывают не дольше timeout)"""
+        if not self.running:
+            return
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        self._threads = []
+        log_info("🛑 Диспетчер обновлений остановлен", module='Dispatcher')
+
+    def dispatch(self, bot: Any, updates: List[Any]) -> None:
+        """Ставит обновления в очереди их чатов (потокобезопасно, не блокирует)"""
+        with self._condition:
+            for update in updates:
+                chat_id = get_update_chat_id(update)
+                # Обновления без чата упорядочиваем по их собственному ID
+                key = (id(bot), chat_id if chat_id is not None else f"update:{update.update_id}")
+                priority = False
+                if self.priority_func:
+                    try:
+                        priority = self.priority_func(update)
+                    except Exception as e:
+                        log_warning(f"Ошибка определения приоритета обновления: {e}", module='Dispatcher')
+                item = _QueuedUpdate(bot, update, get_update_command(update), priority)
+                self._queues.setdefault(key, deque()).append(item)
+                if key not in self._scheduled:
+                    self._scheduled.add(key)
+                    (self._ready_priority if priority else self._ready).append(key)
+            self._condition.notify_all()
+
+    def _next_chat(self) -> Optional[Any]:
+        if self._ready_priority:
+            return self._ready_priority.popleft()
+        if self._ready:
+            return self._ready.popleft()
+        return None
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._condition:
+                key = self._next_chat()
+                while key is None and self.running:
+                    self._condition.wait()
+                    key = self._next_chat()
+                if key is None:
+                    return
+                item = self._queues[key].popleft()
+
+            started = time.monotonic()
+            failed = False
+            try:
+                item.bot.process_new_updates([item.update])
+            except Exception as e:
+                failed = True
+                log_error(f"Ошибка обработчика {item.command}: {e}", module='Dispatcher')
+            finished = time.monotonic()
+            log_debug("%s: ожидание %.0f мс, выполнение %.0f мс", item.command,
+                      (started - item.enqueued_at) * 1000, (finished - started) * 1000, module='Dispatcher')
+
+            with self._condition:
+                self._stats.setdefault(item.command, _CommandStats()).add(
+                    started - item.enqueued_at, finished - started, failed)
+                queue = self._queues[key]
+                if queue:
+                    # Следующее обновление чата встает в очередь по своему приоритету
+                    (self._ready_priority if queue[0].priority else self._ready).append(key)
+                    self._condition.notify()
+                else:
+                    del self._queues[key]
+                    self._scheduled.discard(key)
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """Метрики по командам: количество, время ожидания и выполнения"""
+        with self._condition:
+            return [stats.snapshot(command) for command, stats in sorted(self._stats.items())]
@@ -6,51 +6,19 @@ import os
 import sqlite3
 import re
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from datetime import datetime, timedelta
-import threading
-import time
-# Простые функции логирования для Windows
-def log_info(message, module='EventsDatabase'):
-    print(f"[INFO] {module}: {message}")
 
-def log_error(message, module='EventsDatabase'):
-    print(f"[ERROR] {module}: {message}")
-
-def log_debug(message, module='EventsDatabase'):
-    print(f"[DEBUG] {module}: {message}")
-
-def log_warning(message, module='EventsDatabase'):
-    print(f"[WARNING] {module}: {message}")
-
-# Пытаемся получить логгер только для Unix систем
-logger = None
-if os.name != 'nt':  # Не Windows
-    try:
-        from logger import get_logger
-        logger = get_logger('EventsDatabase')
-        # Переопределяем функции если логгер доступен
-        def log_info(message, module='EventsDatabase'):
-            logger.info(message)
-        def log_error(message, module='EventsDatabase'):
-            logger.error(message)
-        def log_debug(message, module='EventsDatabase'):
-            logger.debug(message)
-        def log_warning(message, module='EventsDatabase'):
-            logger.warning(message)
-    except ImportError:
-        pass  # Используем простые функции
+from logger import log_info, log_warning, log_error, log_debug
 
 
 class EventsDatabaseManager:
     """Менеджер базы данных событий с автоматическим созданием схемы"""
     
     def __init__(self, db_path: str):
-        print(f"[DEBUG] EventsDatabase: EventsDatabaseManager.__init__ called with path: {db_path}")
+        log_debug("EventsDatabaseManager: %s", db_path, module='EventsDatabase')
         self.db_path = db_path
-        print("[DEBUG] EventsDatabase: Calling _ensure_database_exists...")
         self._ensure_database_exists()
-        print("[DEBUG] EventsDatabase: _ensure_database_exists completed")
     
     def _ensure_database_exists(self) -> None:
         """Создает базу данных и таблицы если их нет"""
@@ -92,6 +60,27 @@ class EventsDatabaseManager:
                     raw_message TEXT NOT NULL,
                     processed_message TEXT NOT NULL
                 )
+            ''',
+            # Сводка сотрудника за день (смены по дню входа) для отчетов за произвольный период
+            'daily_aggregates': '''
+                CREATE TABLE IF NOT EXISTS daily_aggregates (
+                    employee_name TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    work_seconds INTEGER NOT NULL,
+                    pairs TEXT NOT NULL,
+                    incomplete TEXT NOT NULL,
+                    PRIMARY KEY (employee_name, day)
+                )
+            ''',
+            # Состояние сводок сотрудника: до какого события они посчитаны и с какого момента устарели
+            'aggregate_state': '''
+                CREATE TABLE IF NOT EXISTS aggregate_state (
+                    employee_name TEXT PRIMARY KEY,
+                    checkpoint_ts TEXT,
+                    checkpoint_id INTEGER,
+                    rules TEXT,
+                    dirty_since TEXT
+                )
             '''
         }
         # Создаем таблицы
@@ -101,6 +90,11 @@ class EventsDatabaseManager:
                 log_info(f"✅ Таблица событий '{table_name}' готова", module='EventsDatabase')
             except Exception as e:
                 log_error(f"Ошибка создания таблицы событий '{table_name}': {e}", module='EventsDatabase')
+        try:
+            # Выборки по сотруднику в порядке времени (отчеты и пересчет сводок)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_employee_ts ON events (employee_name, event_timestamp)")
+        except Exception as e:
+            log_error(f"Ошибка создания индекса событий: {e}", module='EventsDatabase')
         conn.commit()
         conn.close()
         log_info(f"✅ База данных событий {self.db_path} инициализирована", module='EventsDatabase')
@@ -125,9 +119,17 @@ class EventsDatabaseManager:
                 INSERT INTO events (employee_name, direction, event_timestamp, raw_message, processed_message)
                 VALUES (?, ?, ?, ?, ?)
             """, (employee_name, direction, ts, raw_message, processed_message))
+            event_id = cursor.lastrowid
+            # Сводки сотрудника устарели начиная с времени события
+            cursor.execute("""
+                INSERT INTO aggregate_state (employee_name, dirty_since) VALUES (?, ?)
+                ON CONFLICT(employee_name) DO UPDATE SET
+                    dirty_since = MIN(COALESCE(dirty_since, excluded.dirty_since), excluded.dirty_since)
+            """, (employee_name, ts))
             conn.commit()
             conn.close()
-            log_info(f"✅ Событие добавлено: {employee_name} - {direction} в {ts}", module='EventsDatabase')
+            log_info("✅ Событие добавлено: %s - %s в %s", employee_name, direction, ts, module='EventsDatabase',
+                     category='ingest', event_id=event_id, employee=employee_name)
             return True
         except Exception as e:
             log_error(f"Ошибка добавления события: {e}", module='EventsDatabase')
@@ -219,6 +221,102 @@ class EventsDatabaseManager:
             log_error(f"Ошибка получения событий по сотруднику и периоду: {e}", module='EventsDatabase')
             return []
     
+    def get_employee_period_version(self, employee_name: str, days: int = 30) -> Optional[Tuple[str, str, int]]:
+        """Версия данных отчета: (начало периода, конец периода, максимальный ID события) или None"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days)
+            cursor.execute("""
+                SELECT MAX(id)
+                FROM events 
+                WHERE employee_name LIKE ? 
+                  AND event_timestamp BETWEEN ? AND ?
+            """, (f"%{employee_name}%", start_date.isoformat(sep=' '), end_date.isoformat(sep=' ')))
+            row = cursor.fetchone()
+            conn.close()
+            if not row or row[0] is None:
+                return None
+            return start_date.date().isoformat(), end_date.date().isoformat(), row[0]
+        except Exception as e:
+            log_error(f"Ошибка получения версии данных отчета: {e}", module='EventsDatabase')
+            return None
+    
+    def get_active_employees(self, days: int = 7) -> List[str]:
+        """Сотрудники с событиями за последние N дней"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            start_date = datetime.now() - timedelta(days=days)
+            cursor.execute("""
+                SELECT DISTINCT employee_name
+                FROM events 
+                WHERE event_timestamp >= ?
+                ORDER BY employee_name
+            """, (start_date.isoformat(sep=' '),))
+            names = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            return names
+        except Exception as e:
+            log_error(f"Ошибка получения активных сотрудников: {e}", module='EventsDatabase')
+            return []
+    
+    def count_employees_in_period(self, days: int = 30, name_prefix: str = '') -> int:
+        """Количество сотрудников с событиями за последние N дней (с фамилией на name_prefix)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days)
+            cursor.execute("""
+                SELECT COUNT(DISTINCT employee_name)
+                FROM events 
+                WHERE employee_name LIKE ? 
+                  AND event_timestamp BETWEEN ? AND ?
+            """, (f"{name_prefix}%", start_date.isoformat(sep=' '), end_date.isoformat(sep=' ')))
+            count = cursor.fetchone()[0]
+            conn.close()
+            return count
+        except Exception as e:
+            log_error(f"Ошибка подсчета сотрудников за период: {e}", module='EventsDatabase')
+            return 0
+    
+    def iter_events_grouped_by_employee(self, days: int = 30,
+                                        name_prefix: str = '') -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        События всех сотрудников за последние N дней одним упорядоченным проходом.
+        Возвращает пары (сотрудник, события по возрастанию времени).
+        """
+        conn = self.get_connection()
+        try:
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days)
+            cursor = conn.execute("""
+                SELECT id, employee_name, direction, event_timestamp
+                FROM events 
+                WHERE employee_name LIKE ? 
+                  AND event_timestamp BETWEEN ? AND ?
+                ORDER BY employee_name, event_timestamp, id
+            """, (f"{name_prefix}%", start_date.isoformat(sep=' '), end_date.isoformat(sep=' ')))
+            current_name = None
+            events: List[Dict[str, Any]] = []
+            for row in cursor:
+                if row[1] != current_name:
+                    if events:
+                        yield current_name, events
+                    current_name = row[1]
+                    events = []
+                events.append({
+                    'id': row[0],
+                    'direction': row[2],
+                    'event_timestamp': row[3]
+                })
+            if events:
+                yield current_name, events
+        finally:
+            conn.close()
+    
     def cleanup_old_events(self, retention_days: int) -> int:
         """Удаление старых записей событий"""
         try:
@@ -242,6 +340,7 @@ class EventsDatabaseManager:
                     DELETE FROM events 
                     WHERE event_timestamp < ?
                 """, (cutoff_date.isoformat(sep=' '),))
+                cursor.execute("DELETE FROM daily_aggregates WHERE day < ?", (cutoff_date.date().isoformat(),))
                 
                 conn.commit()
                 log_info(f"🗑️  Удалено {count_to_delete} старых записей событий (старше {retention_days} дней)", module='EventsDatabase')
@@ -254,6 +353,21 @@ class EventsDatabaseManager:
             log_error(f"Ошибка очистки старых событий: {e}", module='EventsDatabase')
             return 0
     
+    def vacuum(self) -> int:
+        """Сжатие файла базы после очистки (VACUUM); возвращает освобожденные байты"""
+        try:
+            size_before = os.path.getsize(self.db_path)
+            conn = self.get_connection()
+            conn.execute("PRAGMA optimize")
+            conn.execute("VACUUM")
+            conn.close()
+            freed = size_before - os.path.getsize(self.db_path)
+            log_info(f"🗜️  Сжатие базы событий: освобождено {max(freed, 0) / 1024 / 1024:.1f} МБ", module='EventsDatabase')
+            return max(freed, 0)
+        except Exception as e:
+            log_error(f"Ошибка сжатия базы событий: {e}", module='EventsDatabase')
+            return 0
+    
     def get_statistics(self) -> Dict[str, Any]:
         """Получение статистики событий"""
         try:
@@ -322,108 +436,10 @@ class EventsDatabaseManager:
             return 0
 
 
-class EventsCleanupScheduler:
-    """Планировщик автоматической очистки событий"""
-    
-    def __init__(self, events_db: EventsDatabaseManager, retention_days: int, 
-                 cleanup_time: str = "02:00", enabled: bool = True):
-        self.events_db = events_db
-        self.retention_days = retention_days
-        self.cleanup_time = cleanup_time
-        self.enabled = enabled
-        self.running = False
-        self.cleanup_thread = None
-        
-        # Парсим время очистки
-        try:
-            hour, minute = map(int, cleanup_time.split(':'))
-            self.cleanup_hour = hour
-            self.cleanup_minute = minute
-        except ValueError:
-            log_error(f"Неверный формат времени очистки: {cleanup_time}. Используется 02:00", module='EventsDatabase')
-            self.cleanup_hour = 2
-            self.cleanup_minute = 0
-    
-    def start(self):
-        """Запуск планировщика очистки"""
-        if not self.enabled:
-            log_info("🚫 Автоматическая очистка событий отключена", module='EventsDatabase')
-            return
-        
-        self.running = True
-        self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
-        self.cleanup_thread.start()
-        log_info(f"🕐 Планировщик очистки событий запущен (время: {self.cleanup_time})", module='EventsDatabase')
-    
-    def stop(self):
-        """Остановка планировщика очистки"""
-        if not self.running:
-            return
-            
-        log_info("🛑 Остановка планировщика очистки событий...", module='EventsDatabase')
-        self.running = False
-        
-        if self.cleanup_thread and self.cleanup_thread.is_alive():
-            # Ждем завершения потока с таймаутом
-            self.cleanup_thread.join(timeout=3)
-            
-            if self.cleanup_thread.is_alive():
-                log_warning("⚠️  Поток планировщика не завершился в течение 3 секунд", module='EventsDatabase')
-            else:
-                log_info("✅ Поток планировщика успешно завершен", module='EventsDatabase')
-        
-        log_info("🛑 Планировщик очистки событий остановлен", module='EventsDatabase')
-    
-    def _cleanup_loop(self):
-        """Основной цикл планировщика"""
-        while self.running:
-            try:
-                now = datetime.now()
-                
-                # Проверяем, нужно ли запустить очистку
-                if (now.hour == self.cleanup_hour and 
-                    now.minute == self.cleanup_minute):
-                    
-                    log_info("🧹 Запуск автоматической очистки старых событий...", module='EventsDatabase')
-                    deleted_count = self.events_db.cleanup_old_events(self.retention_days)
-                    
-                    if deleted_count > 0:
-                        log_info(f"✅ Очистка завершена: удалено {deleted_count} записей", module='EventsDatabase')
-                    else:
-                        log_info("✅ Очистка завершена: записи для удаления не найдены", module='EventsDatabase')
-                    
-                    # Ждем минуту, чтобы не запустить очистку повторно
-                    # Используем более короткие интервалы для быстрого реагирования на остановку
-                    for _ in range(60):
-                        if not self.running:
-                            break
-                        time.sleep(1)
-                else:
-                    # Проверяем каждую минуту, но с более короткими интервалами
-                    for _ in range(60):
-                        if not self.running:
-                            break
-                        time.sleep(1)
-                    
-            except Exception as e:
-                log_error(f"Ошибка в планировщике очистки: {e}", module='EventsDatabase')
-                # При ошибке ждем 5 минут, но с проверкой остановки
-                for _ in range(300):
-                    if not self.running:
-                        break
-                    time.sleep(1)
-
-
 def init_events_database(db_path: str) -> EventsDatabaseManager:
     """Инициализация базы данных событий"""
-    print(f"[DEBUG] EventsDatabase: init_events_database called with path: {db_path}")
     try:
-        print("[DEBUG] EventsDatabase: Creating EventsDatabaseManager...")
-        events_db_manager = EventsDatabaseManager(db_path)
-        print("[DEBUG] EventsDatabase: EventsDatabaseManager created successfully")
-        return events_db_manager
+        return EventsDatabaseManager(db_path)
     except Exception as e:
-        print(f"[DEBUG] EventsDatabase: Error creating EventsDatabaseManager: {e}")
-        import traceback
-        traceback.print_exc()
-        raise 
\ No newline at end of file
+        log_error("Ошибка инициализации базы событий %s: %s", db_path, e, module='EventsDatabase')
+        raise
@@ -2,11 +2,20 @@
 Модуль логирования для OrionEventsToTelegram
 """
 
+import gzip
+import json
 import logging
+import logging.handlers
 import os
-from typing import Optional
+import queue
+import random
+import re
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 # Инициализация colorama для всех систем
 try:
@@ -78,6 +87,32 @@ class FileFormatter(logging.Formatter):
         return super().format(record)
 
 
+class JsonFormatter(logging.Formatter):
+    """
+    Форматтер JSON Lines: одна запись - одна строка JSON для разбора логов.
+    Поля: ts, level, module, message, category и поля события из log_*
+    (event_id, employee, latency_ms, user_id, ...), exc - traceback ошибки.
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'module': record.name,
+            'message': record.getMessage(),
+        }
+        category = getattr(record, 'category', None)
+        if category:
+            entry['category'] = category
+        fields = getattr(record, 'fields', None)
+        if fields:
+            for key, value in fields.items():
+                entry.setdefault(key, value)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
 class TechnicalLogFilter(logging.Filter):
     """Фильтр для отключения технических логов в не-DEBUG режимах"""
     
@@ -103,37 +138,385 @@ class TechnicalLogFilter(logging.Filter):
         'UserManager:'
     ]
     
+    # Предел кеша решений: сообщения из f-строк дают новый шаблон на каждую запись
+    CACHE_SIZE = 4096
+    
     def __init__(self, debug_mode: bool = False):
         super().__init__()
         self.debug_mode = debug_mode
+        # Ключевые слова - одно регулярное выражение с альтернативами, один проход по строке
+        self._debug_pattern = self._compile(self.DEBUG_KEYWORDS)
+        self._technical_pattern = self._compile(self.TECHNICAL_KEYWORDS)
+        self._blocked_pattern = self._compile(self.TECHNICAL_KEYWORDS + self.DEBUG_KEYWORDS)
+        # Решение по (логгер, сообщение) для записей без аргументов: таких сообщений в коде конечное число
+        self._decisions: Dict[Tuple[str, str], bool] = {}
     
-    def filter(self, record: logging.LogRecord) -> bool:
-        """Фильтрует технические сообщения"""
-        message = record.getMessage()
-        
-        # В не-DEBUG режимах блокируем все DEBUG сообщения
-        if not self.debug_mode and record.levelno == logging.DEBUG:
-            return False
-        
+    def set_debug_mode(self, debug_mode: bool) -> None:
+        """Смена режима при изменении уровня логирования: прежние решения сбрасываются"""
+        self.debug_mode = debug_mode
+        self._decisions = {}
+    
+    @staticmethod
+    def _compile(keywords) -> re.Pattern:
+        return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+    
+    def _decide(self, message: str) -> bool:
         if self.debug_mode:
             # В DEBUG режиме пропускаем все сообщения с ключевыми словами DEBUG
-            if any(keyword in message for keyword in self.DEBUG_KEYWORDS):
+            if self._debug_pattern.search(message):
                 return True
             # Остальные технические сообщения фильтруем даже в DEBUG
-            return not any(keyword in message for keyword in self.TECHNICAL_KEYWORDS)
+            return not self._technical_pattern.search(message)
         
         # В не-DEBUG режимах фильтруем все технические сообщения
         # включая те, что содержат DEBUG_KEYWORDS
-        return not any(keyword in message for keyword in self.TECHNICAL_KEYWORDS + self.DEBUG_KEYWORDS)
+        return not self._blocked_pattern.search(message)
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Фильтрует технические сообщения"""
+        # В не-DEBUG режимах блокируем все DEBUG сообщения
+        if not self.debug_mode and record.levelno == logging.DEBUG:
+            return False
+        
+        # Ключевые слова ищутся в готовом сообщении: аргументы могут их добавить
+        # (aiosmtpd пишет '%r >> %r' с байтами команды - "b'" появляется только после подстановки)
+        if record.args or hasattr(record, 'template'):
+            return self._decide(record.getMessage())
+        message = record.msg if isinstance(record.msg, str) else str(record.msg)
+        key = (record.name, message)
+        decision = self._decisions.get(key)
+        if decision is None:
+            decision = self._decide(message)
+            if len(self._decisions) >= self.CACHE_SIZE:
+                self._decisions.clear()
+            self._decisions[key] = decision
+        return decision
+
+
+# Каталог логов по умолчанию: log/ в корне проекта
+DEFAULT_LOG_DIR = Path(__file__).parent.parent / 'log'
+
+# Категории массовых записей (по одной и более на событие), для которых
+# настраиваются выборка и ограничение частоты
+LOG_CATEGORIES = ('ingest', 'delivery', 'filter')
+
+
+class CategorySampler:
+    """
+    Выборка и ограничение частоты записей по категориям.
+    sampling - доля записываемых записей категории (0..1),
+    rate_limits - не более N записей категории в секунду (0 - без ограничения).
+    Предупреждения и ошибки не ограничиваются (проверяется в log_*).
+    """
+    
+    def __init__(self, sampling: Optional[Dict[str, float]] = None,
+                 rate_limits: Optional[Dict[str, int]] = None, clock=time.monotonic):
+        self._rates = {category: rate for category, rate in (sampling or {}).items() if rate < 1.0}
+        self._limits = {category: limit for category, limit in (rate_limits or {}).items() if limit > 0}
+        self._clock = clock
+        now = clock()
+        self._tokens = {category: float(limit) for category, limit in self._limits.items()}
+        self._refilled = {category: now for category in self._limits}
+        # Пропущено с последней записанной записи категории (пишется в поле suppressed)
+        self._pending = {category: 0 for category in LOG_CATEGORIES}
+        self.sampled_out = {category: 0 for category in LOG_CATEGORIES}
+        self.rate_limited = {category: 0 for category in LOG_CATEGORIES}
+        self._lock = threading.Lock()
+    
+    @property
+    def active(self) -> bool:
+        return bool(self._rates or self._limits)
+    
+    def allow(self, category: str) -> Optional[int]:
+        """None - запись пропускается; иначе число пропущенных перед ней записей категории"""
+        rate = self._rates.get(category)
+        limit = self._limits.get(category)
+        if rate is None and limit is None:
+            return 0
+        with self._lock:
+            if rate is not None and random.random() >= rate:
+                self.sampled_out[category] = self.sampled_out.get(category, 0) + 1
+                self._pending[category] = self._pending.get(category, 0) + 1
+                return None
+            if limit is not None:
+                now = self._clock()
+                tokens = min(float(limit), self._tokens[category] + (now - self._refilled[category]) * limit)
+                self._refilled[category] = now
+                if tokens < 1.0:
+                    self._tokens[category] = tokens
+                    self.rate_limited[category] = self.rate_limited.get(category, 0) + 1
+                    self._pending[category] = self._pending.get(category, 0) + 1
+                    return None
+                self._tokens[category] = tokens - 1.0
+            suppressed, self._pending[category] = self._pending.get(category, 0), 0
+            return suppressed
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Обработчик, только кладущий запись в ограниченную очередь.
+    Форматирование, фильтры и запись в файл/консоль выполняет поток QueueListener.
+    policy='drop' - при переполнении запись теряется (счетчик dropped),
+    policy='block' - поток ждет места в очереди.
+    """
+    
+    def __init__(self, log_queue: queue.Queue, policy: str = 'drop'):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+        self._unreported = 0
+        self._drop_lock = threading.Lock()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Подготовка без форматирования: подставляются только аргументы сообщения"""
+        # Аргументы могут измениться после возврата из log_*, поэтому сообщение собирается сразу;
+        # остальное форматирование (время, цвета, traceback) - в потоке записи
+        if record.args:
+            # Шаблон сохраняется: TechnicalLogFilter не кеширует решения для записей с аргументами
+            record.template = record.msg
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            self._report_dropped()
+    
+    def _report_dropped(self) -> None:
+        """После переполнения - одна запись о потерянных сообщениях"""
+        with self._drop_lock:
+            count, self._unreported = self._unreported, 0
+        if not count:
+            return
+        notice = logging.LogRecord('Logger', logging.WARNING, __file__, 0,
+                                   f"⚠️  Очередь логов переполнена: потеряно {count} сообщений", None, None)
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._drop_lock:
+                self._unreported += count
+
+
+class LogQueueListener(logging.handlers.QueueListener):
+    """Поток записи логов; при остановке ждет места в очереди для маркера завершения"""
+    
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+# Части файла лога за день после ротации: 20261019_app.1.log, 20261019_app.2.log.gz
+SEGMENT_PATTERN = re.compile(r'^(\d{8})_app\.(\d+)\.log(\.gz)?$')
+ACTIVE_PATTERN = re.compile(r'^(\d{8})_app\.log$')
+
+
+def next_midnight(moment: datetime) -> float:
+    """Время следующей полуночи (timestamp)"""
+    return datetime.combine(moment.date() + timedelta(days=1), datetime.min.time()).timestamp()
+
+
+class LogArchiver:
+    """
+    Фоновый поток сжатия и удаления файлов логов после ротации.
+    Поток записи логов только переименовывает файл и ставит задачу в очередь,
+    gzip и удаление старых файлов не задерживают запись.
+    Хранение: не старше keep_days дней, не больше max_files частей
+    и не больше max_total_bytes вместе с текущим файлом (0 - без ограничения).
+    """
+    
+    COPY_CHUNK = 1024 * 1024
+    
+    def __init__(self, log_dir: Path, keep_days: int = 0, max_files: int = 0,
+                 max_total_bytes: int = 0, compress: bool = True):
+        self.log_dir = log_dir
+        self.keep_days = keep_days
+        self.max_files = max_files
+        self.max_total_bytes = max_total_bytes
+        self.compress = compress
+        self.compressed = 0
+        self.deleted = 0
+        self._tasks: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._active: Optional[Path] = None
+    
+    def start(self, active: Path) -> None:
+        """Запуск потока; первой задачей - разбор файлов, оставшихся от прошлых запусков"""
+        self._active = active
+        self._thread = threading.Thread(target=self._run, name='LogArchiver', daemon=True)
+        self._thread.start()
+        self._tasks.put(self._recover)
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Завершает поток после текущих задач (несжатые части дожмутся при следующем запуске)"""
+        if self._thread is None:
+            return
+        self._tasks.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+    
+    def submit(self, segment: Path, active: Path) -> None:
+        """Часть после ротации: сжать и применить ограничения хранения"""
+        self._active = active
+        self._tasks.put(lambda: self._archive(segment))
+    
+    def _run(self) -> None:
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            try:
+                task()
+            except Exception as e:
+                print(f"[WARNING] Ошибка обслуживания файлов логов: {e}")
+    
+    def _archive(self, segment: Path) -> None:
+        if self.compress and segment.exists():
+            self._compress(segment)
+        self._enforce_retention()
+    
+    def _compress(self, segment: Path) -> None:
+        target = segment.with_name(segment.name + '.gz')
+        temp = target.with_name(target.name + '.tmp')
+        with open(segment, 'rb') as src, gzip.open(temp, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, self.COPY_CHUNK)
+        os.replace(temp, target)
+        segment.unlink()
+        self.compressed += 1
+    
+    def _recover(self) -> None:
+        """Файлы прошлых запусков: недожатые архивы, файлы прошедших дней без ротации"""
+        for temp in self.log_dir.glob('*_app.*.log.gz.tmp'):
+            temp.unlink()
+        for path in sorted(self.log_dir.glob('*_app.log')):
+            if path != self._active and ACTIVE_PATTERN.match(path.name):
+                path.rename(segment_path(self.log_dir, path.name[:8]))
+        if self.compress:
+            for path, _ in self._segments():
+                if path.suffix == '.log':
+                    self._compress(path)
+        self._enforce_retention()
+    
+    def _segments(self) -> List[Tuple[Path, int]]:
+        """Части логов от старых к новым с размерами"""
+        segments = []
+        for path in self.log_dir.iterdir():
+            match = SEGMENT_PATTERN.match(path.name)
+            if match:
+                try:
+                    segments.append(((match.group(1), int(match.group(2))), path, path.stat().st_size))
+                except FileNotFoundError:
+                    continue
+        segments.sort()
+        return [(path, size) for _, path, size in segments]
+    
+    def _enforce_retention(self) -> None:
+        segments = self._segments()
+        total = sum(size for _, size in segments)
+        if self._active is not None and self._active.exists():
+            total += self._active.stat().st_size
+        # keep_days дней, включая сегодняшний
+        oldest_day = (date.today() - timedelta(days=self.keep_days - 1)).strftime('%Y%m%d') if self.keep_days else None
+        for index, (path, size) in enumerate(segments):
+            too_old = oldest_day is not None and path.name[:8] < oldest_day
+            too_many = self.max_files and len(segments) - index > self.max_files
+            too_big = self.max_total_bytes and total > self.max_total_bytes
+            if not (too_old or too_many or too_big):
+                break
+            try:
+                path.unlink()
+                self.deleted += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"[WARNING] Не удалось удалить файл {path.name}: {e}")
+                continue
+            total -= size
+
+
+def segment_path(log_dir: Path, day: str) -> Path:
+    """Свободное имя следующей части файла лога за день"""
+    indexes = [int(match.group(2)) for match in
+               (SEGMENT_PATTERN.match(path.name) for path in log_dir.glob(f'{day}_app.*.log*')) if match]
+    return log_dir / f'{day}_app.{max(indexes, default=0) + 1}.log'
+
+
+class DailyRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Файл лога за день (YYYYMMDD_app.log) с ротацией в полночь и по размеру.
+    При ротации файл переименовывается в YYYYMMDD_app.N.log, сжатие и удаление
+    старых частей выполняет LogArchiver в своем потоке.
+    """
+    
+    def __init__(self, log_dir: Path, max_bytes: int = 0, archiver: Optional[LogArchiver] = None):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.archiver = archiver
+        self.rotations = 0
+        now = datetime.now()
+        self._day = now.strftime('%Y%m%d')
+        self._rollover_at = next_midnight(now)
+        super().__init__(str(log_dir / f'{self._day}_app.log'), 'a', encoding='utf-8')
+    
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if record.created >= self._rollover_at:
+            return True
+        # Размер проверяется после предыдущей записи: файл может превысить предел на одну запись
+        return bool(self.max_bytes and self.stream is not None and self.stream.tell() >= self.max_bytes)
+    
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None  # type: ignore[assignment]
+        current = Path(self.baseFilename)
+        now = datetime.now()
+        if current.exists() and current.stat().st_size > 0:
+            segment = segment_path(self.log_dir, self._day)
+            current.rename(segment)
+            self.rotations += 1
+        else:
+            segment = None
+        self._day = now.strftime('%Y%m%d')
+        self._rollover_at = next_midnight(now)
+        self.baseFilename = str(self.log_dir / f'{self._day}_app.log')
+        self.stream = self._open()
+        if segment is not None and self.archiver:
+            self.archiver.submit(segment, Path(self.baseFilename))
 
 
 class Logger:
     """Основной класс логирования"""
     
-    def __init__(self, level: str = 'WARNING', backup_days: int = 7):
+    def __init__(self, level: str = 'WARNING', backup_days: int = 7, queue_size: int = 10000,
+                 queue_policy: str = 'drop', log_dir: Optional[Path] = None, log_format: str = 'text',
+                 sampling: Optional[Dict[str, float]] = None, rate_limits: Optional[Dict[str, int]] = None,
+                 max_file_size_mb: int = 50, max_files: int = 30, max_total_size_mb: int = 500,
+                 compress: bool = True):
         try:
             self.level = level.upper()
+            self.log_dir = Path(log_dir) if log_dir else DEFAULT_LOG_DIR
             self.backup_days = backup_days
+            self.queue_size = queue_size
+            self.queue_policy = queue_policy
+            self.log_format = log_format
+            self.sampler = CategorySampler(sampling, rate_limits)
+            self.max_file_bytes = max_file_size_mb * 1024 * 1024
+            self.archiver = LogArchiver(self.log_dir, backup_days, max_files,
+                                        max_total_size_mb * 1024 * 1024, compress)
+            self.file_handler: Optional[DailyRotatingFileHandler] = None
+            # Один фильтр на консоль и файл: решение по шаблону вычисляется один раз
+            self.technical_filter = TechnicalLogFilter(debug_mode=(self.level == 'DEBUG'))
+            self.queue_handler: Optional[BoundedQueueHandler] = None
+            self.listener: Optional[LogQueueListener] = None
+            self._handlers = []
             self._setup_logging()
         except Exception as e:
             print(f"[ERROR] Logger initialization failed: {e}")
@@ -141,37 +524,31 @@ class Logger:
             traceback.print_exc()
             raise
     
+    LEVELS = {
+        'DEBUG': logging.DEBUG,
+        'INFO': logging.INFO,
+        'WARNING': logging.WARNING,
+        'ERROR': logging.ERROR
+    }
+    
     def _setup_logging(self) -> None:
         """Настройка логирования"""
         try:
-            level_map = {
-                'DEBUG': logging.DEBUG,
-                'INFO': logging.INFO,
-                'WARNING': logging.WARNING,
-                'ERROR': logging.ERROR
-            }
-            
-            log_level = level_map.get(self.level, logging.WARNING)
+            self.log_level = self.LEVELS.get(self.level, logging.WARNING)
             
             # Создаем каталог для логов если его нет
-            log_dir = Path(__file__).parent.parent / 'log'
-            log_dir.mkdir(exist_ok=True)
-            
-            # Настройка базового логирования
-            logging.basicConfig(
-                level=log_level,
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                handlers=[]
-            )
+            self.log_dir.mkdir(exist_ok=True)
             
-            # Очищаем существующие обработчики
+            # Очищаем существующие обработчики; логгеры модулей наследуют уровень корневого
             root_logger = logging.getLogger()
             for handler in root_logger.handlers[:]:
                 root_logger.removeHandler(handler)
+            root_logger.setLevel(self.log_level)
             
-            # Создаем обработчики
+            # Создаем обработчики (они работают в потоке QueueListener)
             self._setup_console_handler()
             self._setup_file_handler()
+            self._setup_queue()
             
             # Настройка логгеров сторонних библиотек
             self._setup_external_loggers()
@@ -180,24 +557,7 @@ class Logger:
             print(f"[ERROR] Logging setup failed: {e}")
             import traceback
             traceback.print_exc()
-            
-            # Fallback для Windows: минимальный логгер
-            if os.name == 'nt':
-                try:
-                    # Простейшая настройка без сложных форматтеров
-                    logging.basicConfig(
-                        level=log_level,
-                        format='%(asctime)s - %(levelname)s - %(message)s',
-                        handlers=[
-                            logging.StreamHandler(),
-                            logging.FileHandler(log_dir / 'fallback.log', encoding='utf-8')
-                        ]
-                    )
-                except Exception as e2:
-                    print(f"[ERROR] Windows fallback also failed: {e2}")
-                    raise
-            else:
-                raise
+            raise
     
     def _setup_console_handler(self) -> None:
         """Настройка консольного обработчика"""
@@ -208,9 +568,9 @@ class Logger:
             console_handler.setFormatter(ColoredFormatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
             
             # Добавляем фильтр для всех систем
-            console_handler.addFilter(TechnicalLogFilter(debug_mode=(self.level == 'DEBUG')))
+            console_handler.addFilter(self.technical_filter)
             
-            logging.getLogger().addHandler(console_handler)
+            self._handlers.append(console_handler)
             
         except Exception as e:
             print(f"[ERROR] Console handler setup failed: {e}")
@@ -221,37 +581,31 @@ class Logger:
                 simple_handler = logging.StreamHandler()
                 simple_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
                 simple_handler.setFormatter(simple_formatter)
-                logging.getLogger().addHandler(simple_handler)
+                self._handlers.append(simple_handler)
             except Exception as e2:
                 print(f"[ERROR] Console fallback also failed: {e2}")
                 raise
     
     def _setup_file_handler(self) -> None:
-        """Настройка файлового обработчика с ротацией по дате"""
+        """Настройка файлового обработчика с ротацией в полночь и по размеру"""
+        log_file = self.log_dir / f"{datetime.now().strftime('%Y%m%d')}_app.log"
         try:
-            log_dir = Path(__file__).parent.parent / 'log'
-            
-            # Формируем имя файла только с датой
-            dt_str = datetime.now().strftime('%Y%m%d')
-            log_file = log_dir / f'{dt_str}_app.log'
-            
-            # Очищаем старые лог файлы (оставляем только последние backup_days дней)
-            self._cleanup_old_logs(log_dir, self.backup_days)
-            
-            # Используем обычный FileHandler вместо RotatingFileHandler
-            # так как ротация теперь по дате, а не по размеру
-            file_handler = logging.FileHandler(
-                log_file,
-                encoding='utf-8'
-            )
+            # Файл текущего дня дополняется при перезапуске; части прошлых дней
+            # сжимаются и удаляются по ограничениям хранения в фоновом потоке
+            file_handler = DailyRotatingFileHandler(self.log_dir, self.max_file_bytes, self.archiver)
+            self.file_handler = file_handler
+            self.archiver.start(Path(file_handler.baseFilename))
             
-            # Используем FileFormatter для всех систем
-            file_handler.setFormatter(FileFormatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+            # В файл - текст или JSON Lines ([Logging] format), консоль всегда текстовая
+            if self.log_format == 'json':
+                file_handler.setFormatter(JsonFormatter())
+            else:
+                file_handler.setFormatter(FileFormatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
             
             # Добавляем фильтр для всех систем
-            file_handler.addFilter(TechnicalLogFilter(debug_mode=(self.level == 'DEBUG')))
+            file_handler.addFilter(self.technical_filter)
             
-            logging.getLogger().addHandler(file_handler)
+            self._handlers.append(file_handler)
         except Exception as e:
             print(f"[ERROR] File handler setup failed: {e}")
             import traceback
@@ -264,31 +618,58 @@ class Logger:
                 )
                 simple_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
                 fallback_handler.setFormatter(simple_formatter)
-                logging.getLogger().addHandler(fallback_handler)
+                self._handlers.append(fallback_handler)
             except Exception as e2:
                 print(f"[ERROR] File fallback also failed: {e2}")
                 raise
     
-    def _cleanup_old_logs(self, log_dir: Path, keep_days: int) -> None:
-        """Удаляет старые лог файлы, оставляя только последние keep_days дней"""
-        try:
-            # Получаем список всех лог файлов
-            log_files = list(log_dir.glob('*_app.log'))
-            
-            # Сортируем файлы по дате (новые в конце)
-            log_files.sort()
-            
-            # Если файлов больше чем нужно сохранить, удаляем старые
-            if len(log_files) > keep_days:
-                files_to_delete = log_files[:-keep_days]
-                for file in files_to_delete:
-                    try:
-                        file.unlink()
-                        print(f"[INFO] Удален старый лог файл: {file.name}")
-                    except Exception as e:
-                        print(f"[WARNING] Не удалось удалить файл {file.name}: {e}")
-        except Exception as e:
-            print(f"[WARNING] Ошибка при очистке старых логов: {e}")
+    def _setup_queue(self) -> None:
+        """Очередь между потоками приложения и потоком записи логов"""
+        log_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self.queue_handler = BoundedQueueHandler(log_queue, self.queue_policy)
+        self.listener = LogQueueListener(log_queue, *self._handlers, respect_handler_level=True)
+        self.listener.start()
+        logging.getLogger().addHandler(self.queue_handler)
+    
+    def set_level(self, level: str) -> None:
+        """Смена уровня без перезапуска (после изменения [Logging] level)"""
+        self.level = level.upper()
+        self.log_level = self.LEVELS.get(self.level, logging.WARNING)
+        logging.getLogger().setLevel(self.log_level)
+        self.technical_filter.set_debug_mode(self.level == 'DEBUG')
+        self._setup_external_loggers()
+    
+    def shutdown(self) -> None:
+        """Дописывает очередь и закрывает обработчики (перед os._exit)"""
+        if self.queue_handler:
+            logging.getLogger().removeHandler(self.queue_handler)
+            self.queue_handler = None
+        if self.listener:
+            # stop() дожидается записи всех сообщений, уже стоящих в очереди
+            self.listener.stop()
+            self.listener = None
+        for handler in self._handlers:
+            try:
+                handler.flush()
+                handler.close()
+            except Exception:
+                pass
+        self.archiver.stop()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Состояние очереди логов и пропущенные выборкой записи по категориям"""
+        return {
+            'queued': self.queue_handler.queue.qsize() if self.queue_handler else 0,
+            'queue_size': self.queue_size,
+            'dropped': self.queue_handler.dropped if self.queue_handler else 0,
+            'policy': self.queue_policy,
+            'format': self.log_format,
+            'sampled_out': dict(self.sampler.sampled_out),
+            'rate_limited': dict(self.sampler.rate_limited),
+            'rotations': self.file_handler.rotations if self.file_handler else 0,
+            'compressed': self.archiver.compressed,
+            'deleted': self.archiver.deleted,
+        }
     
     def _setup_external_loggers(self) -> None:
         """Настройка логгеров сторонних библиотек"""
@@ -314,27 +695,67 @@ class Logger:
                     logger.removeHandler(handler)
     
     def get_logger(self, name: str) -> logging.Logger:
-        """Получение логгера с указанным именем"""
-        logger = logging.getLogger(name)
-        logger.setLevel(logging.DEBUG)
-        return logger
+        """Получение логгера с указанным именем (уровень наследуется от корневого)"""
+        return logging.getLogger(name)
 
 
 # Глобальный экземпляр логгера
 _logger_instance: Optional[Logger] = None
 
+# Минимальный включенный уровень: сообщения ниже отбрасываются одним сравнением,
+# без поиска логгера и подстановки аргументов
+_enabled_level = logging.NOTSET
+
+# Логгеры модулей по имени (logging.getLogger каждый раз берет глобальную блокировку)
+_module_loggers: Dict[str, logging.Logger] = {}
+
+# Выборка по категориям; None - все записи категорий пишутся
+_sampler: Optional[CategorySampler] = None
 
-def setup_logger(level: str = 'WARNING', backup_days: int = 7) -> Logger:
+
+def setup_logger(level: str = 'WARNING', backup_days: int = 7, queue_size: int = 10000,
+                 queue_policy: str = 'drop', log_dir: Optional[Path] = None, log_format: str = 'text',
+                 sampling: Optional[Dict[str, float]] = None,
+                 rate_limits: Optional[Dict[str, int]] = None, max_file_size_mb: int = 50,
+                 max_files: int = 30, max_total_size_mb: int = 500, compress: bool = True) -> Logger:
     """Инициализация логгера"""
     try:
         global _logger_instance
-        _logger_instance = Logger(level, backup_days)
+        if _logger_instance is not None:
+            # Повторная настройка: прежний поток записи дописывает свою очередь
+            _logger_instance.shutdown()
+        _logger_instance = Logger(level, backup_days, queue_size, queue_policy, log_dir,
+                                  log_format, sampling, rate_limits, max_file_size_mb, max_files,
+                                  max_total_size_mb, compress)
+        global _enabled_level, _sampler
+        _enabled_level = _logger_instance.log_level
+        _sampler = _logger_instance.sampler if _logger_instance.sampler.active else None
         return _logger_instance
     except Exception as e:
         print(f"[ERROR] Error in setup_logger: {e}")
         raise
 
 
+def set_logging_level(level: str) -> None:
+    """Смена уровня логирования работающего логгера"""
+    global _enabled_level
+    if _logger_instance is None:
+        return
+    _logger_instance.set_level(level)
+    _enabled_level = _logger_instance.log_level
+
+
+def shutdown_logger() -> None:
+    """Записывает накопленные в очереди сообщения; вызывается перед завершением процесса"""
+    if _logger_instance is not None:
+        _logger_instance.shutdown()
+
+
+def get_logging_metrics() -> Optional[Dict[str, Any]]:
+    """Состояние очереди логов или None, если логгер не настроен"""
+    return _logger_instance.get_metrics() if _logger_instance else None
+
+
 def get_logger(name: str = __name__) -> logging.Logger:
     """Получение логгера"""
     if _logger_instance is None:
@@ -343,49 +764,87 @@ def get_logger(name: str = __name__) -> logging.Logger:
     return _logger_instance.get_logger(name)
 
 
-def log_info(message: str, module: str = 'CORE') -> None:
-    """Логирование информационного сообщения"""
-    try:
-        logger = get_logger(module)
-        logger.info(message)
-    except Exception as e:
-        print(f"[ERROR] Error in log_info: {e}")
-        # Fallback to print
-        print(f"[INFO] {module}: {message}")
-        # Дополнительный fallback: попробуем использовать базовый logging
-        try:
-            basic_logger = logging.getLogger(module)
-            basic_logger.setLevel(logging.INFO)
-            basic_logger.info(message)
-        except Exception as e2:
-            print(f"[ERROR] Basic logging fallback also failed: {e2}")
-            # Последний fallback: просто print
-            print(f"[INFO] {module}: {message}")
+def _module_logger(module: str) -> logging.Logger:
+    logger = _module_loggers.get(module)
+    if logger is None:
+        logger = _module_loggers.setdefault(module, get_logger(module))
+    return logger
 
 
-def log_warning(message: str, module: str = 'CORE') -> None:
-    """Логирование предупреждения"""
-    logger = get_logger(module)
-    logger.warning(message)
+def is_enabled(level: int, module: str = 'CORE') -> bool:
+    """Включен ли уровень: для дорогих вычислений, нужных только в логе"""
+    if _logger_instance is not None and level < _enabled_level:
+        return False
+    return _module_logger(module).isEnabledFor(level)
 
 
-def log_error(message: str, module: str = 'CORE') -> None:
-    """Логирование ошибки"""
-    logger = get_logger(module)
-    logger.error(message)
+def _log_event(level: int, message: str, args: tuple, module: str,
+               category: Optional[str], fields: Dict[str, Any]) -> None:
+    """Запись с категорией и полями события (в JSON - отдельные поля)"""
+    if category is not None and _sampler is not None and level < logging.WARNING:
+        suppressed = _sampler.allow(category)
+        if suppressed is None:
+            return
+        if suppressed:
+            fields['suppressed'] = suppressed
+    _module_logger(module).log(level, message, *args, extra={'category': category, 'fields': fields})
 
 
-def log_debug(message: str, module: str = 'CORE') -> None:
+# Единый интерфейс логирования для всех модулей.
+# Аргументы в стиле %: log_info("Событие %s - %s", name, direction, module='SMTP') -
+# строка собирается, только если уровень включен (и уже в потоке записи логов).
+# Массовые записи событий помечаются категорией и полями:
+# log_info("Событие сохранено: %s", name, module='SMTP', category='ingest', employee=name) -
+# категории ingest/delivery/filter проходят выборку ([Logging] sample_*, rate_limit_*),
+# предупреждения и ошибки пишутся всегда.
+
+def log_debug(message: str, *args: Any, module: str = 'CORE', category: Optional[str] = None,
+              **fields: Any) -> None:
     """Логирование отладочной информации"""
-    logger = get_logger(module)
-    logger.debug(message)
+    if _logger_instance is not None and logging.DEBUG < _enabled_level:
+        return
+    if category is None and not fields:
+        _module_logger(module).debug(message, *args)
+    else:
+        _log_event(logging.DEBUG, message, args, module, category, fields)
+
+
+def log_info(message: str, *args: Any, module: str = 'CORE', category: Optional[str] = None,
+             **fields: Any) -> None:
+    """Логирование информационного сообщения"""
+    if _logger_instance is not None and logging.INFO < _enabled_level:
+        return
+    if category is None and not fields:
+        _module_logger(module).info(message, *args)
+    else:
+        _log_event(logging.INFO, message, args, module, category, fields)
+
+
+def log_warning(message: str, *args: Any, module: str = 'CORE', category: Optional[str] = None,
+                **fields: Any) -> None:
+    """Логирование предупреждения"""
+    if _logger_instance is not None and logging.WARNING < _enabled_level:
+        return
+    if category is None and not fields:
+        _module_logger(module).warning(message, *args)
+    else:
+        _log_event(logging.WARNING, message, args, module, category, fields)
+
+
+def log_error(message: str, *args: Any, module: str = 'CORE', category: Optional[str] = None,
+              **fields: Any) -> None:
+    """Логирование ошибки"""
+    if category is None and not fields:
+        _module_logger(module).error(message, *args)
+    else:
+        _log_event(logging.ERROR, message, args, module, category, fields)
 
 
-def log_telegram(message: str) -> None:
+def log_telegram(message: str, *args: Any, **fields: Any) -> None:
     """Логирование Telegram событий"""
-    log_info(message, 'Telegram')
+    log_info(message, *args, module='Telegram', **fields)
 
 
-def log_smtp(message: str) -> None:
+def log_smtp(message: str, *args: Any, **fields: Any) -> None:
     """Логирование SMTP событий"""
-    log_info(message, 'SMTP') 
\ No newline at end of file
+    log_info(message, *args, module='SMTP', **fields)
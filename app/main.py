@@ -8,19 +8,30 @@ if __name__ == '__main__':
 import threading
 import logging
 import signal
+import io
 from aiosmtpd.controller import Controller
 from aiosmtpd.handlers import Message
 from email.message import EmailMessage
-import telebot
 import re
 from datetime import datetime
 import time
-import requests
-import urllib3
-from user_manager import UserManager
+from user_manager import UserManager, classify_delivery_error
 from database import init_database
-from events_database import init_events_database, EventsCleanupScheduler
-from config import get_telegram_token, get_logging_level, get_admin_ids, get_users_database_path, get_events_database_path, get_events_retention_days, get_cleanup_enabled, get_cleanup_time, get_logging_backup_logs_count
+from events_database import init_events_database
+from digest import DigestManager, MIN_DIGEST_WINDOW, MAX_DIGEST_WINDOW
+from dispatcher import UpdateDispatcher
+from report_service import ReportService, ReportQueueFull
+from report_cache import ReportCache
+from shift_pairing import ShiftRules, to_datetime
+from report_generator import generate_html_report, get_report_filename, get_range_report_filename, format_range_name, render_day_blocks, pack_report
+from daily_aggregates import DailyAggregates, split_date_range, month_presets, rules_key
+from report_warmup import ReportWarmer
+from scheduler import JobScheduler
+from startup import StartupTimer, run_parallel, STARTUP_CHECK_TIMEOUT
+from bot_menu import BotMenuSync, AUTHORIZED_COMMANDS
+# telebot, aiohttp (bot_pool, telegram_client, webhook) и bulk_reports импортируются при первом
+# использовании: SMTP открывается до загрузки клиентов Telegram
+from config import get_telegram_tokens, get_logging_level, get_admin_ids, get_users_database_path, get_events_database_path, get_events_retention_days, get_cleanup_enabled, get_cleanup_time, get_logging_backup_logs_count, get_telegram_client_settings, get_delivery_settings, get_webhook_settings, get_dispatcher_settings, get_report_settings, get_shift_pairing_settings, get_report_warmup_settings, get_scheduler_settings, get_logging_queue_settings, get_logging_format_settings, get_logging_rotation_settings, add_reload_listener, changed_settings, ConfigWatcher
 
 def get_version():
     """Читает версию из файла VERSION"""
@@ -53,8 +64,9 @@ if os.name == 'nt':  # Windows
     # Устанавливаем заголовок окна консоли
     os.system('title OrionEventsToTelegram - Мониторинг УРВ')
 
-# Получаем токен из переменных окружения
-TELEGRAM_BOT_TOKEN = get_telegram_token()
+# Получаем токены ботов (первый - основной бот)
+TELEGRAM_BOT_TOKENS = get_telegram_tokens()
+TELEGRAM_BOT_TOKEN = TELEGRAM_BOT_TOKENS[0]
 ADMIN_IDS = get_admin_ids()
 DATABASE_PATH = get_users_database_path()
 
@@ -63,7 +75,7 @@ LOGGING_LEVEL = get_logging_level()
 BACKUP_LOGS_COUNT = get_logging_backup_logs_count()
 
 # Импортируем функции логирования (инициализация будет в main)
-from logger import log_info, log_warning, log_error, log_debug, log_telegram, log_smtp
+from logger import log_info, log_warning, log_error, log_debug, log_telegram, log_smtp, shutdown_logger, get_logging_metrics, set_logging_level
 
 # Глобальная переменная для контроля завершения бота
 stop_bot = False
@@ -71,31 +83,93 @@ stop_bot = False
 # Глобальная переменная для менеджера пользователей
 user_manager = None
 
-# Глобальная переменная для планировщика очистки событий
-events_cleanup_scheduler = None
+# Планировщик фоновых задач (очистка, сжатие базы, сводки, прогрев кеша)
+job_scheduler = None
+
+# Проверка изменений config.ini
+config_watcher = None
+
+# Глобальная переменная для менеджера дайджестов
+digest_manager = None
+
+# Глобальная переменная для асинхронного Telegram клиента
+telegram_client = None
+
+# Глобальная переменная для пула ботов (сервис доставки сообщений)
+delivery_service = None
+
+# Общий менеджер базы событий (используется обработчиками команд)
+events_database = None
+
+# Глобальная переменная для сервиса отчетов
+report_service = None
+
+# Глобальная переменная для кеша готовых отчетов
+report_cache = None
+
+# Дневные сводки событий (отчеты за произвольный период)
+daily_aggregates = None
+
+# Ночной прогрев кеша отчетов
+report_warmer = None
+
+# Глобальная переменная для диспетчера обновлений
+update_dispatcher = None
+
+# Синхронизация меню команд ботов (хеши примененных меню в db/bot_menu.json)
+menu_sync = None
+
+# Событие остановки long polling
+polling_stop_event = threading.Event()
+
+# Одновременно формируется не больше одного пакетного отчета
+bulk_report_lock = threading.Lock()
+
+# Ограничение Bot API на размер отправляемого файла
+TELEGRAM_DOCUMENT_LIMIT = 50 * 1024 * 1024
 
 def signal_handler(signum, frame):
     """Обработчик сигналов для корректного завершения"""
-    global stop_bot, events_cleanup_scheduler
+    global stop_bot, job_scheduler
     
     # Проверяем, был ли уже запрос на выход
     if hasattr(signal_handler, 'exit_requested'):
         log_warning("Подтверждено завершение работы...", module='CORE')
         stop_bot = True
+        polling_stop_event.set()
+        
+        if config_watcher:
+            config_watcher.stop()
+        
+        # Останавливаем планировщик фоновых задач (ожидание прерывается сразу, прогрев отменяется)
+        if job_scheduler:
+            try:
+                job_scheduler.stop()
+            except Exception as e:
+                log_error(f"❌ Ошибка остановки планировщика задач: {e}", module='CORE')
         
-        # Останавливаем планировщик очистки событий с таймаутом
-        if events_cleanup_scheduler:
+        # Отправляем накопленные дайджесты
+        if digest_manager:
             try:
-                log_info("🛑 Остановка планировщика очистки событий...", module='CORE')
-                events_cleanup_scheduler.stop()
-                log_info("✅ Планировщик очистки событий остановлен", module='CORE')
+                digest_manager.stop()
             except Exception as e:
-                log_error(f"❌ Ошибка остановки планировщика очистки: {e}", module='CORE')
+                log_error(f"❌ Ошибка остановки менеджера дайджестов: {e}", module='CORE')
+        
+        # Останавливаем обработчики команд и формирование отчетов
+        if update_dispatcher:
+            update_dispatcher.stop()
+        if report_service:
+            report_service.stop()
+        
+        # Дожидаемся отправки очередей доставки и закрываем клиенты всех ботов
+        if delivery_service:
+            delivery_service.stop()
         
         # Небольшая пауза для завершения потоков
         time.sleep(0.5)
         
         log_info("✅ Приложение завершено", module='CORE')
+        shutdown_logger()  # Дописываем очередь логов: os._exit не ждет потоков
         os._exit(0)  # Принудительное завершение
     else:
         # Первый запрос на выход
@@ -136,13 +210,13 @@ def signal_handler(signum, frame):
 def log_message(level, message, module='CORE'):
     """Логирование сообщений с указанием уровня"""
     if level == 'INFO':
-        log_info(message, module)
+        log_info(message, module=module)
     elif level == 'WARNING':
-        log_warning(message, module)
+        log_warning(message, module=module)
     elif level == 'ERROR':
-        log_error(message, module)
+        log_error(message, module=module)
     elif level == 'DEBUG':
-        log_debug(message, module)
+        log_debug(message, module=module)
 
 def process_string(s):
     # Извлекаем время (часы и минуты)
@@ -193,15 +267,75 @@ def is_admin(user_id: int) -> bool:
     """Проверка, является ли пользователь администратором"""
     return user_id in ADMIN_IDS
 
+def notify_admins(text, exclude=None):
+    """Отправка уведомления всем администраторам через очереди доставки"""
+    if delivery_service is None:
+        return
+    for admin_id in ADMIN_IDS:
+        if admin_id != exclude:
+            delivery_service.submit(admin_id, text)
+
+def handle_delivery_failure(user_id, error):
+    """Учет неустранимой ошибки доставки и приостановка недоступных чатов"""
+    from telegram_client import TelegramAPIError
+    if user_manager is None or not isinstance(error, TelegramAPIError):
+        return
+    error_class = classify_delivery_error(error.error_code, error.description)
+    if error_class is None:
+        return
+    if user_manager.record_delivery_failure(user_id, error_class, error.description):
+        log_warning(f"⏸ Доставка пользователю {user_id} приостановлена: {error.description}", module='Telegram')
+        notify_admins(
+            f"⏸ Доставка уведомлений пользователю {user_id} приостановлена\n"
+            f"Причина: {error_class} ({error.description})\n"
+            "Доставка возобновится, когда пользователь снова отправит /start.",
+            exclude=user_id
+        )
+
+def handle_delivery_recovery(user_id):
+    """Сброс счетчиков ошибок после успешной доставки"""
+    if user_manager is not None:
+        user_manager.reset_delivery_failures(user_id)
+
 class SMTPHandler(Message):
-    def __init__(self, bot=None, user_manager=None, events_db=None):
+    def __init__(self, bot=None, user_manager=None, events_db=None, digest_manager=None, delivery=None, report_cache=None):
         super().__init__()
         self.bot = bot
         self.user_manager = user_manager
         self.events_db = events_db
+        self.report_cache = report_cache
+        self.digest_manager = digest_manager
+        self.delivery = delivery
+        # SMTP открывается раньше клиентов Telegram: события, принятые до attach(),
+        # сохраняются в базу, а рассылка откладывается (поток SMTP не блокируется)
+        self.delivery_ready = threading.Event()
+        self._pending_lock = threading.Lock()
+        self._pending = []
+        if bot or delivery:
+            self.delivery_ready.set()
+    
+    def attach(self, bot, digest_manager, delivery):
+        """Подключение сервиса доставки после запуска клиентов Telegram; рассылка отложенных событий"""
+        self.bot = bot
+        self.digest_manager = digest_manager
+        self.delivery = delivery
+        sent = 0
+        # События, пришедшие во время рассылки отложенных, тоже попадают в список: порядок сохраняется
+        while True:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+                if not pending:
+                    self.delivery_ready.set()
+                    break
+            for msg_text, employee_name in pending:
+                self._fan_out(msg_text, employee_name)
+            sent += len(pending)
+        if sent:
+            log_info("📨 Разосланы события, принятые до запуска Telegram: %d", sent, module='SMTP')
     
     def handle_message(self, message):
-        log_smtp("📧 Получено новое email сообщение")
+        started = time.monotonic()
+        log_smtp("📧 Получено новое email сообщение", category='ingest')
         log_debug("DEBUG: Начало обработки SMTP сообщения", module='SMTP')
         
         # Декодируем тело сообщения
@@ -227,8 +361,8 @@ class SMTPHandler(Message):
         employee_match = re.search(r'Сотрудник:(.+)', body)
         employee_name = employee_match.group(1).strip() if employee_match else "Неизвестный сотрудник"
         
-        log_smtp(f"👤 Обработка события: {employee_name}")
-        log_debug(f"📧 Полное содержимое email: {body}", module='SMTP')
+        log_smtp("👤 Обработка события: %s", employee_name, category='ingest', employee=employee_name)
+        log_debug("📧 Полное содержимое email: %s", body, module='SMTP')
         
         # Сохраняем событие в базу данных
         if self.events_db:
@@ -258,42 +392,80 @@ class SMTPHandler(Message):
                         processed_message=processed_message
                     )
                     if success:
-                        log_info(f"💾 Событие сохранено в базу данных: {employee_name} - {direction}", module='EventsDatabase')
+                        log_info("💾 Событие сохранено в базу данных: %s - %s", employee_name, direction, module='EventsDatabase',
+                                 category='ingest', employee=employee_name, direction=direction,
+                                 latency_ms=round((time.monotonic() - started) * 1000, 1))
+                        # Отчеты по сотруднику устарели
+                        if self.report_cache:
+                            self.report_cache.invalidate_employee(employee_name)
                     else:
-                        log_error(f"❌ Ошибка сохранения события в базу данных: {employee_name}", module='EventsDatabase')
+                        log_error("❌ Ошибка сохранения события в базу данных: %s", employee_name, module='EventsDatabase',
+                                  category='ingest', employee=employee_name)
                 else:
-                    log_warning(f"⚠️  Неполные данные для сохранения события: сотрудник='{employee_name}', направление='{direction}', дата='{event_date}', время='{event_time}'", module='EventsDatabase')
+                    log_warning("⚠️  Неполные данные для сохранения события: сотрудник='%s', направление='%s', дата='%s', время='%s'",
+                                employee_name, direction, event_date, event_time, module='EventsDatabase')
             except Exception as e:
-                log_error(f"❌ Ошибка обработки события для базы данных: {e}", module='EventsDatabase')
+                log_error("❌ Ошибка обработки события для базы данных: %s", e, module='EventsDatabase')
         
         # Отправляем только тело сообщения в Telegram
         msg_text = body
         log_debug("DEBUG: Подготовка к отправке в Telegram", module='SMTP')
-
+        
+        # handle_message выполняется в цикле событий aiosmtpd: ожидание здесь задержало бы все сессии
+        with self._pending_lock:
+            if not self.delivery_ready.is_set():
+                self._pending.append((msg_text, employee_name))
+                log_info("⏳ Событие принято до запуска Telegram, рассылка после подключения сервиса доставки",
+                         module='SMTP')
+                return
+        self._fan_out(msg_text, employee_name)
+    
+    def _fan_out(self, msg_text, employee_name):
+        """Рассылка события авторизованным пользователям (очереди доставки или дайджест)"""
         if self.user_manager:
-            authorized_users = self.user_manager.get_authorized_users()
+            # Приостановленные чаты пропускаем, не тратя на них запросы к API
+            authorized_users = self.user_manager.get_active_users()
         else:
             authorized_users = get_authorized_users()
         
-        log_info(f"Отправка сообщения {len(authorized_users)} авторизованным пользователям", module='Telegram')
-        log_debug(f"📋 Список авторизованных пользователей: {authorized_users}", module='Telegram')
+        # Окна дайджеста читаем один раз на событие
+        digest_windows = self.user_manager.get_user_digest_windows() if self.user_manager else {}
+        
+        log_info("Отправка сообщения %d авторизованным пользователям", len(authorized_users), module='Telegram',
+                 category='delivery', employee=employee_name, recipients=len(authorized_users))
+        log_debug("📋 Список авторизованных пользователей: %s", authorized_users, module='Telegram')
         
         for user_id in authorized_users:
             try:
                 # Проверяем, нужно ли отправлять сообщение пользователю
                 if self.user_manager and self.user_manager.should_send_message(user_id, msg_text):
-                    if self.bot:
+                    window = digest_windows.get(user_id)
+                    if window and self.digest_manager:
+                        # Пользователь в режиме дайджеста - откладываем отправку
+                        self.digest_manager.add(user_id, process_string(msg_text), window)
+                        log_info("Сообщение добавлено в дайджест пользователя %s", user_id, module='Telegram',
+                                 category='delivery', employee=employee_name, user_id=user_id)
+                    elif self.delivery:
+                        # Очередь чата сохраняет порядок, разные чаты отправляются параллельно
+                        self.delivery.submit(user_id, process_string(msg_text))
+                        log_info("Сообщение поставлено в очередь для пользователя %s", user_id, module='Telegram',
+                                 category='delivery', employee=employee_name, user_id=user_id)
+                    elif self.bot:
                         self.bot.send_message(user_id, process_string(msg_text))
-                        log_info(f"Сообщение отправлено пользователю {user_id}", module='Telegram')
+                        log_info("Сообщение отправлено пользователю %s", user_id, module='Telegram',
+                                 category='delivery', employee=employee_name, user_id=user_id)
                     else:
-                        log_error(f"Бот не инициализирован для отправки сообщения пользователю {user_id}", module='Telegram')
+                        log_error("Бот не инициализирован для отправки сообщения пользователю %s", user_id, module='Telegram')
                 else:
-                    log_info(f"Сообщение отфильтровано для пользователя {user_id}", module='Telegram')
+                    log_info("Сообщение отфильтровано для пользователя %s", user_id, module='Telegram',
+                             category='filter', employee=employee_name, user_id=user_id)
                     
             except Exception as e:
-                log_error(f"Ошибка при отправке сообщения пользователю {user_id}: {e}", module='Telegram')
+                log_error("Ошибка при отправке сообщения пользователю %s: %s", user_id, e, module='Telegram',
+                          category='delivery', employee=employee_name, user_id=user_id)
 
-def start_smtp_server(bot=None, user_manager=None, events_db=None):
+def start_smtp_server(handler, started=None):
+    """Поток SMTP сервера; started устанавливается, когда порт открыт"""
     log_info("🚀 Запуск SMTP сервера...", module='SMTP')
     log_debug("DEBUG: Инициализация SMTP сервера", module='SMTP')
     
@@ -307,12 +479,13 @@ def start_smtp_server(bot=None, user_manager=None, events_db=None):
     else:
         log_debug("DEBUG: aiosmtpd логи включены", module='SMTP')
     
-    handler = SMTPHandler(bot, user_manager, events_db)
     controller = Controller(handler, hostname='127.0.0.1', port=1025)
     
     try:
         controller.start()
         log_info("✅ SMTP сервер запущен на localhost:1025", module='SMTP')
+        if started:
+            started.set()
         # Держим поток активным
         while True:
             time.sleep(1)  # Небольшая пауза для снижения нагрузки на CPU
@@ -328,64 +501,134 @@ def start_smtp_server(bot=None, user_manager=None, events_db=None):
             log_error(f"Ошибка при остановке SMTP сервера: {e}", module='SMTP')
 
 def clear_bot_menu(bot):
-    """Очищает бургер меню бота"""
+    """Пустое меню в области по умолчанию (запросы к API - только если оно еще не очищено)"""
     try:
-        # Принудительно удаляем все команды
-        bot.delete_my_commands()
-        # Также очищаем команды для всех языков
-        bot.delete_my_commands(scope=None, language_code=None)
-        log_info("🧹 Бургер меню очищено", module='Telegram')
+        if menu_sync.sync(bot):
+            log_info("🧹 Бургер меню очищено", module='Telegram')
+        else:
+            log_debug("Бургер меню уже очищено", module='Telegram')
     except Exception as e:
         log_error(f"❌ Ошибка очистки бургер меню: {e}", module='Telegram')
 
-def set_authorized_menu(bot):
-    """Устанавливает бургер меню для авторизованных пользователей"""
-    try:
-        from telebot.types import BotCommand
-        
-        commands = [
-            BotCommand("report", "📊 Сформировать отчет по сотруднику"),
-            BotCommand("filter", "🔍 Установить фильтр по фамилии"),
-            BotCommand("unfilter", "❌ Отключить фильтр"),
-            BotCommand("start", "🔄 Перезапуск бота")
-        ]
-        
-        # Сначала очищаем все команды
-        bot.delete_my_commands()
-        bot.delete_my_commands(scope=None, language_code=None)
-        
-        # Затем устанавливаем новые команды
-        bot.set_my_commands(commands, scope=None, language_code=None)
-        
-        # Принудительно обновляем для всех языков
-        for lang_code in ['ru', 'en']:
-            try:
-                bot.set_my_commands(commands, scope=None, language_code=lang_code)
-            except Exception:
-                pass  # Игнорируем ошибки для конкретных языков
-        
-        log_info("✅ Бургер меню для авторизованных пользователей установлено", module='Telegram')
-    except Exception as e:
-        log_error(f"❌ Ошибка установки бургер меню: {e}", module='Telegram')
+def restore_user_menus():
+    """Меню в чатах всех авторизованных пользователей (при запуске; уже примененные пропускаются)"""
+    requested = 0
+    for user_id in user_manager.get_authorized_users():
+        # Бот, которому пользователь писал: другой бот не может установить меню в незнакомом чате
+        requested += menu_sync.request(delivery_service.bot_for(user_id).bot, user_id)
+    if requested:
+        log_info("📋 Бургер меню будет установлено пользователям: %d", requested, module='Telegram')
+
+def set_authorized_menu(bot, user_id):
+    """Бургер меню в чате авторизованного пользователя (устанавливается с задержкой, если изменилось)"""
+    if menu_sync.request(bot, user_id):
+        log_info("📋 Бургер меню для пользователя %s будет обновлено", user_id, module='Telegram')
 
-def start_telegram_bot(bot, user_manager):
+def start_telegram_bot(bot, user_manager, telegram_client=None, secondary_bots=None):
+    """Регистрация обработчиков и прием обновлений (проверки API и меню - в main, параллельно)"""
+    import requests
+    import urllib3
     log_info("🤖 Запуск Telegram бота...", module='Telegram')
     
-    # Проверка подключения к Telegram API
-    check_telegram_bot(bot)
+    register_bot_handlers(bot, user_manager)
+    webhook_settings = get_webhook_settings()
     
-    # Очищаем бургер меню при старте
-    clear_bot_menu(bot)
+    # Дополнительные боты пула опрашивают Telegram в своих потоках
+    for extra_bot, extra_client in secondary_bots or []:
+        register_bot_handlers(extra_bot, user_manager)
+        if telegram_client and not webhook_settings['enabled']:
+            threading.Thread(target=run_client_polling, args=(extra_bot, extra_client), daemon=True).start()
     
-    # Проверяем, что команды действительно очищены
-    try:
-        current_commands = bot.get_my_commands()
-        if current_commands:
-            log_warning(f"⚠️  Обнаружены старые команды: {[cmd.command for cmd in current_commands]}", module='Telegram')
+    log_info("✅ Telegram бот запущен", module='Telegram')
+    
+    # Сообщение о готовности сервера после запуска всех модулей
+    log_info("📧 SMTP сервер слушает на localhost:1025", module='SMTP')
+    log_info("🤖 Telegram бот активен и готов к работе", module='Telegram')
+    log_info("🚀 Сервер готов и работает! Все модули запущены успешно.", module='CORE')
+    log_info("⏳ Ожидание входящих сообщений от ОРИОН...", module='CORE')
+    
+    # Глобальная переменная для контроля завершения
+    global stop_bot
+    stop_bot = False
+    
+    if telegram_client and webhook_settings['enabled']:
+        run_webhook([(bot, telegram_client)] + list(secondary_bots or []), webhook_settings)
+        return
+    
+    if telegram_client:
+        run_client_polling(bot, telegram_client)
+        return
+    
+    delay = 5  # стартовая задержка между попытками (сек)
+    
+    while not stop_bot:
+        try:
+            # Используем более короткий timeout для быстрого реагирования на сигналы
+            bot.infinity_polling(timeout=5, long_polling_timeout=5, skip_pending=True)
+        except requests.exceptions.ReadTimeout as e:
+            if stop_bot:
+                break
+            log_warning(f"ReadTimeout: {e}. Повтор через {delay} сек.", module='Telegram')
+            # Используем более короткие интервалы для быстрого реагирования на остановку
+            for _ in range(delay):
+                if stop_bot:
+                    break
+                time.sleep(1)
+            delay = min(delay * 2, 300)  # увеличиваем задержку до 5 минут максимум
+        except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError) as e:
+            if stop_bot:
+                break
+            log_warning(f"Проблема с подключением к Telegram API: {e}", module='Telegram')
+            log_info("Проверьте интернет-соединение и доступность api.telegram.org", module='Telegram')
+            # Используем более короткие интервалы для быстрого реагирования на остановку
+            for _ in range(delay):
+                if stop_bot:
+                    break
+                time.sleep(1)
+            delay = min(delay * 2, 300)
+        except (urllib3.exceptions.ConnectTimeoutError, urllib3.exceptions.NameResolutionError) as e:
+            if stop_bot:
+                break
+            log_warning(f"Ошибка DNS/соединения: {e}", module='Telegram')
+            log_info("Проверьте интернет-соединение и DNS", module='Telegram')
+            # Используем более короткие интервалы для быстрого реагирования на остановку
+            for _ in range(delay):
+                if stop_bot:
+                    break
+                time.sleep(1)
+            delay = min(delay * 2, 300)
+        except KeyboardInterrupt:
+            log_warning("Получен сигнал прерывания в Telegram боте", module='Telegram')
+            break
+        except Exception as e:
+            if stop_bot:
+                break
+            import traceback
+            log_error(f"Неожиданная ошибка в Telegram боте: {e}", module='Telegram')
+            if LOGGING_LEVEL == 'DEBUG':
+                traceback.print_exc()
+            # Используем более короткие интервалы для быстрого реагирования на остановку
+            for _ in range(delay):
+                if stop_bot:
+                    break
+                time.sleep(1)
+            delay = min(delay * 2, 300)
         else:
-            log_info("✅ Команды успешно очищены", module='Telegram')
-    except Exception as e:
-        log_error(f"❌ Ошибка проверки команд: {e}", module='Telegram')
+            delay = 5  # если всё прошло хорошо, сбрасываем задержку
+
+def assigned_bot_hint(bot, user_id):
+    """Подсказка, если уведомления пользователю отправляет другой бот пула"""
+    from bot_pool import get_bot_id
+    if not delivery_service or len(delivery_service.instances) < 2:
+        return ""
+    # Пользователь переезжает на бот кольца после /start в нем (до этого пишет прежний бот)
+    target = delivery_service.target_for(user_id)
+    if target.bot_id == get_bot_id(bot.token):
+        return ""
+    return f"\n\nℹ️ Уведомления вам отправляет бот {target.label} - откройте его и отправьте /start."
+
+def register_bot_handlers(bot, user_manager):
+    """Регистрирует обработчики команд на боте (для каждого бота пула)"""
     
     @bot.message_handler(commands=['start'])
     def handle_start(message):
@@ -393,17 +636,20 @@ def start_telegram_bot(bot, user_manager):
         log_telegram(f"Команда /start от пользователя {user_id}")
         
         if user_manager.is_authorized(user_id):
+            # Повторный /start возобновляет приостановленную доставку
+            if user_manager.reactivate_user(user_id):
+                log_info(f"▶️ Доставка пользователю {user_id} возобновлена по команде /start", module='Telegram')
+                notify_admins(f"▶️ Доставка уведомлений пользователю {user_id} возобновлена", exclude=user_id)
+            
+            # /start в боте кольца: теперь он может писать пользователю, переносим привязку
+            from bot_pool import get_bot_id
+            if delivery_service.target_for(user_id).bot_id == get_bot_id(bot.token):
+                delivery_service.assign(user_id)
+            
             # Для авторизованных пользователей - перезапуск бота
-            bot.reply_to(message, "🔄 Бот перезапущен! Используйте команды из меню для работы.")
+            bot.reply_to(message, "🔄 Бот перезапущен! Используйте команды из меню для работы." + assigned_bot_hint(bot, user_id))
             # Устанавливаем меню для авторизованного пользователя
-            set_authorized_menu(bot)
-            
-            # Проверяем установку команд
-            try:
-                current_commands = bot.get_my_commands()
-                log_info(f"📋 Установленные команды: {[cmd.command for cmd in current_commands]}", module='Telegram')
-            except Exception as e:
-                log_error(f"❌ Ошибка проверки установленных команд: {e}", module='Telegram')
+            set_authorized_menu(bot, user_id)
         else:
             # Для неавторизованных пользователей - приветствие
             welcome_text = (
@@ -433,6 +679,10 @@ def start_telegram_bot(bot, user_manager):
         )
         
         if request_id:
+            # Ответ на заявку придет через этот бот: пользователь его открыл
+            from bot_pool import get_bot_id
+            delivery_service.pin(user_id, get_bot_id(bot.token))
+            
             # Отправляем уведомления администраторам
             for admin_id in ADMIN_IDS:
                 try:
@@ -455,12 +705,13 @@ def start_telegram_bot(bot, user_manager):
                         user_info += f"Фамилия: {message.from_user.last_name}\n"
                     user_info += f"Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
                     
-                    bot.send_message(admin_id, user_info, reply_markup=keyboard)
-                    log_info(f"Уведомление отправлено администратору {admin_id}", module='Telegram')
+                    # Администратору пишет его собственный бот пула
+                    delivery_service.submit(admin_id, user_info, reply_markup=keyboard.to_dict())
+                    log_info(f"Уведомление поставлено в очередь администратору {admin_id}", module='Telegram')
                 except Exception as e:
                     log_error(f"Ошибка отправки уведомления администратору {admin_id}: {e}", module='Telegram')
             
-            bot.reply_to(message, "Ваш запрос на авторизацию отправлен администраторам. Ожидайте ответа.")
+            bot.reply_to(message, "Ваш запрос на авторизацию отправлен администраторам. Ожидайте ответа." + assigned_bot_hint(bot, user_id))
         else:
             bot.reply_to(message, "Ошибка создания запроса на авторизацию. Попробуйте позже.")
 
@@ -487,6 +738,52 @@ def start_telegram_bot(bot, user_manager):
             log_info(f"Попытка отключить несуществующий фильтр от пользователя {message.from_user.id}", module='Telegram')
             bot.reply_to(message, "У вас не было установлено фильтра.")
 
+    @bot.message_handler(commands=['digest'])
+    def handle_digest(message):
+        user_id = message.from_user.id
+        log_telegram(f"Настройка дайджеста от пользователя {user_id}")
+        
+        if not user_manager.is_authorized(user_id):
+            bot.reply_to(message, "Дайджест доступен только авторизованным пользователям.")
+            return
+        
+        args = message.text.split(maxsplit=1)
+        if len(args) != 2:
+            window = user_manager.get_user_digest(user_id)
+            if window:
+                bot.reply_to(message, f"📬 Дайджест включен: события отправляются раз в {window} сек.\n"
+                                      "Отключить: /digest 0")
+            else:
+                bot.reply_to(message, f"Используйте: /digest секунды ({MIN_DIGEST_WINDOW}-{MAX_DIGEST_WINDOW}), "
+                                      "0 - отключить дайджест")
+            return
+        
+        value = args[1].strip().lower()
+        if value in ('0', 'off'):
+            if digest_manager:
+                digest_manager.flush_user(user_id)
+            if user_manager.remove_user_digest(user_id):
+                bot.reply_to(message, "Дайджест отключен. События снова приходят по одному.")
+            else:
+                bot.reply_to(message, "Дайджест не был включен.")
+            return
+        
+        try:
+            window = int(value)
+        except ValueError:
+            bot.reply_to(message, "Неверный формат. Укажите количество секунд, например: /digest 30")
+            return
+        
+        if not MIN_DIGEST_WINDOW <= window <= MAX_DIGEST_WINDOW:
+            bot.reply_to(message, f"Окно дайджеста должно быть от {MIN_DIGEST_WINDOW} до {MAX_DIGEST_WINDOW} секунд.")
+            return
+        
+        if user_manager.set_user_digest(user_id, window):
+            log_info(f"Дайджест {window} сек. установлен для пользователя {user_id}", module='Telegram')
+            bot.reply_to(message, f"📬 Дайджест включен: события будут приходить одним сообщением раз в {window} сек.")
+        else:
+            bot.reply_to(message, "Не удалось включить дайджест. Попробуйте позже.")
+
     @bot.message_handler(commands=['add_user'])
     def handle_add_user(message):
         user_id = message.from_user.id
@@ -511,16 +808,10 @@ def start_telegram_bot(bot, user_manager):
                 return
                 
             if user_manager.add_authorized_user(target_user_id, added_by=user_id):
-                bot.reply_to(message, f"Пользователь {target_user_id} успешно добавлен.")
-                # Устанавливаем бургер меню для авторизованного пользователя
-                set_authorized_menu(bot)
-                
-                # Проверяем установку команд
-                try:
-                    current_commands = bot.get_my_commands()
-                    log_info(f"📋 Установленные команды после добавления пользователя: {[cmd.command for cmd in current_commands]}", module='Telegram')
-                except Exception as e:
-                    log_error(f"❌ Ошибка проверки установленных команд: {e}", module='Telegram')
+                # Пользователь мог ни разу не писать ботам: привязка и меню - после его /start
+                user_bot = delivery_service.target_for(target_user_id)
+                bot.reply_to(message, f"Пользователь {target_user_id} успешно добавлен. "
+                                      f"Ему нужно открыть бот {user_bot.label} и отправить /start.")
             else:
                 bot.reply_to(message, f"Пользователь {target_user_id} уже авторизован или произошла ошибка.")
                 
@@ -540,12 +831,15 @@ def start_telegram_bot(bot, user_manager):
             return
         
         try:
-            # Принудительно обновляем меню
-            clear_bot_menu(bot)
-            set_authorized_menu(bot)
+            # Принудительно обновляем меню: сохраненные хеши бота сбрасываются, меню пользователей
+            # установится заново при их следующем /start
+            from telebot.types import BotCommandScopeChat
+            menu_sync.invalidate(bot)
+            menu_sync.sync(bot, force=True)
+            menu_sync.sync(bot, user_id, AUTHORIZED_COMMANDS, force=True)
             
             # Проверяем результат
-            current_commands = bot.get_my_commands()
+            current_commands = bot.get_my_commands(scope=BotCommandScopeChat(user_id))
             command_list = [cmd.command for cmd in current_commands]
             
             bot.reply_to(message, f"✅ Меню обновлено!\n\nУстановленные команды: {', '.join(command_list)}")
@@ -554,6 +848,17 @@ def start_telegram_bot(bot, user_manager):
             bot.reply_to(message, f"❌ Ошибка обновления меню: {e}")
             log_error(f"Ошибка принудительного обновления меню: {e}", module='Telegram')
 
+    @bot.message_handler(commands=['metrics'])
+    def handle_metrics(message):
+        user_id = message.from_user.id
+        
+        # Проверяем права администратора
+        if not is_admin(user_id):
+            bot.reply_to(message, "У вас нет прав для выполнения этой команды.")
+            return
+        
+        bot.reply_to(message, format_metrics())
+
     @bot.message_handler(commands=['list_users'])
     def handle_list_users(message):
         user_id = message.from_user.id
@@ -572,10 +877,12 @@ def start_telegram_bot(bot, user_manager):
             bot.reply_to(message, "Список авторизованных пользователей пуст.")
             return
         
+        suspended_users = user_manager.get_suspended_users()
         response = "📋 Список авторизованных пользователей:\n\n"
         for user in users:
             name = f"{user['first_name'] or ''} {user['last_name'] or ''}".strip() or user['username'] or f"User{user['user_id']}"
-            response += f"• {user['user_id']}: {name}\n"
+            mark = " ⏸ доставка приостановлена" if user['user_id'] in suspended_users else ""
+            response += f"• {user['user_id']}: {name}{mark}\n"
         
         bot.reply_to(message, response)
 
@@ -613,16 +920,16 @@ def start_telegram_bot(bot, user_manager):
             notification_text = f"✅ Ваша заявка на авторизацию {status_text}!"
             if approved:
                 notification_text += "\n\nТеперь вы можете получать уведомления о событиях УРВ."
+                # Ответ отправляет бот, через который подана заявка (закреплен в /auth):
+                # бот кольца не может писать первым, переезд - после /start в нем
+                user_bot = delivery_service.bot_for(target_user_id)
+                target_bot = delivery_service.target_for(target_user_id)
+                if target_bot.bot_id != user_bot.bot_id:
+                    notification_text += (f"\n\nℹ️ Уведомления будет отправлять бот {target_bot.label} - "
+                                          f"откройте его и отправьте /start.")
                 # Устанавливаем бургер меню для авторизованного пользователя
-                set_authorized_menu(bot)
-                
-                # Проверяем установку команд
-                try:
-                    current_commands = bot.get_my_commands()
-                    log_info(f"📋 Установленные команды после авторизации: {[cmd.command for cmd in current_commands]}", module='Telegram')
-                except Exception as e:
-                    log_error(f"❌ Ошибка проверки установленных команд: {e}", module='Telegram')
-            bot.send_message(target_user_id, notification_text)
+                set_authorized_menu(user_bot.bot, target_user_id)
+            delivery_service.submit(target_user_id, notification_text)
             
             # Обновляем сообщение администратора
             status_emoji = "✅" if approved else "❌"
@@ -641,21 +948,29 @@ def start_telegram_bot(bot, user_manager):
     def handle_report(message):
         args = message.text.split(maxsplit=1)
         if len(args) != 2:
-            bot.reply_to(message, "Используйте: /report <фамилия или часть фамилии>")
+            bot.reply_to(message, "Используйте: /report <фамилия или часть фамилии> [ГГГГ-ММ-ДД..ГГГГ-ММ-ДД]")
+            return
+        try:
+            surname, date_range = split_date_range(args[1])
+        except ValueError as e:
+            bot.reply_to(message, f"❌ {e}")
+            return
+        if not surname:
+            bot.reply_to(message, "Используйте: /report <фамилия или часть фамилии> [ГГГГ-ММ-ДД..ГГГГ-ММ-ДД]")
             return
-        surname = args[1].strip()
         
         # Получаем полное имя сотрудника из базы данных
-        from app.config import get_events_database_path
-        from app.events_database import EventsDatabaseManager
-        db_path = get_events_database_path()
-        events_db = EventsDatabaseManager(db_path)
-        full_name = get_full_employee_name(events_db, surname)
+        full_name = get_full_employee_name(events_database, surname)
         
         if not full_name:
             bot.reply_to(message, f"Сотрудник с фамилией '{surname}' не найден в базе данных.")
             return
         
+        # Период указан в команде - отчет сразу, без выбора
+        if date_range is not None:
+            submit_report(message.chat.id, full_name, date_range=date_range)
+            return
+        
         from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
         keyboard = InlineKeyboardMarkup()
         keyboard.add(
@@ -663,8 +978,56 @@ def start_telegram_bot(bot, user_manager):
             InlineKeyboardButton("3 месяца", callback_data=f"report_period:{surname}:90"),
             InlineKeyboardButton("6 месяцев", callback_data=f"report_period:{surname}:180")
         )
+        # Календарные месяцы: текущий и два предыдущих
+        month_buttons = []
+        for date_from, date_to in month_presets():
+            callback_data = f"report_range:{surname}:{date_from.strftime('%Y%m%d')}:{date_to.strftime('%Y%m%d')}"
+            # Telegram ограничивает callback_data 64 байтами
+            if len(callback_data.encode('utf-8')) <= 64:
+                month_buttons.append(InlineKeyboardButton(format_range_name(date_from, date_to).capitalize(),
+                                                          callback_data=callback_data))
+        if month_buttons:
+            keyboard.add(*month_buttons)
         bot.reply_to(message, f"Выберите период для отчета по сотруднику: {full_name}", reply_markup=keyboard)
 
+    def submit_report(chat_id, full_surname, days=None, date_range=None):
+        """Ставит отчет в очередь сервиса отчетов (или отдает из кеша) и отправляет его в чат"""
+        def send_report(report, error):
+            if error is not None:
+                bot.send_message(chat_id, "❌ Ошибка формирования отчета. Попробуйте позже.")
+                return
+            if report is None:
+                bot.send_message(chat_id, f"Нет событий по сотруднику '{full_surname}' за выбранный период.")
+                return
+            html_content, filename = report
+            # Большие отчеты упаковываются согласно [Reports] compress
+            report_settings = get_report_settings()
+            document, filename = pack_report(html_content, filename, report_settings['compress'],
+                                             report_settings['compress_threshold_kb'])
+            # Отчет уходит из памяти (BytesIO), без временного файла
+            bot.send_document(chat_id, document, caption=f"ОТЧЕТ УРВ по сотруднику: {full_surname}", visible_file_name=filename)
+        
+        if date_range is None:
+            # Повторный запрос без новых событий отдается из кеша сразу
+            cache_key = get_report_cache_key(full_surname, days)
+            cached = report_cache.get(cache_key) if report_cache and cache_key else None
+            if cached is not None:
+                send_report(cached, None)
+                return
+            job_key = (full_surname, days)
+        else:
+            job_key = (full_surname,) + tuple(date_range)
+        
+        try:
+            position, joined = report_service.submit(job_key, (full_surname, days, date_range), send_report)
+        except ReportQueueFull:
+            bot.send_message(chat_id, "⏳ Сейчас формируется слишком много отчетов. Попробуйте через несколько минут.")
+            return
+        if joined:
+            bot.send_message(chat_id, "⏳ Такой отчет уже формируется - пришлю его, как только он будет готов.")
+        elif position > 0:
+            bot.send_message(chat_id, f"⏳ Отчет поставлен в очередь, позиция: {position}.")
+
     @bot.callback_query_handler(func=lambda call: call.data.startswith('report_period:'))
     def handle_report_period(call):
         try:
@@ -674,122 +1037,219 @@ def start_telegram_bot(bot, user_manager):
             bot.answer_callback_query(call.id, "Ошибка выбора периода.")
             return
         bot.answer_callback_query(call.id, "Формирую отчет...")
-        # Получаем путь к БД событий
-        from app.config import get_events_database_path
-        from app.events_database import EventsDatabaseManager
-        db_path = get_events_database_path()
-        events_db = EventsDatabaseManager(db_path)
+        chat_id = call.message.chat.id
         # Получаем полное имя сотрудника из базы данных
-        full_surname = get_full_employee_name(events_db, surname)
-        events = events_db.get_events_by_employee_and_period(full_surname, days)
-        if not events:
-            bot.send_message(call.message.chat.id, f"Нет событий по сотруднику '{full_surname}' за выбранный период.")
+        full_surname = get_full_employee_name(events_database, surname)
+        if not full_surname:
+            bot.send_message(chat_id, f"Сотрудник с фамилией '{surname}' не найден в базе данных.")
             return
-        # Генерируем HTML-отчет
-        html_content = generate_html_report(events, full_surname, days)
-        # Определяем дату конца периода для имени файла
-        from datetime import datetime
-        events_sorted = sorted(events, key=lambda e: e['event_timestamp'])
-        if events_sorted:
-            last_event = events_sorted[-1]
-            ts = last_event['event_timestamp']
-            if isinstance(ts, str):
-                try:
-                    ts_dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-                except Exception:
-                    ts_dt = datetime.fromisoformat(ts)
-            else:
-                ts_dt = ts
-            date_to = ts_dt.date()
-        else:
-            from datetime import date as dtdate
-            date_to = dtdate.today()
-        filename = get_report_filename(full_surname, days, date_to)
-        # Сохраняем во временный файл
-        import tempfile
-        with tempfile.NamedTemporaryFile('w', delete=False, suffix='.html', encoding='utf-8') as tmp:
-            tmp.write(html_content)
-            tmp_path = tmp.name
-        # Отправляем файл
-        with open(tmp_path, 'rb') as f:
-            bot.send_document(call.message.chat.id, f, caption=f"ОТЧЕТ УРВ по сотруднику: {full_surname}", visible_file_name=filename)
-        # Удаляем временный файл
-        import os
-        os.remove(tmp_path)
+        submit_report(chat_id, full_surname, days=days)
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith('report_range:'))
+    def handle_report_range(call):
+        try:
+            _, surname, date_from, date_to = call.data.split(':')
+            date_range = (datetime.strptime(date_from, '%Y%m%d').date(), datetime.strptime(date_to, '%Y%m%d').date())
+        except Exception:
+            bot.answer_callback_query(call.id, "Ошибка выбора периода.")
+            return
+        bot.answer_callback_query(call.id, "Формирую отчет...")
+        chat_id = call.message.chat.id
+        full_surname = get_full_employee_name(events_database, surname)
+        if not full_surname:
+            bot.send_message(chat_id, f"Сотрудник с фамилией '{surname}' не найден в базе данных.")
+            return
+        submit_report(chat_id, full_surname, date_range=date_range)
+
+    @bot.message_handler(commands=['report_all'])
+    def handle_report_all(message):
+        user_id = message.from_user.id
+        
+        # Проверяем права администратора
+        if not is_admin(user_id):
+            bot.reply_to(message, "У вас нет прав для выполнения этой команды.")
+            return
+        
+        from bulk_reports import parse_period
+        args = message.text.split(maxsplit=2)
+        days = parse_period(args[1]) if len(args) > 1 else None
+        if days is None:
+            bot.reply_to(message, "Используйте: /report_all <период> [начало фамилии]\n"
+                                  "Период - число дней (30, 90, 180) или месяцы (1m, 3m, 6m)")
+            return
+        name_prefix = args[2].strip() if len(args) > 2 else ''
+        
+        if not bulk_report_lock.acquire(blocking=False):
+            bot.reply_to(message, "⏳ Пакетный отчет уже формируется. Дождитесь его завершения.")
+            return
+        # Блокировку снимает run_bulk_report; если поток не запустился - снимаем здесь
+        try:
+            status = bot.reply_to(message, "⏳ Пакетный отчет: подготовка...")
+            # Долгая задача выполняется вне пула обработчиков команд
+            threading.Thread(target=run_bulk_report, args=(bot, message.chat.id, status.message_id, days, name_prefix),
+                             name='BulkReport', daemon=True).start()
+        except Exception:
+            bulk_report_lock.release()
+            raise
 
     # Обработчик ошибок Telegram
     @bot.message_handler(func=lambda message: True)
     def handle_all_messages(message):
         log_telegram(f"Получено сообщение от пользователя {message.from_user.id}: {message.text}")
 
-    log_info("✅ Telegram бот запущен", module='Telegram')
+def is_priority_update(update):
+    """Ответы администраторов на заявки авторизации обрабатываются вне очереди"""
+    call = update.callback_query
+    return call is not None and (call.data or '').startswith('auth_') and is_admin(call.from_user.id)
+
+def dispatch_updates(bot, updates):
+    """Передает обновления в пул обработчиков; без запущенного пула обновления отбрасываются"""
+    if update_dispatcher and update_dispatcher.running:
+        update_dispatcher.dispatch(bot, updates)
+        return
+    # Вызов идет из цикла событий клиента (long polling, webhook): обработчики на месте
+    # обращаются к API через тот же цикл и ждут результат - цикл блокируется навсегда
+    log_warning("⚠️  Пул обработчиков не запущен (завершение работы), отброшено обновлений: %d",
+                len(updates), module='Telegram')
+
+def run_client_polling(bot, telegram_client):
+    """Long polling через асинхронный клиент с передачей обновлений обработчикам telebot"""
+    from telebot.types import Update
+    from webhook import delete_webhook
     
-    # Сообщение о готовности сервера после запуска всех модулей
-    log_info("📧 SMTP сервер слушает на localhost:1025", module='SMTP')
-    log_info("🤖 Telegram бот активен и готов к работе", module='Telegram')
-    log_info("🚀 Сервер готов и работает! Все модули запущены успешно.", module='CORE')
-    log_info("⏳ Ожидание входящих сообщений от ОРИОН...", module='CORE')
+    def on_updates(updates):
+        dispatch_updates(bot, [Update.de_json(update) for update in updates])
     
-    delay = 5  # стартовая задержка между попытками (сек)
+    # Активный webhook блокирует getUpdates (ошибка 409)
+    telegram_client.submit(delete_webhook(telegram_client.client)).result()
     
-    # Глобальная переменная для контроля завершения
-    global stop_bot
-    stop_bot = False
+    polling_settings = get_telegram_client_settings()
+    future = telegram_client.submit(telegram_client.client.poll_updates(
+        on_updates,
+        polling_stop_event,
+        polling_timeout=polling_settings['polling_timeout'],
+        skip_pending=True
+    ))
     
-    while not stop_bot:
+    # Ждем короткими интервалами, чтобы обработчик сигналов срабатывал сразу
+    while not future.done():
         try:
-            # Используем более короткий timeout для быстрого реагирования на сигналы
-            bot.infinity_polling(timeout=5, long_polling_timeout=5, skip_pending=True)
-        except requests.exceptions.ReadTimeout as e:
-            if stop_bot:
-                break
-            log_warning(f"ReadTimeout: {e}. Повтор через {delay} сек.", module='Telegram')
-            # Используем более короткие интервалы для быстрого реагирования на остановку
-            for _ in range(delay):
-                if stop_bot:
-                    break
-                time.sleep(1)
-            delay = min(delay * 2, 300)  # увеличиваем задержку до 5 минут максимум
-        except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError) as e:
-            if stop_bot:
-                break
-            log_warning(f"Проблема с подключением к Telegram API: {e}", module='Telegram')
-            log_info("Проверьте интернет-соединение и доступность api.telegram.org", module='Telegram')
-            # Используем более короткие интервалы для быстрого реагирования на остановку
-            for _ in range(delay):
-                if stop_bot:
-                    break
-                time.sleep(1)
-            delay = min(delay * 2, 300)
-        except (urllib3.exceptions.ConnectTimeoutError, urllib3.exceptions.NameResolutionError) as e:
-            if stop_bot:
-                break
-            log_warning(f"Ошибка DNS/соединения: {e}", module='Telegram')
-            log_info("Проверьте интернет-соединение и DNS", module='Telegram')
-            # Используем более короткие интервалы для быстрого реагирования на остановку
-            for _ in range(delay):
-                if stop_bot:
-                    break
-                time.sleep(1)
-            delay = min(delay * 2, 300)
-        except KeyboardInterrupt:
-            log_warning("Получен сигнал прерывания в Telegram боте", module='Telegram')
-            break
-        except Exception as e:
-            if stop_bot:
+            future.result(timeout=1)
+        except Exception:
+            if future.done():
                 break
-            import traceback
-            log_error(f"Неожиданная ошибка в Telegram боте: {e}", module='Telegram')
-            if LOGGING_LEVEL == 'DEBUG':
-                traceback.print_exc()
-            # Используем более короткие интервалы для быстрого реагирования на остановку
-            for _ in range(delay):
-                if stop_bot:
-                    break
-                time.sleep(1)
-            delay = min(delay * 2, 300)
-        else:
-            delay = 5  # если всё прошло хорошо, сбрасываем задержку
+    
+    if future.exception():
+        log_error(f"Неожиданная ошибка в Telegram боте: {future.exception()}", module='Telegram')
+
+def run_webhook(bots, settings):
+    """Прием обновлений через webhook для всех ботов пула"""
+    import secrets
+    from telebot.types import Update
+    from bot_pool import get_bot_id
+    from webhook import WebhookServer, set_webhook
+    
+    # Без заданного секрета генерируем новый при каждом запуске - Telegram получает его в setWebhook
+    secret_token = settings['secret_token'] or secrets.token_urlsafe(32)
+    server = WebhookServer(settings['listen_host'], settings['listen_port'], settings['path'], secret_token)
+    server_client = bots[0][1]
+    
+    paths = []
+    for bot, client in bots:
+        def on_updates(updates, bot=bot):
+            dispatch_updates(bot, [Update.de_json(update) for update in updates])
+        paths.append(server.add_bot(get_bot_id(bot.token), on_updates))
+    
+    try:
+        server_client.submit(server.start()).result()
+    except OSError as e:
+        log_error(f"❌ Не удалось запустить webhook сервер: {e}. Используется long polling.", module='Webhook')
+        for bot, client in bots[1:]:
+            threading.Thread(target=run_client_polling, args=(bot, client), daemon=True).start()
+        run_client_polling(*bots[0])
+        return
+    
+    # Регистрация webhook повторяется в фоне, пока Telegram недоступен
+    for (bot, client), path in zip(bots, paths):
+        client.submit(set_webhook(client.client, settings['url'] + path, secret_token, polling_stop_event))
+    
+    # Ждем короткими интервалами, чтобы обработчик сигналов срабатывал сразу
+    while not polling_stop_event.wait(1):
+        pass
+    
+    try:
+        server_client.submit(server.stop()).result(timeout=3)
+    except Exception as e:
+        log_warning(f"Ошибка остановки webhook сервера: {e}", module='Webhook')
+
+def format_metrics():
+    """Текстовая сводка метрик для администраторов"""
+    lines = ["📈 Метрики доставки"]
+    shard_metrics = delivery_service.get_metrics() if delivery_service else []
+    if not shard_metrics:
+        lines.append("Сервис доставки не запущен")
+    for m in shard_metrics:
+        lines.append(
+            f"{m['bot']} / шард {m['shard']}: очередь {m['depth']} ({m['chats']} чат.), в работе {m['in_flight']}, "
+            f"отправлено {m['sent']}, ошибок {m['failed']}, повторов {m['retried']}, "
+            f"задержка avg {m['latency_avg_ms']} мс / p95 {m['latency_p95_ms']} мс / max {m['latency_max_ms']} мс"
+        )
+    
+    if report_service:
+        r = report_service.get_metrics()
+        lines.append("")
+        lines.append(f"📊 Отчеты: в очереди {r['queued']}, формируется {r['running']}, "
+                     f"готово {r['completed']}, объединено запросов {r['deduplicated']}")
+    if report_cache:
+        c = report_cache.get_metrics()
+        lines.append(f"🗃️ Кеш отчетов: попаданий {c['hit_rate']}% (память {c['memory_hits']}, диск {c['disk_hits']}, "
+                     f"промахов {c['misses']}), записей в памяти {c['memory_items']}, на диске {c['disk_items']}")
+    job_metrics = job_scheduler.get_metrics() if job_scheduler else []
+    if job_metrics:
+        lines.append("")
+        lines.append("🕐 Фоновые задачи")
+    for m in job_metrics:
+        last_run = m['last_started'].strftime('%d.%m %H:%M') if m['last_started'] else 'не запускалась'
+        state = 'выполняется' if m['running'] else f"следующий запуск {m['next_run'].strftime('%d.%m %H:%M')}"
+        lines.append(
+            f"{m['name']} ({m['spec']}): {m['runs']} раз, ошибок {m['errors']}, последний {last_run}, "
+            f"длительность last {m['last_duration']} / avg {m['avg_duration']} / max {m['max_duration']} сек, {state}"
+        )
+    if report_warmer and report_warmer.last_run:
+        w = report_warmer.last_run
+        lines.append(f"🌙 Прогрев кеша {w['finished'].strftime('%d.%m %H:%M')}: сотрудников {w['employees']}, "
+                     f"сформировано {w['rendered']}, уже в кеше {w['skipped']}, ошибок {w['errors']}, "
+                     f"{w['elapsed']:.1f} сек")
+    
+    log_metrics = get_logging_metrics()
+    if log_metrics:
+        lines.append("")
+        lines.append(f"📝 Очередь логов: {log_metrics['queued']} из {log_metrics['queue_size']}, "
+                     f"потеряно {log_metrics['dropped']} (при переполнении: {log_metrics['policy']})")
+        skipped = {category: log_metrics['sampled_out'][category] + log_metrics['rate_limited'][category]
+                   for category in log_metrics['sampled_out']}
+        if any(skipped.values()):
+            lines.append("   Пропущено выборкой: " + ", ".join(f"{category} {count}" for category, count in skipped.items()))
+        if log_metrics['rotations'] or log_metrics['deleted']:
+            lines.append(f"   Ротаций файла: {log_metrics['rotations']}, сжато {log_metrics['compressed']}, "
+                         f"удалено старых {log_metrics['deleted']}")
+    
+    if menu_sync:
+        m = menu_sync.get_metrics()
+        lines.append(f"📋 Меню команд: областей {m['scopes']}, ожидают {m['pending']}, "
+                     f"запросов к API {m['api_calls']}, без изменений {m['skipped']}")
+    
+    command_metrics = update_dispatcher.get_metrics() if update_dispatcher else []
+    if command_metrics:
+        lines.append("")
+        lines.append(f"⚙️ Обработчики команд (в очереди: {update_dispatcher.pending_count()})")
+    for m in command_metrics:
+        lines.append(
+            f"{m['command']}: {m['count']} раз, ошибок {m['errors']}, "
+            f"ожидание avg {m['queue_avg_ms']} / max {m['queue_max_ms']} мс, "
+            f"выполнение avg {m['run_avg_ms']} / max {m['run_max_ms']} мс"
+        )
+    return "\n".join(lines)
 
 def check_configuration():
     """Проверка конфигурации приложения"""
@@ -799,6 +1259,7 @@ def check_configuration():
     if not TELEGRAM_BOT_TOKEN or TELEGRAM_BOT_TOKEN == "YOUR_BOT_TOKEN":
         log_error("❌ Не установлен токен Telegram бота в config.ini", module='CORE')
         log_error("   Добавьте ваш токен в секцию [Telegram] -> bot_token", module='CORE')
+        shutdown_logger()
         os._exit(1)
     
     # Проверка администраторов
@@ -815,6 +1276,7 @@ def check_configuration():
             log_info(f"📁 Создана папка для базы данных: {db_dir}", module='CORE')
     except Exception as e:
         log_error(f"❌ Ошибка доступа к базе данных: {e}", module='CORE')
+        shutdown_logger()
         os._exit(1)
     
     log_info("✅ Конфигурация корректна", module='CORE')
@@ -833,13 +1295,17 @@ def check_smtp_server():
         if result == 0:
             log_error("❌ Порт 1025 уже занят другим процессом", module='SMTP')
             log_error("   Остановите другие приложения, использующие порт 1025", module='SMTP')
+            shutdown_logger()
             os._exit(1)
     except Exception as e:
         log_error(f"❌ Ошибка проверки порта SMTP: {e}", module='SMTP')
+        shutdown_logger()
         os._exit(1)
 
 def check_telegram_bot(bot):
     """Проверка подключения к Telegram API"""
+    import requests
+    import urllib3
     try:
         # Пробуем получить информацию о боте
         bot_info = bot.get_me()
@@ -856,6 +1322,12 @@ def check_telegram_bot(bot):
         log_error("   Проверьте токен бота и интернет-соединение", module='Telegram')
         return False
 
+def log_events_statistics(events_db):
+    """Статистика базы событий в лог (полный просмотр таблицы - выполняется параллельно с запуском)"""
+    stats = events_db.get_statistics()
+    log_info(f"📊 Статистика событий: {stats['total_events']} записей, {stats['unique_employees']} сотрудников", module='CORE')
+    return stats
+
 def get_full_employee_name(events_db, surname):
     """Получение полного имени сотрудника из базы данных"""
     try:
@@ -880,272 +1352,133 @@ def get_full_employee_name(events_db, surname):
         log_error(f"Ошибка получения полного имени сотрудника: {e}", module='EventsDatabase')
         return surname
 
-def generate_html_report(events, surname, days):
-    from datetime import datetime, timedelta, date
-    from collections import defaultdict, OrderedDict
-    import os
-    today = date.today()
-    yesterday = today - timedelta(days=1)
-    
-    # Получаем текущее время для подвала
-    generation_time = datetime.now().strftime('%d.%m.%Y в %H:%M')
-    
-    # Преобразуем все event_timestamp к datetime
-    for event in events:
-        ts = event['event_timestamp']
-        if isinstance(ts, str):
-            try:
-                ts_dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-            except Exception:
-                ts_dt = datetime.fromisoformat(ts)
-        else:
-            ts_dt = ts
-        event['ts_dt'] = ts_dt
-    # Сортируем события по времени
-    events_sorted = sorted(events, key=lambda e: e['ts_dt'])
-    # Сначала формируем все пары вход-выход
-    pairs = []
-    incomplete_shifts = []  # Для неполных смен в старых днях
-    i = 0
-    n = len(events_sorted)
-    while i < n:
-        ev = events_sorted[i]
-        if ev['direction'].lower() == 'вход':
-            entry = ev
-            entry_date = entry['ts_dt'].date()
-            # ищем ближайший выход после входа
-            exit_ev = None
-            for j in range(i+1, n):
-                if events_sorted[j]['direction'].lower() == 'выход':
-                    exit_ev = events_sorted[j]
-                    break
-            if exit_ev:
-                # Полная пара вход-выход
-                pairs.append((entry, exit_ev))
-                i = events_sorted.index(exit_ev, i+1) + 1
-            else:
-                # Нет выхода
-                if entry_date >= yesterday:
-                    # Для текущего и вчерашнего дня - пропускаем незавершенные смены
-                    i += 1
-                else:
-                    # Для более старых дней - добавляем как неполную смену
-                    incomplete_shifts.append((entry, None))
-                    i += 1
-        else:
-            i += 1
-    # Группируем пары по дате входа
-    day_blocks = OrderedDict()
-    total_in = total_out = work_days = 0
-    total_work_time = timedelta()
-    weekday_ru = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
+# Настройки, которые читаются при запуске: изменения вступают в силу после перезапуска
+RESTART_SETTINGS = {
+    'get_telegram_tokens', 'get_users_database_path', 'get_events_database_path', 'get_events_retention_days',
+    'get_cleanup_enabled', 'get_cleanup_time', 'get_scheduler_settings', 'get_logging_backup_logs_count',
+    'get_logging_queue_settings', 'get_logging_rotation_settings', 'get_logging_format_settings',
+    'get_telegram_client_settings', 'get_delivery_settings', 'get_webhook_settings', 'get_dispatcher_settings',
+    'get_report_warmup_settings'
+}
+
+def handle_config_reload(old, new):
+    """Применение измененного config.ini (вызывается из потока ConfigWatcher)"""
+    global ADMIN_IDS
+    changed = changed_settings(old, new)
+    if not changed:
+        return
+    log_info("🔄 config.ini перечитан, изменены: %s", ', '.join(changed), module='CORE')
+    if 'get_admin_ids' in changed:
+        ADMIN_IDS = get_admin_ids()
+    if 'get_logging_level' in changed:
+        set_logging_level(get_logging_level())
+    # Правила смен и упаковка отчетов читаются при каждом отчете
+    delayed = [name for name in changed if name in RESTART_SETTINGS]
+    if delayed:
+        log_warning("⚠️  Изменения %s вступят в силу после перезапуска", ', '.join(delayed), module='CORE')
+
+def get_shift_rules():
+    """Правила сопоставления смен из config.ini"""
+    settings = get_shift_pairing_settings()
+    return ShiftRules(
+        incomplete_grace_days=settings['incomplete_grace_days'],
+        max_shift_hours=settings['max_shift_hours'] or None
+    )
+
+def get_report_cache_key(full_surname, days):
+    """Ключ кеша отчета: (сотрудник, начало, конец периода, последний ID события, правила смен)"""
+    version = events_database.get_employee_period_version(full_surname, days)
+    if version is None:
+        return None
+    # Правила смен меняются на лету: отчет, собранный по прежним правилам, не должен выдаваться из кеша
+    rules = get_shift_rules()
+    return (full_surname,) + version + (f"{rules_key(rules)}|{rules.incomplete_grace_days}",)
+
+def build_employee_report(full_surname, days, date_range=None):
+    """Формирует HTML-отчет по сотруднику (или берет из кеша); None, если событий за период нет"""
+    if date_range is not None:
+        return build_range_report(full_surname, *date_range)
+    cache_key = get_report_cache_key(full_surname, days) if report_cache else None
+    if cache_key:
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            return cached
     
-    # Обрабатываем полные пары
-    for entry, exit_ev in pairs:
-        entry_date = entry['ts_dt'].date()
-        if entry_date not in day_blocks:
-            day_blocks[entry_date] = {
-                'weekday': entry['ts_dt'].weekday(),
-                'work_time': timedelta(),
-                'events': [],
-                'weekday_str': weekday_ru[entry['ts_dt'].weekday()]
-            }
-        # Добавляем событие входа
-        day_blocks[entry_date]['events'].append({
-            'type': 'in', 
-            'time': entry['ts_dt'].strftime('%H:%M')
-        })
-        total_in += 1
-        # Добавляем событие выхода
-        out_time = exit_ev['ts_dt'].strftime('%H:%M')
-        # Проверяем, является ли это ночной сменой
-        is_night_shift = exit_ev['ts_dt'].date() != entry['ts_dt'].date()
-        day_blocks[entry_date]['events'].append({
-            'type': 'out', 
-            'time': out_time,
-            'is_night_shift': is_night_shift
-        })
-        total_out += 1
-        # Считаем рабочее время
-        delta = exit_ev['ts_dt'] - entry['ts_dt']
-        if delta.total_seconds() > 0:
-            day_blocks[entry_date]['work_time'] += delta
+    report = render_employee_report(full_surname, days)
+    if report is not None and cache_key:
+        report_cache.put(cache_key, report)
+    return report
+
+def render_employee_report(full_surname, days):
+    """Формирует HTML-отчет по сотруднику без обращения к кешу: (html, имя файла) или None"""
+    events = events_database.get_events_by_employee_and_period(full_surname, days)
+    if not events:
+        return None
+    # Генерируем HTML-отчет
+    html_content = generate_html_report(events, full_surname, days, get_shift_rules())
+    # Определяем дату конца периода для имени файла
+    events_sorted = sorted(events, key=lambda e: e['event_timestamp'])
+    date_to = to_datetime(events_sorted[-1]['event_timestamp']).date()
+    filename = get_report_filename(full_surname, days, date_to)
+    return html_content, filename
+
+def build_range_report(full_surname, date_from, date_to):
+    """Отчет за произвольный период из дневных сводок; None, если смен за период нет"""
+    day_blocks = daily_aggregates.get_day_blocks(full_surname, date_from, date_to, get_shift_rules())
+    if not day_blocks:
+        return None
+    html_content = ''.join(render_day_blocks(day_blocks, full_surname, (date_from, date_to)))
+    return html_content, get_range_report_filename(full_surname, date_from, date_to)
+
+def run_bulk_report(bot, chat_id, status_message_id, days, name_prefix):
+    """Формирует пакетный отчет и отправляет zip; прогресс обновляется в одном сообщении"""
+    from bulk_reports import build_bulk_reports, get_bulk_filename
     
-    # Обрабатываем неполные смены (только для старых дней)
-    for entry, exit_ev in incomplete_shifts:
-        entry_date = entry['ts_dt'].date()
-        if entry_date not in day_blocks:
-            day_blocks[entry_date] = {
-                'weekday': entry['ts_dt'].weekday(),
-                'work_time': timedelta(),
-                'events': [],
-                'weekday_str': weekday_ru[entry['ts_dt'].weekday()]
-            }
-        # Добавляем событие входа с пометкой
-        day_blocks[entry_date]['events'].append({
-            'type': 'in', 
-            'time': entry['ts_dt'].strftime('%H:%M')
-        })
-        total_in += 1
-        # Добавляем пометку о том, что нет выхода
-        day_blocks[entry_date]['events'].append({
-            'type': 'no_exit', 
-            'time': 'Нет выхода'
-        })
+    def show_progress(done, total):
+        try:
+            bot.edit_message_text(f"⏳ Пакетный отчет: {done} из {total} сотрудников", chat_id, status_message_id)
+        except Exception as e:
+            log_debug("Не удалось обновить прогресс пакетного отчета: %s", e, module='BulkReports')
     
-    # Формируем строки времени и статистику
-    for d in day_blocks:
-        work_time = day_blocks[d]['work_time']
-        work_time_str = f"{work_time.seconds//3600}ч {(work_time.seconds%3600)//60}м" if work_time else "-"
-        day_blocks[d]['work_time_str'] = work_time_str
-        if work_time_str != '-':
-            work_days += 1
-            try:
-                h, m = [int(x[:-1]) for x in work_time_str.split()]
-                total_work_time += timedelta(hours=h, minutes=m)
-            except Exception:
-                pass
-    # Сортируем дни по убыванию
-    sorted_dates = sorted(day_blocks.keys(), reverse=True)
-    # Для периода
-    if sorted_dates:
-        period_start = min(sorted_dates)
-        period_end = max(sorted_dates)
-    else:
-        period_start = period_end = today
-    # Детализация по дням
-    details = ""
-    for d in sorted_dates:
-        block = day_blocks[d]
-        events_in_block = block['events']
-        work_time_str = block['work_time_str']
-        weekday = block['weekday_str']
-        details += f"<div class='day-block'>"
-        details += f"<div class='day-header-row'><div class='day-header'><svg viewBox='0 0 24 24' fill='none' xmlns='http://www.w3.org/2000/svg'><path d='M19 3H5C3.89 3 3 3.89 3 5V19C3 20.11 3.89 21 5 21H19C20.11 21 21 20.11 21 19V5C21 3.89 20.11 3 19 3M19 19H5V9H19V19M19 7H5V5H19V7Z' fill='currentColor'/></svg>{d.strftime('%d.%m.%Y')} ({weekday})</div><div class='day-time'>{work_time_str}</div></div>"
-        details += "<table class='day-table'><tr><th>Время</th><th>Событие</th></tr>"
-        for ev in events_in_block:
-            if ev['type'] == 'in':
-                details += f"<tr><td class='time'><span class='time-value'>{ev['time']}</span></td><td class='event-in'><svg width='16' height='16' viewBox='0 0 24 24' fill='none' xmlns='http://www.w3.org/2000/svg'><path d='M8.59 16.59L13.17 12L8.59 7.41L10 6L16 12L10 18L8.59 16.59Z' fill='currentColor'/></svg>Вход</td></tr>"
-            elif ev['type'] == 'out':
-                night_shift_mark = ""
-                if ev.get('is_night_shift', False):
-                    night_shift_mark = "<span class='night-shift'>+1</span>"
-                details += f"<tr><td class='time'><span class='time-value'>{ev['time']}</span>{night_shift_mark}</td><td class='event-out'><svg width='16' height='16' viewBox='0 0 24 24' fill='none' xmlns='http://www.w3.org/2000/svg'><path d='M15.41 16.59L10.83 12L15.41 7.41L14 6L8 12L14 18L15.41 16.59Z' fill='currentColor'/></svg>Выход</td></tr>"
-            elif ev['type'] == 'no_exit':
-                details += f"<tr><td class='time'>-</td><td class='event-no-exit'><svg width='16' height='16' viewBox='0 0 24 24' fill='none' xmlns='http://www.w3.org/2000/svg'><path d='M12 2C6.48 2 2 6.48 2 12C2 17.52 6.48 22 12 22C17.52 22 22 17.52 22 12C22 6.48 17.52 2 12 2M12 20C7.59 20 4 16.41 4 12C4 7.59 7.59 4 12 4C16.41 4 20 7.59 20 12C20 16.41 16.41 20 12 20M12 6C10.9 6 10 6.9 10 8C10 9.1 10.9 10 12 10C13.1 10 14 9.1 14 8C14 6.9 13.1 6 12 6M12 12C10.9 12 10 12.9 10 14C10 15.1 10.9 16 12 16C13.1 16 14 15.1 14 14C14 12.9 13.1 12 12 12Z' fill='currentColor'/></svg>Нет выхода</td></tr>"
-        details += "</table></div>"
-    # Среднее время
-    avg_work_time = total_work_time / work_days if work_days else timedelta()
-    avg_hours = int(avg_work_time.total_seconds() // 3600)
-    avg_minutes = int((avg_work_time.total_seconds() % 3600) // 60)
-    # Определяем период строкой
-    if days == 30:
-        period = '1 месяц'
-    elif days == 90:
-        period = '3 месяца'
-    elif days == 180:
-        period = '6 месяцев'
-    else:
-        period = f'{days} дней'
-    # Читаем шаблон
-    template_path = os.path.join(os.path.dirname(__file__), 'templates', 'report_template.html')
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template = f.read()
-    html = template.replace('{{surname}}', surname)
-    html = html.replace('{{period}}', f"{period_start.strftime('%d.%m.%Y')} — {period_end.strftime('%d.%m.%Y')}")
-    html = html.replace('{{total_in}}', str(total_in))
-    html = html.replace('{{total_out}}', str(total_out))
-    html = html.replace('{{work_days}}', str(work_days))
-    html = html.replace('{{avg_hours}}', str(avg_hours))
-    html = html.replace('{{avg_minutes}}', str(avg_minutes))
-    html = html.replace('{{details}}', details)
-    html = html.replace('{{generation_time}}', generation_time)
-    return html
-
-def get_report_filename(surname, days, date_to):
-    # date_to — последний день периода (datetime)
-    if days == 30:
-        period = '1 месяц'
-    elif days == 90:
-        period = '3 месяца'
-    elif days == 180:
-        period = '6 месяцев'
-    else:
-        period = f'{days} дней'
-    safe_surname = surname.replace(' ', '_').replace('.', '.')
-    date_str = date_to.strftime('%Y-%m-%d')
-    return f"{date_str} {surname} отчет УРВ {period}.html"
+    try:
+        buffer = io.BytesIO()
+        stats = build_bulk_reports(events_database, days, buffer, name_prefix,
+                                   workers=get_report_settings()['bulk_workers'],
+                                   rules=get_shift_rules(), progress=show_progress)
+        if not stats['employees']:
+            bot.send_message(chat_id, "Нет событий за выбранный период.")
+            return
+        if buffer.tell() > TELEGRAM_DOCUMENT_LIMIT:
+            bot.send_message(chat_id, f"❌ Архив слишком большой для Telegram ({buffer.tell() // (1024 * 1024)} МБ). "
+                                      f"Сформируйте его командой: python app/bulk_reports.py {days} {name_prefix}".rstrip())
+            return
+        buffer.seek(0)
+        caption = f"📦 Отчеты УРВ: {stats['reports']} сотрудников за {days} дней"
+        if stats['errors']:
+            caption += f" (ошибок: {stats['errors']})"
+        bot.send_document(chat_id, buffer, caption=caption, visible_file_name=get_bulk_filename(days, name_prefix))
+    except Exception as e:
+        log_error(f"Ошибка пакетного отчета: {e}", module='BulkReports')
+        bot.send_message(chat_id, "❌ Ошибка формирования пакетного отчета. Попробуйте позже.")
+    finally:
+        bulk_report_lock.release()
 
 def main():
     try:
-        print("[DEBUG] Step 1: Starting main function...")
-        
-        # Для Windows используем простой логгер без сложных форматтеров
-        if os.name == 'nt':  # Windows
-            print("[DEBUG] Step 2: Windows detected, using simple logger...")
-            import logging
-            # Создаем директорию для логов если её нет
-            log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'log')
-            os.makedirs(log_dir, exist_ok=True)
-            
-            # Создаем простой логгер для Windows
-            logging.basicConfig(
-                level=logging.DEBUG,
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                handlers=[
-                    logging.StreamHandler(),
-                    logging.FileHandler(os.path.join(log_dir, 'windows_app.log'), encoding='utf-8')
-                ]
-            )
-            print("[DEBUG] Step 3: Simple Windows logger created")
-            
-            # Создаем простые функции логирования для Windows
-            def simple_log_info(message, module='CORE'):
-                print(f"[INFO] {module}: {message}")
-                logging.info(f"{module}: {message}")
-            
-            def simple_log_warning(message, module='CORE'):
-                print(f"[WARNING] {module}: {message}")
-                logging.warning(f"{module}: {message}")
-            
-            def simple_log_error(message, module='CORE'):
-                print(f"[ERROR] {module}: {message}")
-                logging.error(f"{module}: {message}")
-            
-            def simple_log_debug(message, module='CORE'):
-                print(f"[DEBUG] {module}: {message}")
-                logging.debug(f"{module}: {message}")
-            
-            # Заменяем функции логирования
-            global log_info, log_warning, log_error, log_debug
-            log_info = simple_log_info
-            log_warning = simple_log_warning
-            log_error = simple_log_error
-            log_debug = simple_log_debug
-            
-            # Также заменяем функции для других модулей
-            global log_telegram, log_smtp
-            log_telegram = lambda msg: simple_log_info(msg, 'Telegram')
-            log_smtp = lambda msg: simple_log_info(msg, 'SMTP')
-            
-            print("[DEBUG] Step 4: Windows logging functions created")
-        else:
-            # Для Unix систем используем обычный логгер
-            print("[DEBUG] Step 2: Unix detected, using normal logger...")
-            from logger import setup_logger
-            print("[DEBUG] Step 3: Logger imported successfully")
-            
-            print("[DEBUG] Step 4: Setting up logger...")
-            setup_logger(LOGGING_LEVEL, BACKUP_LOGS_COUNT)
-            print("[DEBUG] Step 5: Logger setup completed")
+        # Этапы запуска замеряются, разбивка пишется в лог после запуска всех модулей
+        timer = StartupTimer()
+        
+        # Логирование одинаково на всех платформах: очередь + поток записи
+        from logger import setup_logger
+        with timer.stage("логирование"):
+            queue_settings = get_logging_queue_settings()
+            setup_logger(LOGGING_LEVEL, BACKUP_LOGS_COUNT, queue_settings['queue_size'], queue_settings['queue_policy'],
+                         **get_logging_format_settings(), **get_logging_rotation_settings())
         
         # Получаем версию приложения
-        print("[DEBUG] Step 6: Getting version...")
         version = get_version()
-        print(f"[DEBUG] Step 7: Version = {version}")
         
         # Логотип без боковых рамок
-        print("[DEBUG] Step 8: Creating logo...")
         logo_art = f"""
 ╔════════════════════════════════════════════════════════════════╗
    OrionEventsToTelegram v{version}
@@ -1154,106 +1487,210 @@ def main():
   📊 Логирование: {LOGGING_LEVEL}
 ╚════════════════════════════════════════════════════════════════╝
 """
-        print("[DEBUG] Step 9: Printing logo...")
         print(logo_art)
-        print("[DEBUG] Step 10: Logo printed successfully")
         
-        print("[DEBUG] Step 11: Calling log_info...")
-        log_info("🚀 Запуск приложения OrionEventsToTelegram...", module='CORE')
-        print("[DEBUG] Step 12: log_info completed successfully")
+        log_info("🚀 Запуск приложения OrionEventsToTelegram v%s...", version, module='CORE')
         
         # Проверки конфигурации и модулей
-        check_configuration()
-        check_smtp_server()
-    
-        # Создаем бота
-        bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN)
-        
-        # Проверяем подключение к Telegram API
-        telegram_available = check_telegram_bot(bot)
-        if not telegram_available:
-            log_warning("Telegram бот будет работать в режиме восстановления", module='CORE')
+        with timer.stage("конфигурация"):
+            check_configuration()
+            check_smtp_server()
         
         # Устанавливаем обработчик сигналов
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
         
-        # Инициализация базы данных
-        print("[DEBUG] Step 13: Starting database initialization...")
-        log_info("🗄️  Инициализация базы данных...", module='CORE')
-        print("[DEBUG] Step 14: Calling init_database...")
-        db = init_database(DATABASE_PATH)
-        print("[DEBUG] Step 15: Database initialized successfully")
-        
-        # Создаем менеджер пользователей после инициализации БД
-        print("[DEBUG] Step 16: Creating UserManager...")
-        global user_manager
-        user_manager = UserManager(db)
-        print("[DEBUG] Step 17: UserManager created successfully")
-        log_info("✅ Менеджер пользователей инициализирован", module='CORE')
-
-        # Инициализация базы данных событий
-        print("[DEBUG] Step 18: Getting events database configuration...")
-        events_db_path = get_events_database_path()
-        events_retention_days = get_events_retention_days()
-        cleanup_enabled = get_cleanup_enabled()
-        cleanup_time = get_cleanup_time()
-        print(f"[DEBUG] Step 19: Events DB path = {events_db_path}")
-
-        print("[DEBUG] Step 20: Initializing events database...")
-        log_info(f"🗄️  Инициализация базы данных событий: {events_db_path}", module='CORE')
-        events_db = init_events_database(events_db_path)
-        print("[DEBUG] Step 21: Events database initialized successfully")
-        log_info("✅ База данных событий инициализирована", module='CORE')
-        
-        # Получаем статистику событий
-        print("[DEBUG] Step 22: Getting events statistics...")
-        stats = events_db.get_statistics()
-        print("[DEBUG] Step 23: Statistics obtained successfully")
-        log_info(f"📊 Статистика событий: {stats['total_events']} записей, {stats['unique_employees']} сотрудников", module='CORE')
-
-        # Инициализация планировщика очистки событий
-        global events_cleanup_scheduler
-        if cleanup_enabled:
-            log_info(f"🧹 Запуск планировщика очистки событий (время: {cleanup_time})", module='CORE')
-            events_cleanup_scheduler = EventsCleanupScheduler(events_db, events_retention_days, cleanup_time, cleanup_enabled)
-            events_cleanup_scheduler.start()
-            log_info("✅ Планировщик очистки событий запущен", module='CORE')
-        else:
-            log_info("🧹 Планировщик очистки событий отключен в конфигурации.", module='CORE')
-            events_cleanup_scheduler = None
+        with timer.stage("базы данных"):
+            # Инициализация базы данных
+            log_info("🗄️  Инициализация базы данных...", module='CORE')
+            db = init_database(DATABASE_PATH)
+            
+            # Создаем менеджер пользователей после инициализации БД
+            global user_manager
+            user_manager = UserManager(db, suspend_after_failures=get_delivery_settings()['suspend_after_failures'])
+            log_info("✅ Менеджер пользователей инициализирован", module='CORE')
+            
+            # Инициализация базы данных событий
+            events_db_path = get_events_database_path()
+            events_retention_days = get_events_retention_days()
+            cleanup_enabled = get_cleanup_enabled()
+            cleanup_time = get_cleanup_time()
+            
+            log_info(f"🗄️  Инициализация базы данных событий: {events_db_path}", module='CORE')
+            events_db = init_events_database(events_db_path)
+            global events_database
+            events_database = events_db
+            
+            # Кеш готовых отчетов (память + db/cache/)
+            global report_cache
+            report_settings = get_report_settings()
+            report_cache = ReportCache(
+                os.path.join(os.path.dirname(DATABASE_PATH), 'cache'),
+                memory_items=report_settings['cache_memory_items'],
+                disk_items=report_settings['cache_disk_items']
+            )
+            
+            # Дневные сводки для отчетов за произвольный период (пересчитываются при запросе)
+            global daily_aggregates
+            daily_aggregates = DailyAggregates(events_db)
+            log_info("✅ База данных событий инициализирована", module='CORE')
         
-        # Запускаем SMTP сервер с передачей бота, user_manager и events_db
-        smtp_thread = threading.Thread(target=start_smtp_server, args=(bot, user_manager, events_db))
-        smtp_thread.daemon = True  # Поток завершится при закрытии основного потока
-        smtp_thread.start()
-
-        # Удаляем поток проверки ввода, так как он создает конфликты
+        # SMTP открывается первым: ОРИОН доставляет события, пока запускаются клиенты Telegram.
+        # События сохраняются в базу сразу, рассылка ждет подключения сервиса доставки
+        with timer.stage("SMTP"):
+            smtp_handler = SMTPHandler(user_manager=user_manager, events_db=events_db, report_cache=report_cache)
+            smtp_started = threading.Event()
+            smtp_thread = threading.Thread(target=start_smtp_server, args=(smtp_handler, smtp_started))
+            smtp_thread.daemon = True  # Поток завершится при закрытии основного потока
+            smtp_thread.start()
+            if smtp_started.wait(STARTUP_CHECK_TIMEOUT):
+                timer.mark("прием SMTP")
+            else:
+                log_warning("⚠️  SMTP сервер не запустился за %d сек", STARTUP_CHECK_TIMEOUT, module='SMTP')
+        
+        with timer.stage("клиенты Telegram"):
+            # Пул ботов: у каждого токена свой клиент, ограничитель частоты и очереди доставки
+            from bot_pool import BotPool
+            global telegram_client, delivery_service
+            delivery_service = BotPool(
+                TELEGRAM_BOT_TOKENS,
+                get_telegram_client_settings(),
+                get_delivery_settings(),
+                on_failure=handle_delivery_failure,
+                on_recovery=handle_delivery_recovery
+            )
+            delivery_service.start()
+            bot = delivery_service.primary.bot
+            
+            # Запросы telebot всех ботов идут через пул соединений основного клиента (токен - в URL)
+            telegram_client = delivery_service.primary.runner
+            telegram_client.install_telebot_transport()
+            
+            # Привязка пользователей к ботам: при смене списка токенов часть пользователей переезжает
+            delivery_service.attach_user_manager(user_manager)
+            delivery_service.mark_failing(user_manager.get_users_with_delivery_failures())
+            
+            # Меню команд: запросы к API только при изменении набора команд области
+            global menu_sync
+            menu_sync = BotMenuSync(os.path.join(os.path.dirname(DATABASE_PATH), 'bot_menu.json'))
+            # Раньше меню было общим (область по умолчанию, очищается ниже): пользователи,
+            # авторизованные до перехода на меню по чатам, получают его без повторного /start
+            restore_user_menus()
+            
+            # Менеджер дайджестов отправляет накопленные события через очереди доставки
+            global digest_manager
+            digest_manager = DigestManager(send_func=delivery_service.submit)
+            digest_manager.start()
+            
+            # События, принятые во время запуска, уходят в очереди доставки
+            smtp_handler.attach(bot, digest_manager, delivery_service)
+        
+        # Независимые проверки - одновременно: подключение к Telegram API, меню ботов
+        # и статистика базы событий (полный просмотр таблицы); зависшая проверка не держит запуск
+        secondary_bots = [(instance.bot, instance.runner) for instance in delivery_service.instances[1:]]
+        checks = {"Telegram API": lambda: check_telegram_bot(bot),
+                  "меню бота": lambda: clear_bot_menu(bot),
+                  "статистика событий": lambda: log_events_statistics(events_db)}
+        for index, (extra_bot, _) in enumerate(secondary_bots, start=2):
+            checks[f"меню бота {index}"] = lambda extra_bot=extra_bot: clear_bot_menu(extra_bot)
+        with timer.stage("проверки"):
+            results = run_parallel(checks, STARTUP_CHECK_TIMEOUT, timer)
+        if results["Telegram API"] is False:
+            log_warning("Telegram бот будет работать в режиме восстановления", module='CORE')
+        
+        with timer.stage("фоновые службы"):
+            # Ночной прогрев кеша отчетами за 1/3/6 месяцев по активным сотрудникам (задача планировщика)
+            global report_warmer
+            warmup_settings = get_report_warmup_settings()
+            if warmup_settings['enabled']:
+                report_warmer = ReportWarmer(
+                    events_db, report_cache, render_employee_report, get_report_cache_key,
+                    active_days=warmup_settings['active_days'],
+                    workers=warmup_settings['workers']
+                )
+            else:
+                log_info("🌙 Прогрев кеша отчетов отключен в конфигурации.", module='CORE')
+            
+            # Планировщик фоновых задач: один поток, спит до ближайшей задачи
+            global job_scheduler
+            scheduler_settings = get_scheduler_settings()
+            job_scheduler = JobScheduler(os.path.join(os.path.dirname(DATABASE_PATH), 'scheduler.json'))
+            jitter = scheduler_settings['jitter_seconds']
+            catch_up = scheduler_settings['catch_up']
+            if cleanup_enabled:
+                job_scheduler.add_job('cleanup', lambda: events_db.cleanup_old_events(events_retention_days),
+                                      cleanup_time, jitter, catch_up)
+            else:
+                log_info("🧹 Автоматическая очистка событий отключена в конфигурации.", module='CORE')
+            if scheduler_settings['vacuum_schedule']:
+                job_scheduler.add_job('vacuum', events_db.vacuum, scheduler_settings['vacuum_schedule'], jitter, catch_up)
+            if scheduler_settings['aggregates_schedule']:
+                job_scheduler.add_job('aggregates', lambda: daily_aggregates.refresh_all(get_shift_rules()),
+                                      scheduler_settings['aggregates_schedule'], jitter, catch_up)
+            if report_warmer:
+                job_scheduler.add_job('warmup', report_warmer.run_once, warmup_settings['time'], jitter, catch_up,
+                                      cancel=report_warmer.cancel)
+            job_scheduler.start()
+            
+            # Изменения config.ini применяются без перезапуска (администраторы, уровень логов, отчеты)
+            global config_watcher
+            add_reload_listener(handle_config_reload)
+            config_watcher = ConfigWatcher()
+            config_watcher.start()
+            
+            # Обработчики команд выполняются в пуле потоков, а не в потоке получения обновлений
+            global update_dispatcher
+            update_dispatcher = UpdateDispatcher(get_dispatcher_settings()['workers'], priority_func=is_priority_update)
+            update_dispatcher.start()
+            
+            # Отчеты формируются в ограниченном пуле, одинаковые запросы объединяются
+            global report_service
+            report_service = ReportService(build_employee_report, report_settings['workers'], report_settings['max_queue'])
+            report_service.start()
+        
+        timer.report()
 
         try:
-            # Небольшая задержка для запуска SMTP сервера
-            time.sleep(1)
-            
-            start_telegram_bot(bot, user_manager)  # Запускаем бота в основном потоке
+            start_telegram_bot(bot, user_manager, telegram_client, secondary_bots)  # Запускаем бота в основном потоке
         except KeyboardInterrupt:
             log_warning("Получен сигнал CTRL-C (KeyboardInterrupt). Завершение работы...", module='CORE')
             # Устанавливаем флаг для завершения бота
             global stop_bot
             stop_bot = True
+            polling_stop_event.set()
+            
+            if config_watcher:
+                config_watcher.stop()
             
-            # Останавливаем планировщик очистки событий
-            if events_cleanup_scheduler:
+            # Останавливаем планировщик фоновых задач (ожидание прерывается сразу, прогрев отменяется)
+            if job_scheduler:
                 try:
-                    log_info("🛑 Остановка планировщика очистки событий...", module='CORE')
-                    events_cleanup_scheduler.stop()
-                    log_info("✅ Планировщик очистки событий остановлен", module='CORE')
+                    job_scheduler.stop()
                 except Exception as e:
-                    log_error(f"❌ Ошибка остановки планировщика очистки: {e}", module='CORE')
+                    log_error(f"❌ Ошибка остановки планировщика задач: {e}", module='CORE')
+            
+            # Отправляем накопленные дайджесты
+            if digest_manager:
+                try:
+                    digest_manager.stop()
+                except Exception as e:
+                    log_error(f"❌ Ошибка остановки менеджера дайджестов: {e}", module='CORE')
+            
+            # Останавливаем обработчики команд и формирование отчетов
+            if update_dispatcher:
+                update_dispatcher.stop()
+            if report_service:
+                report_service.stop()
+            
+            # Дожидаемся отправки очередей доставки и закрываем клиенты всех ботов
+            if delivery_service:
+                delivery_service.stop()
             
             # Небольшая пауза для завершения потоков
             time.sleep(0.5)
             
             log_info("✅ Приложение корректно завершено", module='CORE')
+            shutdown_logger()
             os._exit(0)  # Принудительное завершение
         
     except Exception as e:
@@ -1273,6 +1710,7 @@ def main():
         
         # Пауза перед выходом
         input("\nНажмите Enter для выхода...")
+        shutdown_logger()
         os._exit(1)
 
 if __name__ == '__main__':
@@ -52,9 +52,9 @@ class MessageProcessor:
                 # Заменяем время в сообщении
                 message = self.time_pattern.sub(formatted_time, message)
                 
-                log_debug(f"Обработано время: {formatted_time}", module='MessageProcessor')
+                log_debug("Обработано время: %s", formatted_time, module='MessageProcessor')
             except ValueError as e:
-                log_debug(f"Ошибка обработки времени: {e}", module='MessageProcessor')
+                log_debug("Ошибка обработки времени: %s", e, module='MessageProcessor')
         
         return message
     
@@ -0,0 +1,180 @@
+"""
+Кеш готовых отчетов: LRU в памяти с вытеснением на диск (db/cache/)
+
+Ключ отчета - (сотрудник, начало периода, конец периода, максимальный ID события,
+правила смен). Новое событие меняет максимальный ID, а изменение правил - последнюю
+часть ключа, поэтому устаревший отчет никогда не будет выдан; дополнительно записи
+сотрудника удаляются сразу при поступлении события.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from logger import log_info, log_warning, log_error, log_debug
+
+CACHE_FILE_SUFFIX = '.cache'
+
+# Ключ отчета и его содержимое (html, имя файла)
+ReportKey = Tuple[str, str, str, int, str]
+ReportValue = Tuple[str, str]
+
+
+def _key_to_list(key: ReportKey) -> list:
+    return [str(part) for part in key[:3]] + [int(key[3]), str(key[4])]
+
+
+class ReportCache:
+    """Двухуровневый LRU кеш отчетов"""
+
+    def __init__(self, cache_dir: str, memory_items: int = 32, disk_items: int = 500):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory: 'OrderedDict[ReportKey, ReportValue]' = OrderedDict()
+        self._disk: 'OrderedDict[ReportKey, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._load_disk_index()
+
+    def _load_disk_index(self) -> None:
+        """Восстанавливает индекс дискового кеша (заголовки файлов, от старых к новым)"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                     if name.endswith(CACHE_FILE_SUFFIX)]
+        except OSError as e:
+            log_error(f"Папка кеша отчетов недоступна: {e}", module='ReportCache')
+            return
+        for path in sorted(files, key=os.path.getmtime):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    header = json.loads(f.readline())
+                key = tuple(header['key'])
+                # Записи без правил смен в ключе (прежний формат) больше не запрашиваются
+                if len(key) != 5:
+                    raise ValueError(key)
+                self._disk[key] = path
+            except (OSError, ValueError, KeyError):
+                self._remove_file(path)
+        if self._disk:
+            log_info(f"🗃️  Кеш отчетов: на диске {len(self._disk)} записей", module='ReportCache')
+
+    def _path_for(self, key: ReportKey) -> str:
+        digest = hashlib.sha1(json.dumps(_key_to_list(key), ensure_ascii=False).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + CACHE_FILE_SUFFIX)
+
+    def get(self, key: ReportKey) -> Optional[ReportValue]:
+        """Возвращает отчет из памяти или с диска (с подъемом в память)"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            path = self._disk.pop(key, None)
+        if path is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                value = (f.read(), header['filename'])
+        except (OSError, ValueError, KeyError) as e:
+            log_warning(f"Поврежденная запись кеша отчетов {path}: {e}", module='ReportCache')
+            value = None
+        self._remove_file(path)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self.put(key, value)
+        return value
+
+    def __contains__(self, key: ReportKey) -> bool:
+        """Есть ли отчет в кеше (без учета в статистике попаданий)"""
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def put(self, key: ReportKey, value: ReportValue, memory: bool = True) -> None:
+        """
+        Сохраняет отчет в память; вытесненные записи уходят на диск.
+        memory=False - сразу на диск (прогрев не вытесняет из памяти горячие отчеты).
+        """
+        if not memory:
+            with self._lock:
+                self._memory.pop(key, None)
+            self._write_disk(key, value)
+            return
+        spilled = []
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                spilled.append(self._memory.popitem(last=False))
+        for old_key, old_value in spilled:
+            self._write_disk(old_key, old_value)
+
+    def _write_disk(self, key: ReportKey, value: ReportValue) -> None:
+        path = self._path_for(key)
+        html_content, filename = value
+        try:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'key': _key_to_list(key), 'filename': filename}, ensure_ascii=False))
+                f.write('\n')
+                f.write(html_content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log_warning(f"Не удалось сохранить отчет в кеш на диске: {e}", module='ReportCache')
+            return
+        evicted = []
+        with self._lock:
+            self._disk[key] = path
+            self._disk.move_to_end(key)
+            while len(self._disk) > self.disk_items:
+                evicted.append(self._disk.popitem(last=False)[1])
+        for old_path in evicted:
+            self._remove_file(old_path)
+
+    def _remove_file(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def invalidate_employee(self, employee_name: str) -> int:
+        """Удаляет отчеты, в которые попадает событие сотрудника"""
+        # Отчеты ищут события по подстроке имени (LIKE %имя%)
+        with self._lock:
+            memory_keys = [key for key in self._memory if key[0] in employee_name]
+            for key in memory_keys:
+                del self._memory[key]
+            disk_paths = [self._disk.pop(key) for key in list(self._disk) if key[0] in employee_name]
+        for path in disk_paths:
+            self._remove_file(path)
+        removed = len(memory_keys) + len(disk_paths)
+        if removed:
+            log_debug("Кеш отчетов: удалено %d записей по сотруднику %s", removed, employee_name, module='ReportCache')
+        return removed
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                'memory_items': len(self._memory),
+                'disk_items': len(self._disk),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / requests * 100, 1) if requests else 0.0
+            }
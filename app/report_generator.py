@@ -0,0 +1,336 @@
+"""
+Формирование HTML-отчета УРВ по сотруднику
+
+Шаблон templates/report_template.html компилируется один раз в список
+статических фрагментов и слотов {{имя}}; повторно файл читается только
+после его изменения. Документ собирается из списка фрагментов одним join.
+
+Иконки строк описаны один раз как <symbol> и подставляются через <use>,
+пробелы между тегами и в стилях шаблона удаляются при компиляции.
+
+Для отправки отчет собирается в BytesIO (сжатые варианты - по частям через
+iter_report_chunks) без временных файлов; такой объект можно перечитать при
+повторе загрузки.
+"""
+
+import gzip
+import io
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from shift_pairing import ShiftRules, pair_shifts, to_datetime
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'report_template.html')
+
+SLOT_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+WEEKDAY_RU = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
+MONTH_RU = ['январь', 'февраль', 'март', 'апрель', 'май', 'июнь',
+            'июль', 'август', 'сентябрь', 'октябрь', 'ноябрь', 'декабрь']
+
+# Иконки строк отчета: определяются один раз в начале детализации
+ICON_SPRITE = (
+    "<svg xmlns='http://www.w3.org/2000/svg' style='position:absolute;width:0;height:0' aria-hidden='true'>"
+    "<symbol id='i-cal' viewBox='0 0 24 24'><path d='M19 3H5C3.89 3 3 3.89 3 5V19C3 20.11 3.89 21 5 21H19C20.11 21 21 20.11 21 19V5C21 3.89 20.11 3 19 3M19 19H5V9H19V19M19 7H5V5H19V7Z' fill='currentColor'/></symbol>"
+    "<symbol id='i-in' viewBox='0 0 24 24'><path d='M8.59 16.59L13.17 12L8.59 7.41L10 6L16 12L10 18L8.59 16.59Z' fill='currentColor'/></symbol>"
+    "<symbol id='i-out' viewBox='0 0 24 24'><path d='M15.41 16.59L10.83 12L15.41 7.41L14 6L8 12L14 18L15.41 16.59Z' fill='currentColor'/></symbol>"
+    "<symbol id='i-no-exit' viewBox='0 0 24 24'><path d='M12 2C6.48 2 2 6.48 2 12C2 17.52 6.48 22 12 22C17.52 22 22 17.52 22 12C22 6.48 17.52 2 12 2M12 20C7.59 20 4 16.41 4 12C4 7.59 7.59 4 12 4C16.41 4 20 7.59 20 12C20 16.41 16.41 20 12 20M12 6C10.9 6 10 6.9 10 8C10 9.1 10.9 10 12 10C13.1 10 14 9.1 14 8C14 6.9 13.1 6 12 6M12 12C10.9 12 10 12.9 10 14C10 15.1 10.9 16 12 16C13.1 16 14 15.1 14 14C14 12.9 13.1 12 12 12Z' fill='currentColor'/></symbol>"
+    "</svg>"
+)
+CALENDAR_ICON = "<svg><use href='#i-cal'/></svg>"
+IN_ICON = "<svg width='16' height='16'><use href='#i-in'/></svg>"
+OUT_ICON = "<svg width='16' height='16'><use href='#i-out'/></svg>"
+NO_EXIT_ICON = "<svg width='16' height='16'><use href='#i-no-exit'/></svg>"
+
+# Готовые фрагменты таблицы дня
+IN_ROW_END = f"</span></td><td class='event-in'>{IN_ICON}Вход</td></tr>"
+OUT_ROW_END = f"</td><td class='event-out'>{OUT_ICON}Выход</td></tr>"
+NO_EXIT_ROW = f"<tr><td class='time'>-</td><td class='event-no-exit'>{NO_EXIT_ICON}Нет выхода</td></tr>"
+NIGHT_SHIFT_MARK = "<span class='night-shift'>+1</span>"
+DAY_TABLE_HEADER = "<table class='day-table'><tr><th>Время</th><th>Событие</th></tr>"
+
+# Минификация шаблона: блоки стилей, строки в кавычках и переводы строк с отступами
+STYLE_PATTERN = re.compile(r'(<style[^>]*>)(.*?)(</style>)', re.S | re.I)
+CSS_TOKEN_PATTERN = re.compile(r'("[^"]*"|\'[^\']*\')|\s*([{};,])\s*|:\s+|\s+')
+TAG_GAP_PATTERN = re.compile(r'>\s*\n\s*<')
+LINE_BREAK_PATTERN = re.compile(r'\s*\n\s*')
+
+# Способы упаковки больших отчетов перед отправкой
+COMPRESS_METHODS = ('none', 'gzip', 'zip')
+
+# Размер части отчета при сжатии (символов)
+REPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _minify_css_token(match) -> str:
+    if match.group(1):
+        return match.group(1)
+    if match.group(2):
+        return match.group(2)
+    return ':' if match.group(0).startswith(':') else ' '
+
+
+def minify_html(text: str) -> str:
+    """Удаляет из шаблона лишние пробелы, не меняя отображения документа"""
+    text = STYLE_PATTERN.sub(
+        lambda m: m.group(1) + CSS_TOKEN_PATTERN.sub(_minify_css_token, m.group(2)).strip() + m.group(3), text)
+    # Перевод строки между тегами не отображается; внутри текста он равен пробелу
+    text = TAG_GAP_PATTERN.sub('><', text)
+    return LINE_BREAK_PATTERN.sub(' ', text).strip()
+
+
+class CompiledTemplate:
+    """Шаблон, разобранный на статические фрагменты и слоты"""
+
+    def __init__(self, path: str, minify: bool = True):
+        self.path = path
+        self.minify = minify
+        self._mtime: Optional[float] = None
+        self._parts: List[str] = []
+        # Индексы слотов в _parts и их имена
+        self._slots: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def _ensure_fresh(self) -> None:
+        """Перекомпилирует шаблон, если файл изменился"""
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            if self.minify:
+                text = minify_html(text)
+            # re.split с группой чередует текст и имена слотов
+            pieces = SLOT_PATTERN.split(text)
+            self._parts = pieces
+            self._slots = [(index, pieces[index]) for index in range(1, len(pieces), 2)]
+            self._mtime = mtime
+
+    def render_parts(self, values: Dict[str, Any]) -> List[str]:
+        """Список фрагментов документа (значения слотов - строки или списки строк)"""
+        self._ensure_fresh()
+        parts = list(self._parts)
+        for index, name in self._slots:
+            value = values.get(name, '')
+            parts[index] = ''.join(value) if isinstance(value, list) else str(value)
+        return parts
+
+    def render(self, values: Dict[str, Any]) -> str:
+        return ''.join(self.render_parts(values))
+
+
+report_template = CompiledTemplate(TEMPLATE_PATH)
+
+
+def format_period_name(days: int) -> str:
+    """Название периода отчета"""
+    if days == 30:
+        return '1 месяц'
+    elif days == 90:
+        return '3 месяца'
+    elif days == 180:
+        return '6 месяцев'
+    return f'{days} дней'
+
+
+def format_range_name(date_from: date, date_to: date) -> str:
+    """Название произвольного периода: календарный месяц или диапазон дат"""
+    next_day = date_to + timedelta(days=1)
+    if date_from.day == 1 and next_day.day == 1 and (date_from.year, date_from.month) == (date_to.year, date_to.month):
+        return f"{MONTH_RU[date_from.month - 1]} {date_from.year}"
+    return f"{date_from.strftime('%d.%m.%Y')}-{date_to.strftime('%d.%m.%Y')}"
+
+
+def new_day_block(day: date) -> Dict[str, Any]:
+    """Пустой блок дня отчета"""
+    return {
+        'weekday_str': WEEKDAY_RU[day.weekday()],
+        'work_time': timedelta(),
+        'events': [],
+        'total_in': 0,
+        'total_out': 0
+    }
+
+
+def build_day_blocks(pairs, incomplete_shifts) -> Dict[date, Dict[str, Any]]:
+    """Группирует смены по дате входа"""
+    day_blocks: Dict[date, Dict[str, Any]] = OrderedDict()
+
+    def block_for(entry_dt: datetime) -> Dict[str, Any]:
+        entry_date = entry_dt.date()
+        block = day_blocks.get(entry_date)
+        if block is None:
+            block = day_blocks[entry_date] = new_day_block(entry_date)
+        return block
+
+    # Полные пары
+    for entry, exit_ev in pairs:
+        block = block_for(entry['ts_dt'])
+        block['events'].append(('in', entry['ts_dt'].strftime('%H:%M'), False))
+        block['events'].append(('out', exit_ev['ts_dt'].strftime('%H:%M'),
+                                exit_ev['ts_dt'].date() != entry['ts_dt'].date()))
+        block['total_in'] += 1
+        block['total_out'] += 1
+        delta = exit_ev['ts_dt'] - entry['ts_dt']
+        if delta.total_seconds() > 0:
+            block['work_time'] += delta
+
+    # Неполные смены (только для старых дней)
+    for entry, _ in incomplete_shifts:
+        block = block_for(entry['ts_dt'])
+        block['events'].append(('in', entry['ts_dt'].strftime('%H:%M'), False))
+        block['events'].append(('no_exit', None, False))
+        block['total_in'] += 1
+
+    return day_blocks
+
+
+def render_day(out: List[str], day: date, block: Dict[str, Any]) -> None:
+    """Добавляет фрагменты одного дня в список out"""
+    out.append("<div class='day-block'><div class='day-header-row'><div class='day-header'>")
+    out.append(CALENDAR_ICON)
+    out.append(f"{day.strftime('%d.%m.%Y')} ({block['weekday_str']})</div><div class='day-time'>{block['work_time_str']}</div></div>")
+    out.append(DAY_TABLE_HEADER)
+    for kind, time_str, night_shift in block['events']:
+        if kind == 'in':
+            out.append(f"<tr><td class='time'><span class='time-value'>{time_str}")
+            out.append(IN_ROW_END)
+        elif kind == 'out':
+            out.append(f"<tr><td class='time'><span class='time-value'>{time_str}</span>")
+            if night_shift:
+                out.append(NIGHT_SHIFT_MARK)
+            out.append(OUT_ROW_END)
+        else:
+            out.append(NO_EXIT_ROW)
+    out.append("</table></div>")
+
+
+def render_report_parts(events: List[Dict[str, Any]], surname: str, days: int,
+                        rules: Optional[ShiftRules] = None) -> List[str]:
+    """Формирует HTML-отчет по событиям сотрудника в виде списка фрагментов"""
+    today = date.today()
+
+    # Преобразуем все event_timestamp к datetime
+    for event in events:
+        event['ts_dt'] = to_datetime(event['event_timestamp'])
+    # Сортируем события по времени (из БД они уже приходят упорядоченными)
+    events_sorted = sorted(events, key=lambda e: e['ts_dt'])
+    # Формируем пары вход-выход и неполные смены за один проход
+    pairs, incomplete_shifts = pair_shifts(events_sorted, rules, today)
+    return render_day_blocks(build_day_blocks(pairs, incomplete_shifts), surname)
+
+
+def render_day_blocks(day_blocks: Dict[date, Dict[str, Any]], surname: str,
+                      period: Optional[Tuple[date, date]] = None) -> List[str]:
+    """
+    Собирает документ из блоков дней (по событиям или из дневных сводок).
+    period - показываемые границы периода; по умолчанию первый и последний день с данными.
+    """
+    today = date.today()
+
+    # Получаем текущее время для подвала
+    generation_time = datetime.now().strftime('%d.%m.%Y в %H:%M')
+
+    # Формируем строки времени и статистику
+    total_in = total_out = work_days = 0
+    total_work_time = timedelta()
+    for block in day_blocks.values():
+        total_in += block['total_in']
+        total_out += block['total_out']
+        work_time = block['work_time']
+        if work_time:
+            hours, minutes = work_time.seconds // 3600, (work_time.seconds % 3600) // 60
+            block['work_time_str'] = f"{hours}ч {minutes}м"
+            work_days += 1
+            total_work_time += timedelta(hours=hours, minutes=minutes)
+        else:
+            block['work_time_str'] = "-"
+
+    # Сортируем дни по убыванию
+    sorted_dates = sorted(day_blocks.keys(), reverse=True)
+    if period:
+        period_start, period_end = period
+    elif sorted_dates:
+        period_start = sorted_dates[-1]
+        period_end = sorted_dates[0]
+    else:
+        period_start = period_end = today
+
+    # Детализация по дням
+    details: List[str] = [ICON_SPRITE] if sorted_dates else []
+    for day in sorted_dates:
+        render_day(details, day, day_blocks[day])
+
+    # Среднее время
+    avg_work_time = total_work_time / work_days if work_days else timedelta()
+    avg_hours = int(avg_work_time.total_seconds() // 3600)
+    avg_minutes = int((avg_work_time.total_seconds() % 3600) // 60)
+
+    return report_template.render_parts({
+        'surname': surname,
+        'period': f"{period_start.strftime('%d.%m.%Y')} — {period_end.strftime('%d.%m.%Y')}",
+        'total_in': total_in,
+        'total_out': total_out,
+        'work_days': work_days,
+        'avg_hours': avg_hours,
+        'avg_minutes': avg_minutes,
+        'details': details,
+        'generation_time': generation_time
+    })
+
+
+def generate_html_report(events: List[Dict[str, Any]], surname: str, days: int,
+                         rules: Optional[ShiftRules] = None) -> str:
+    """Формирует HTML-отчет по событиям сотрудника"""
+    return ''.join(render_report_parts(events, surname, days, rules))
+
+
+def iter_report_chunks(html_content: str, chunk_size: int = REPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Кодирует отчет в UTF-8 частями: в памяти не бывает полной байтовой копии"""
+    for start in range(0, len(html_content), chunk_size):
+        yield html_content[start:start + chunk_size].encode('utf-8')
+
+
+def get_report_filename(surname: str, days: int, date_to: date) -> str:
+    """Имя файла отчета; date_to — последний день периода"""
+    date_str = date_to.strftime('%Y-%m-%d')
+    return f"{date_str} {surname} отчет УРВ {format_period_name(days)}.html"
+
+
+def get_range_report_filename(surname: str, date_from: date, date_to: date) -> str:
+    """Имя файла отчета за произвольный период"""
+    return f"{date_to.strftime('%Y-%m-%d')} {surname} отчет УРВ {format_range_name(date_from, date_to)}.html"
+
+
+def pack_report(html_content: str, filename: str, method: str = 'none',
+                threshold_kb: int = 0) -> Tuple[io.BytesIO, str]:
+    """
+    Готовит отчет к отправке: (BytesIO, имя файла).
+    Отчеты больше threshold_kb сжимаются по частям (gzip - .html.gz, zip - .zip).
+    """
+    # Порог сравнивается с числом символов: разметка отчета почти целиком ASCII
+    if method == 'none' or len(html_content) < threshold_kb * 1024:
+        return io.BytesIO(html_content.encode('utf-8')), filename
+    buffer = io.BytesIO()
+    if method == 'gzip':
+        # mtime=0 - одинаковый отчет дает одинаковый архив
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as archive:
+            for chunk in iter_report_chunks(html_content):
+                archive.write(chunk)
+        filename += '.gz'
+    else:
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            with archive.open(filename, 'w') as member:
+                for chunk in iter_report_chunks(html_content):
+                    member.write(chunk)
+        filename = os.path.splitext(filename)[0] + '.zip'
+    buffer.seek(0)
+    return buffer, filename
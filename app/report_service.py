@@ -0,0 +1,143 @@
+"""
+Сервис формирования отчетов: ограниченный пул потоков и объединение запросов
+
+Одинаковые запросы (сотрудник + период), пришедшие пока отчет еще строится,
+не запускают повторный расчет - все ожидающие получают результат одного задания.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from logger import log_info, log_warning, log_error, log_debug
+
+# Результат доставки ожидающему: (результат, ошибка)
+ReportCallback = Callable[[Any, Optional[Exception]], None]
+
+
+class ReportQueueFull(Exception):
+    """Очередь отчетов переполнена"""
+
+
+class _ReportJob:
+    """Задание на формирование отчета и все ожидающие его результата"""
+
+    __slots__ = ('key', 'args', 'waiters', 'created_at', 'started_at')
+
+    def __init__(self, key: Hashable, args: Tuple):
+        self.key = key
+        self.args = args
+        self.waiters: List[ReportCallback] = []
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+
+
+class ReportService:
+    """Пул потоков для отчетов с дедупликацией одинаковых запросов"""
+
+    def __init__(self, build_func: Callable[..., Any], workers: int = 2, max_queue: int = 20):
+        self.build_func = build_func
+        self.workers = workers
+        self.max_queue = max_queue
+        self.running = False
+        self._threads: List[threading.Thread] = []
+        self._jobs: Dict[Hashable, _ReportJob] = {}
+        self._queue: Deque[_ReportJob] = deque()
+        self._condition = threading.Condition()
+        self.completed = 0
+        self.deduplicated = 0
+
+    def start(self) -> None:
+        """Запуск потоков формирования отчетов"""
+        self.running = True
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'ReportWorker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        log_info(f"📊 Сервис отчетов запущен ({self.workers} потоков, очередь до {self.max_queue})", module='Reports')
+
+    def stop(self) -> None:
+        """Остановка потоков; задания в очереди отбрасываются"""
+        if not self.running:
+            return
+        with self._condition:
+            self.running = False
+            dropped = len(self._queue)
+            self._queue.clear()
+            self._condition.notify_all()
+        if dropped:
+            log_warning(f"⚠️  Не сформировано отчетов при остановке: {dropped}", module='Reports')
+        log_info("🛑 Сервис отчетов остановлен", module='Reports')
+
+    def submit(self, key: Hashable, args: Tuple, callback: ReportCallback) -> Tuple[int, bool]:
+        """
+        Ставит отчет в очередь или присоединяет к уже формируемому.
+        Возвращает (позиция в очереди, присоединен ли к существующему заданию);
+        позиция 0 означает, что отчет уже формируется.
+        """
+        with self._condition:
+            job = self._jobs.get(key)
+            if job is not None:
+                job.waiters.append(callback)
+                self.deduplicated += 1
+                log_debug("Запрос отчета %s объединен с формируемым", key, module='Reports')
+                return self._position(job), True
+
+            if len(self._queue) >= self.max_queue:
+                raise ReportQueueFull(f"В очереди уже {len(self._queue)} отчетов")
+
+            job = _ReportJob(key, args)
+            job.waiters.append(callback)
+            self._jobs[key] = job
+            self._queue.append(job)
+            self._condition.notify()
+            return self._position(job), False
+
+    def _position(self, job: _ReportJob) -> int:
+        """Номер задания в очереди (0 - уже выполняется или будет взято свободным потоком)"""
+        if job.started_at is not None:
+            return 0
+        index = self._queue.index(job)
+        busy = sum(1 for j in self._jobs.values() if j.started_at is not None)
+        return max(0, index + 1 - (self.workers - busy))
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and self.running:
+                    self._condition.wait()
+                if not self.running:
+                    return
+                job = self._queue.popleft()
+                job.started_at = time.monotonic()
+
+            result, error = None, None
+            try:
+                result = self.build_func(*job.args)
+            except Exception as e:
+                error = e
+                log_error(f"Ошибка формирования отчета {job.key}: {e}", module='Reports')
+
+            with self._condition:
+                # После снятия задания новые запросы запустят свежий расчет
+                self._jobs.pop(job.key, None)
+                waiters = list(job.waiters)
+                self.completed += 1
+            log_info(f"Отчет {job.key} сформирован за {time.monotonic() - job.started_at:.1f} сек "
+                     f"(ожидало {len(waiters)})", module='Reports')
+
+            for callback in waiters:
+                try:
+                    callback(result, error)
+                except Exception as e:
+                    log_error(f"Ошибка отправки отчета: {e}", module='Reports')
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                'queued': len(self._queue),
+                'running': sum(1 for job in self._jobs.values() if job.started_at is not None),
+                'completed': self.completed,
+                'deduplicated': self.deduplicated
+            }
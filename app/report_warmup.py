@@ -0,0 +1,94 @@
+"""
+Ночной прогрев кеша отчетов
+
+Задача планировщика (scheduler.py, по умолчанию в 05:00): для сотрудников с событиями за
+последние active_days дней заранее формируются отчеты за 1, 3 и 6 месяцев
+и сохраняются в кеш на диске. Утренние запросы отчетов (handle_report_period)
+отдаются из кеша без выборки событий и формирования HTML.
+
+Ключ кеша содержит ID последнего события периода, поэтому отчет сотрудника,
+у которого после прогрева появились события, формируется заново по запросу.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from logger import log_info, log_warning, log_error
+
+# Периоды отчетов, которые выбирают кнопками /report (1, 3 и 6 месяцев)
+WARMUP_PERIODS = (30, 90, 180)
+
+
+class ReportWarmer:
+    """Ночное формирование отчетов в кеш"""
+
+    def __init__(self, events_db, report_cache, render_func: Callable[[str, int], Optional[Tuple[str, str]]],
+                 cache_key_func: Callable[[str, int], Optional[tuple]], active_days: int = 7,
+                 workers: int = 1, periods: Tuple[int, ...] = WARMUP_PERIODS):
+        self.events_db = events_db
+        self.report_cache = report_cache
+        # render_func(сотрудник, дни) -> (html, имя файла) или None; без обращения к кешу
+        self.render_func = render_func
+        self.cache_key_func = cache_key_func
+        self.active_days = active_days
+        self.workers = max(1, workers)
+        self.periods = periods
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._stop_event = threading.Event()
+
+    def cancel(self):
+        """Прерывает текущий прогрев: оставшиеся отчеты не формируются"""
+        self._stop_event.set()
+
+    def _warm(self, employee_name: str, days: int) -> str:
+        """Формирует один отчет в кеш: 'rendered', 'skipped' или 'stopped'"""
+        if self._stop_event.is_set():
+            return 'stopped'
+        cache_key = self.cache_key_func(employee_name, days)
+        if cache_key is None or cache_key in self.report_cache:
+            return 'skipped'
+        report = self.render_func(employee_name, days)
+        if report is None:
+            return 'skipped'
+        # Сразу на диск: прогрев не вытесняет из памяти отчеты, запрошенные вчера
+        self.report_cache.put(cache_key, report, memory=False)
+        return 'rendered'
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Прогревает кеш отчетами всех активных сотрудников.
+        Возвращает статистику: employees, rendered, skipped, errors, elapsed.
+        """
+        self._stop_event.clear()
+        started = time.monotonic()
+        employees = self.events_db.get_active_employees(self.active_days)
+        jobs = [(name, days) for name in employees for days in self.periods]
+        disk_items = getattr(self.report_cache, 'disk_items', None)
+        if disk_items is not None and len(jobs) > disk_items:
+            log_warning(f"Отчетов прогрева ({len(jobs)}) больше, чем помещается в кеш на диске ({disk_items}): "
+                        f"ранние отчеты будут вытеснены. Увеличьте [Reports] cache_disk_items", module='ReportWarmup')
+        log_info(f"🌙 Прогрев кеша отчетов: {len(employees)} сотрудников, {len(jobs)} отчетов", module='ReportWarmup')
+
+        stats = {'employees': len(employees), 'rendered': 0, 'skipped': 0, 'errors': 0}
+        # Ограничение параллельности: прогрев не должен мешать обработке событий
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ReportWarmup') as executor:
+            futures = [(name, days, executor.submit(self._warm, name, days)) for name, days in jobs]
+            for name, days, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    stats['errors'] += 1
+                    log_error(f"Ошибка прогрева отчета {name} за {days} дней: {e}", module='ReportWarmup')
+                    continue
+                if result in stats:
+                    stats[result] += 1
+
+        stats['elapsed'] = time.monotonic() - started
+        stats['finished'] = datetime.now()
+        self.last_run = stats
+        log_info(f"✅ Прогрев кеша завершен за {stats['elapsed']:.1f} сек: сформировано {stats['rendered']}, "
+                 f"уже в кеше {stats['skipped']}, ошибок {stats['errors']}", module='ReportWarmup')
+        return stats
@@ -0,0 +1,328 @@
+"""
+Планировщик фоновых задач: очередь по времени запуска и threading.Event.wait
+
+Задачи хранятся в куче по времени следующего запуска. Поток планировщика
+спит до ближайшей задачи (а не просыпается каждую секунду) и сразу
+просыпается при остановке или добавлении задачи.
+
+Расписание задается в стиле cron:
+- "02:00" - каждый день в 02:00;
+- "sun 03:30", "пн-пт 08:00", "mon,thu 12:15" - в указанные дни недели;
+- "*/15 * * * *" - пять полей cron: минуты, часы, дни месяца, месяцы, дни недели.
+
+Время последней обработки расписания сохраняется в файл состояния: если
+запуск пропущен (бот был остановлен), задача выполняется сразу после старта
+(один раз, сколько бы запусков ни было пропущено).
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from logger import log_info, log_warning, log_error, log_debug
+
+DAY_NAMES = {
+    'sun': 0, 'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5, 'sat': 6,
+    'вс': 0, 'пн': 1, 'вт': 2, 'ср': 3, 'чт': 4, 'пт': 5, 'сб': 6,
+}
+TIME_PATTERN = re.compile(r'^(?:(\S+)\s+)?([0-1]?[0-9]|2[0-3]):([0-5][0-9])$')
+
+# Поиск следующего запуска ограничен: расписание вроде "0 0 30 2 *" не наступает никогда
+MAX_LOOKAHEAD_DAYS = 366 * 5
+
+# Потолок ожидания: раз в час планировщик сверяется с системными часами (перевод времени)
+MAX_WAIT_SECONDS = 3600
+
+
+def _parse_field(text: str, low: int, high: int, names: Optional[Dict[str, int]] = None) -> Set[int]:
+    """Поле cron: *, */n, a-b, a-b/n, списки через запятую"""
+    values: Set[int] = set()
+    for part in text.lower().split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Неверный шаг в '{text}'")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = _parse_value(start_text, names), _parse_value(end_text, names)
+        else:
+            start = end = _parse_value(part, names)
+            if step > 1:
+                end = high
+        if not low <= start <= high or not low <= end <= high or start > end:
+            raise ValueError(f"Значение вне диапазона {low}-{high} в '{text}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _parse_value(text: str, names: Optional[Dict[str, int]]) -> int:
+    if names and text in names:
+        return names[text]
+    return int(text)
+
+
+class Schedule:
+    """Расписание в стиле cron с точностью до минуты"""
+
+    def __init__(self, spec: str):
+        self.spec = spec.strip()
+        fields = self.spec.split()
+        match = TIME_PATTERN.match(self.spec)
+        try:
+            if match:
+                days, hour, minute = match.groups()
+                fields = [minute, hour, '*', '*', days or '*']
+            if len(fields) != 5:
+                raise ValueError("ожидается ЧЧ:ММ, 'дни ЧЧ:ММ' или пять полей cron")
+            self.minutes = sorted(_parse_field(fields[0], 0, 59))
+            self.hours = sorted(_parse_field(fields[1], 0, 23))
+            self.days = _parse_field(fields[2], 1, 31)
+            self.months = _parse_field(fields[3], 1, 12)
+            # 7 - тоже воскресенье
+            self.weekdays = {day % 7 for day in _parse_field(fields[4], 0, 7, DAY_NAMES)}
+        except ValueError as e:
+            raise ValueError(f"Неверное расписание '{spec}': {e}")
+        # Как в cron: если ограничены и дни месяца, и дни недели, подходит любое из условий
+        self._days_restricted = not fields[2].startswith('*')
+        self._weekdays_restricted = not fields[4].startswith('*')
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        day_ok = day.day in self.days
+        weekday_ok = (day.weekday() + 1) % 7 in self.weekdays
+        if self._days_restricted and self._weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Ближайший запуск строго после moment"""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for offset in range(MAX_LOOKAHEAD_DAYS):
+            current = day + timedelta(days=offset)
+            if not self._day_matches(current):
+                continue
+            for hour in self.hours:
+                for minute in self.minutes:
+                    candidate = current.replace(hour=hour, minute=minute)
+                    if candidate >= start:
+                        return candidate
+        raise ValueError(f"Расписание '{self.spec}' не наступает в ближайшие {MAX_LOOKAHEAD_DAYS} дней")
+
+
+class _Job:
+    """Задача планировщика и ее метрики"""
+
+    __slots__ = ('name', 'func', 'schedule', 'jitter', 'catch_up', 'cancel', 'next_run',
+                 'runs', 'errors', 'last_started', 'last_duration', 'total_duration', 'max_duration',
+                 'last_error', 'running')
+
+    def __init__(self, name: str, func: Callable[[], Any], schedule: Schedule, jitter: float,
+                 catch_up: bool, cancel: Optional[Callable[[], None]]):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.cancel = cancel
+        self.next_run: Optional[datetime] = None
+        self.runs = 0
+        self.errors = 0
+        self.last_started: Optional[datetime] = None
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last_error: Optional[str] = None
+        self.running = False
+
+
+class JobScheduler:
+    """Один поток для всех периодических задач; задачи выполняются по очереди"""
+
+    def __init__(self, state_path: Optional[str] = None):
+        self.state_path = state_path
+        self.running = False
+        self._jobs: Dict[str, _Job] = {}
+        # (время запуска, порядковый номер, имя задачи)
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._state: Dict[str, str] = {}
+
+    def add_job(self, name: str, func: Callable[[], Any], spec: str, jitter: float = 0,
+                catch_up: bool = True, cancel: Optional[Callable[[], None]] = None) -> None:
+        """
+        Добавляет задачу. jitter - случайная задержка запуска до N секунд,
+        catch_up - выполнить пропущенный запуск сразу после старта,
+        cancel - вызывается при остановке планировщика (прерывание долгой задачи).
+        ValueError при неверном расписании.
+        """
+        job = _Job(name, func, Schedule(spec), jitter, catch_up, cancel)
+        with self._lock:
+            if name in self._jobs:
+                raise ValueError(f"Задача '{name}' уже добавлена")
+            self._jobs[name] = job
+            if self.running:
+                self._plan(job, datetime.now())
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Запуск потока планировщика"""
+        if self.running:
+            return
+        self._load_state()
+        now = datetime.now()
+        with self._lock:
+            self.running = True
+            for job in self._jobs.values():
+                self._plan(job, now)
+        self._save_state()
+        for job in self._jobs.values():
+            log_info(f"🕐 Задача '{job.name}' ({job.schedule.spec}): следующий запуск "
+                     f"{job.next_run.strftime('%d.%m.%Y %H:%M:%S')}", module='Scheduler')
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='JobScheduler')
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановка: ожидание прерывается сразу, выполняющейся задаче передается cancel"""
+        if not self.running:
+            return
+        self.running = False
+        self._wakeup.set()
+        for job in self._jobs.values():
+            if job.running and job.cancel:
+                try:
+                    job.cancel()
+                except Exception as e:
+                    log_error(f"Ошибка отмены задачи '{job.name}': {e}", module='Scheduler')
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1)
+            if self._thread.is_alive():
+                log_warning("⚠️  Задача планировщика еще выполняется, поток завершится вместе с приложением",
+                            module='Scheduler')
+        log_info("🛑 Планировщик задач остановлен", module='Scheduler')
+
+    def _plan(self, job: _Job, now: datetime) -> None:
+        """Ставит задачу в очередь: пропущенный запуск - сразу, иначе по расписанию (под _lock)"""
+        reference = self._state.get(job.name)
+        if reference is None:
+            self._state[job.name] = now.isoformat(sep=' ')
+            reference_dt = now
+        else:
+            reference_dt = datetime.fromisoformat(reference)
+        missed = job.catch_up and reference_dt < now and job.schedule.next_after(reference_dt) <= now
+        if missed:
+            log_info(f"⏰ Задача '{job.name}' пропустила запуск, выполняется после старта", module='Scheduler')
+            job.next_run = now
+        else:
+            job.next_run = self._next_run(job, now)
+        heapq.heappush(self._heap, (job.next_run, next(self._counter), job.name))
+
+    def _next_run(self, job: _Job, after: datetime) -> datetime:
+        next_run = job.schedule.next_after(after)
+        if job.jitter:
+            next_run += timedelta(seconds=random.uniform(0, job.jitter))
+        return next_run
+
+    def _loop(self) -> None:
+        while self.running:
+            with self._lock:
+                due_at = self._heap[0][0] if self._heap else None
+            now = datetime.now()
+            if due_at is None or due_at > now:
+                timeout = MAX_WAIT_SECONDS if due_at is None else min((due_at - now).total_seconds(), MAX_WAIT_SECONDS)
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+                continue
+            with self._lock:
+                _, _, name = heapq.heappop(self._heap)
+                job = self._jobs.get(name)
+            if job is None:
+                continue
+            self._run(job)
+            if not self.running:
+                break
+            with self._lock:
+                # Следующий запуск - после завершения: за время долгой задачи запуски не копятся
+                job.next_run = self._next_run(job, datetime.now())
+                heapq.heappush(self._heap, (job.next_run, next(self._counter), job.name))
+
+    def _run(self, job: _Job) -> None:
+        job.running = True
+        job.last_started = datetime.now()
+        started = time.monotonic()
+        log_debug("▶️  Задача '%s' запущена", job.name, module='Scheduler')
+        try:
+            job.func()
+            job.last_error = None
+        except Exception as e:
+            job.errors += 1
+            job.last_error = str(e)
+            log_error(f"Ошибка задачи '{job.name}': {e}", module='Scheduler')
+        finally:
+            job.running = False
+            job.runs += 1
+            job.last_duration = time.monotonic() - started
+            job.total_duration += job.last_duration
+            job.max_duration = max(job.max_duration, job.last_duration)
+        log_info(f"✅ Задача '{job.name}' выполнена за {job.last_duration:.1f} сек", module='Scheduler')
+        with self._lock:
+            self._state[job.name] = job.last_started.isoformat(sep=' ')
+        self._save_state()
+
+    def _load_state(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self._state = {name: str(value) for name, value in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            log_warning(f"Не удалось прочитать состояние планировщика {self.state_path}: {e}", module='Scheduler')
+            self._state = {}
+
+    def _save_state(self) -> None:
+        if not self.state_path:
+            return
+        with self._lock:
+            state = dict(self._state)
+        try:
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            log_warning(f"Не удалось сохранить состояние планировщика: {e}", module='Scheduler')
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """Метрики задач в порядке добавления"""
+        metrics = []
+        for job in list(self._jobs.values()):
+            metrics.append({
+                'name': job.name,
+                'spec': job.schedule.spec,
+                'runs': job.runs,
+                'errors': job.errors,
+                'running': job.running,
+                'last_started': job.last_started,
+                'last_duration': round(job.last_duration, 1),
+                'avg_duration': round(job.total_duration / job.runs, 1) if job.runs else 0.0,
+                'max_duration': round(job.max_duration, 1),
+                'next_run': job.next_run,
+                'last_error': job.last_error,
+            })
+        return metrics
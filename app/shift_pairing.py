@@ -0,0 +1,98 @@
+"""
+Сопоставление событий входа и выхода в смены
+
+Однопроходный автомат: события подаются по возрасту времени, каждое
+просматривается один раз. Правила по умолчанию повторяют прежнюю логику отчета:
+- вход сопоставляется с ближайшим следующим выходом, промежуточные входы пропускаются;
+- выход без входа пропускается;
+- входы, после которых выхода так и не было, считаются неполными сменами,
+  кроме входов за последние incomplete_grace_days дней (смена могла еще не закончиться).
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+Event = Dict[str, Any]
+Shift = Tuple[Event, Optional[Event]]
+
+
+class ShiftRules:
+    """Настраиваемые правила сопоставления смен"""
+
+    def __init__(self, entry_direction: str = 'вход', exit_direction: str = 'выход',
+                 incomplete_grace_days: int = 1, max_shift_hours: Optional[float] = None):
+        self.entry_direction = entry_direction.lower()
+        self.exit_direction = exit_direction.lower()
+        # Входы без выхода за сегодня и incomplete_grace_days предыдущих дней не считаются неполными
+        self.incomplete_grace_days = incomplete_grace_days
+        # Максимальная длина смены (включая ночные); None - без ограничения.
+        # Вход, для которого выход не пришел за это время, становится неполной сменой
+        self.max_shift = timedelta(hours=max_shift_hours) if max_shift_hours else None
+
+
+class ShiftPairer:
+    """Потоковый автомат: feed() для каждого события, finish() в конце"""
+
+    def __init__(self, rules: Optional[ShiftRules] = None, today: Optional[date] = None):
+        self.rules = rules or ShiftRules()
+        today = today or date.today()
+        self.incomplete_since = today - timedelta(days=self.rules.incomplete_grace_days)
+        self.pairs: List[Shift] = []
+        self.incomplete: List[Shift] = []
+        # Входы, ожидающие выхода: первый образует смену, остальные - промежуточные
+        self._pending: List[Event] = []
+
+    def feed(self, event: Event) -> Optional[Shift]:
+        """Обрабатывает событие; возвращает завершенную смену, если она образовалась"""
+        ts = event['ts_dt']
+        direction = event['direction'].lower()
+        max_shift = self.rules.max_shift
+
+        if max_shift is not None and self._pending and ts - self._pending[0]['ts_dt'] > max_shift:
+            # Выхода не было слишком долго - ожидающие входы становятся неполными
+            self._close_pending()
+
+        if direction == self.rules.entry_direction:
+            self._pending.append(event)
+        elif direction == self.rules.exit_direction and self._pending:
+            shift = (self._pending[0], event)
+            self.pairs.append(shift)
+            self._pending = []
+            return shift
+        return None
+
+    @property
+    def idle(self) -> bool:
+        """Нет входов, ожидающих выхода: смены до этого момента окончательны"""
+        return not self._pending
+
+    def _close_pending(self) -> None:
+        for entry in self._pending:
+            if entry['ts_dt'].date() < self.incomplete_since:
+                self.incomplete.append((entry, None))
+        self._pending = []
+
+    def finish(self) -> Tuple[List[Shift], List[Shift]]:
+        """Завершает поток и возвращает (полные смены, неполные смены)"""
+        self._close_pending()
+        return self.pairs, self.incomplete
+
+
+def to_datetime(ts: Any) -> datetime:
+    """Преобразует event_timestamp из БД в datetime"""
+    if isinstance(ts, str):
+        # fromisoformat реализован на C и в разы быстрее strptime
+        try:
+            return datetime.fromisoformat(ts)
+        except ValueError:
+            return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
+    return ts
+
+
+def pair_shifts(events: Iterable[Event], rules: Optional[ShiftRules] = None,
+                today: Optional[date] = None) -> Tuple[List[Shift], List[Shift]]:
+    """Сопоставляет упорядоченные по времени события (с полем ts_dt) в смены"""
+    pairer = ShiftPairer(rules, today)
+    for event in events:
+        pairer.feed(event)
+    return pairer.finish()
@@ -0,0 +1,87 @@
+"""
+Этапы запуска приложения
+
+StartupTimer замеряет длительность этапов запуска и пишет разбивку в лог.
+run_parallel выполняет независимые проверки (запросы к Telegram API,
+статистика базы событий) одновременно и ждет их не дольше timeout:
+незавершенная проверка продолжает работу в фоне и не задерживает запуск.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from logger import log_info, log_warning, log_error
+
+# Сколько запуск ждет параллельных проверок (сек)
+STARTUP_CHECK_TIMEOUT = 10
+
+
+class StartupTimer:
+    """Длительность этапов запуска"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stages: List[Tuple[str, float]] = []
+        self.marks: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.monotonic() - started))
+
+    def add(self, name: str, duration: float) -> None:
+        self.stages.append((name, duration))
+
+    def mark(self, name: str) -> None:
+        """Момент готовности (от начала запуска), например приема событий по SMTP"""
+        self.marks.append((name, time.monotonic() - self.started))
+
+    def report(self) -> None:
+        total = time.monotonic() - self.started
+        stages = ", ".join(f"{name} {duration * 1000:.0f} мс" for name, duration in self.stages)
+        marks = "".join(f"; {name} через {moment * 1000:.0f} мс" for name, moment in self.marks)
+        log_info("⏱️  Запуск за %.0f мс%s: %s", total * 1000, marks, stages, module='Startup')
+
+
+def run_parallel(checks: Dict[str, Callable[[], Any]], timeout: float = STARTUP_CHECK_TIMEOUT,
+                 timer: Optional[StartupTimer] = None) -> Dict[str, Any]:
+    """
+    Выполняет проверки одновременно. Результат - {имя: значение} для проверок,
+    завершившихся за timeout; упавшие и незавершенные - None (с записью в лог).
+    """
+    if not checks:
+        return {}
+    durations: Dict[str, float] = {}
+
+    def timed(name: str, func: Callable[[], Any]) -> Any:
+        started = time.monotonic()
+        try:
+            return func()
+        finally:
+            durations[name] = time.monotonic() - started
+
+    executor = ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix='StartupCheck')
+    futures = {executor.submit(timed, name, func): name for name, func in checks.items()}
+    done, _ = wait(futures, timeout=timeout)
+    # Зависшие проверки не ждем: потоки завершатся сами по таймаутам запросов
+    executor.shutdown(wait=False)
+
+    results: Dict[str, Any] = {}
+    for future, name in futures.items():
+        results[name] = None
+        if future not in done:
+            log_warning("⏳ Проверка '%s' не завершилась за %g сек, запуск продолжается", name, timeout,
+                        module='Startup')
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            log_error(f"❌ Ошибка проверки '{name}': {e}", module='Startup')
+        if timer is not None and name in durations:
+            timer.add(f"[{name}]", durations[name])
+    return results
@@ -41,9 +41,10 @@ class SystemInitializer:
     
     def setup_logging(self) -> None:
         """Настройка системы логирования"""
-        from .config import get_logging_backup_logs_count
+        from .config import get_logging_backup_logs_count, get_logging_queue_settings
         backup_days = get_logging_backup_logs_count()
-        setup_logger(self.logging_level, backup_days)
+        queue_settings = get_logging_queue_settings()
+        setup_logger(self.logging_level, backup_days, queue_settings['queue_size'], queue_settings['queue_policy'])
         log_info("🚀 Система логирования инициализирована", module='SystemInit')
     
     def check_configuration(self) -> bool:
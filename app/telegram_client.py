@@ -0,0 +1,317 @@
+"""
+Асинхронный клиент Telegram Bot API на aiohttp с пулом keep-alive соединений
+"""
+
+import asyncio
+import io
+import json
+import threading
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from logger import log_info, log_warning, log_error, log_debug
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+
+
+class TelegramAPIError(Exception):
+    """Ошибка, возвращенная Telegram Bot API"""
+
+    def __init__(self, method: str, error_code: int, description: str, retry_after: Optional[int] = None):
+        super().__init__(f"{method}: [{error_code}] {description}")
+        self.method = method
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Ограничитель частоты запросов (token bucket) для одного бота"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = None
+
+    async def acquire(self) -> None:
+        """Ждет свободный токен (вызывается только из event loop клиента)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self.updated is not None:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _SyncResponse:
+    """Минимальная замена requests.Response для telebot"""
+
+    def __init__(self, status_code: int, reason: str, text: str):
+        self.status_code = status_code
+        self.reason = reason
+        self.text = text
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+def _build_form(params: Optional[Dict[str, Any]], files: Dict[str, Any]) -> aiohttp.FormData:
+    """Формирует multipart/form-data из параметров и файлов"""
+    # Имена файлов передаются в UTF-8 как есть (как в requests), без %-кодирования
+    form = aiohttp.FormData(quote_fields=False)
+    for key, value in (params or {}).items():
+        if value is not None:
+            form.add_field(key, str(value))
+    for key, value in files.items():
+        filename = key
+        content_type = None
+        if isinstance(value, tuple):
+            filename = value[0]
+            if len(value) > 2:
+                content_type = value[2]
+            value = value[1]
+        elif hasattr(value, 'name') and isinstance(value.name, str):
+            filename = value.name.replace('\\', '/').split('/')[-1]
+        if isinstance(value, io.IOBase):
+            # Файловые объекты (в том числе BytesIO) aiohttp читает по частям сам
+            pass
+        elif hasattr(value, 'read'):
+            value = value.read()
+        form.add_field(key, value, filename=filename, content_type=content_type)
+    return form
+
+
+class AsyncTelegramClient:
+    """Клиент Telegram Bot API с одной пуловой сессией aiohttp"""
+
+    def __init__(self, token: str, connection_limit: int = 100, connect_timeout: int = 10,
+                 read_timeout: int = 30, keepalive_timeout: int = 60, api_url: str = TELEGRAM_API_URL):
+        self.token = token
+        self.connection_limit = connection_limit
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.api_url = api_url.rstrip('/')
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("Telegram клиент не запущен")
+        return self._session
+
+    async def start(self) -> None:
+        """Создает пуловую сессию (вызывается внутри event loop)"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self) -> None:
+        """Закрывает сессию и все соединения пула"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _method_url(self, method: str) -> str:
+        return f"{self.api_url}/bot{self.token}/{method}"
+
+    async def call(self, method: str, params: Optional[Dict[str, Any]] = None,
+                   files: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """Вызывает метод Bot API и возвращает поле result"""
+        request_timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout,
+                                                sock_read=timeout or self.read_timeout)
+        if files:
+            kwargs = {'data': _build_form(params, files)}
+        else:
+            kwargs = {'json': {k: v for k, v in (params or {}).items() if v is not None}}
+        async with self.session.post(self._method_url(method), timeout=request_timeout, **kwargs) as response:
+            try:
+                payload = await response.json(content_type=None)
+            except (ValueError, aiohttp.ContentTypeError):
+                raise TelegramAPIError(method, response.status, await response.text())
+        if not payload.get('ok'):
+            parameters = payload.get('parameters') or {}
+            raise TelegramAPIError(method, payload.get('error_code', response.status),
+                                   payload.get('description', ''), parameters.get('retry_after'))
+        return payload.get('result')
+
+    async def raw_request(self, http_method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                          files: Optional[Dict[str, Any]] = None, timeout: Any = None) -> _SyncResponse:
+        """Выполняет запрос в формате telebot (form-данные) и возвращает ответ без разбора"""
+        if isinstance(timeout, tuple):
+            sock_connect, sock_read = timeout
+        else:
+            sock_connect, sock_read = self.connect_timeout, timeout or self.read_timeout
+        request_timeout = aiohttp.ClientTimeout(total=None, sock_connect=sock_connect, sock_read=sock_read)
+        kwargs: Dict[str, Any] = {'timeout': request_timeout}
+        if files:
+            kwargs['data'] = _build_form(params, files)
+        elif params and http_method.lower() == 'get':
+            kwargs['params'] = {k: str(v) for k, v in params.items() if v is not None}
+        elif params:
+            kwargs['data'] = {k: str(v) for k, v in params.items() if v is not None}
+        async with self.session.request(http_method.upper(), url, **kwargs) as response:
+            text = await response.text()
+            return _SyncResponse(response.status, response.reason or '', text)
+
+    async def get_me(self) -> Dict[str, Any]:
+        return await self.call('getMe')
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> Dict[str, Any]:
+        params = {'chat_id': chat_id, 'text': text}
+        params.update(kwargs)
+        return await self.call('sendMessage', params)
+
+    async def send_document(self, chat_id: int, document: Any, filename: str,
+                            caption: Optional[str] = None, **kwargs: Any) -> Dict[str, Any]:
+        params = {'chat_id': chat_id, 'caption': caption}
+        params.update(kwargs)
+        return await self.call('sendDocument', params, files={'document': (filename, document)})
+
+    async def get_updates(self, offset: Optional[int] = None, timeout: int = 25,
+                          allowed_updates: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {'offset': offset, 'timeout': timeout}
+        if allowed_updates is not None:
+            params['allowed_updates'] = allowed_updates
+        # Long polling держит запрос открытым timeout секунд
+        return await self.call('getUpdates', params, timeout=timeout + self.read_timeout)
+
+    async def poll_updates(self, on_updates: Callable[[List[Dict[str, Any]]], None],
+                           stop_event: threading.Event, polling_timeout: int = 25,
+                           skip_pending: bool = True) -> None:
+        """Long polling: передает пачки обновлений в on_updates до установки stop_event"""
+        offset = None
+        if skip_pending:
+            try:
+                pending = await self.get_updates(offset=-1, timeout=0)
+                if pending:
+                    offset = pending[-1]['update_id'] + 1
+            except Exception as e:
+                log_warning(f"Не удалось пропустить ожидающие обновления: {e}", module='Telegram')
+
+        delay = 5  # стартовая задержка между попытками (сек)
+        while not stop_event.is_set():
+            try:
+                updates = await self.get_updates(offset=offset, timeout=polling_timeout)
+            except asyncio.CancelledError:
+                raise
+            except TelegramAPIError as e:
+                if e.retry_after:
+                    delay = e.retry_after
+                log_warning(f"Ошибка получения обновлений: {e}. Повтор через {delay} сек.", module='Telegram')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log_warning(f"Проблема с подключением к Telegram API: {e!r}. Повтор через {delay} сек.", module='Telegram')
+            except Exception as e:
+                log_error(f"Неожиданная ошибка получения обновлений: {e}", module='Telegram')
+            else:
+                delay = 5  # если всё прошло хорошо, сбрасываем задержку
+                if updates:
+                    offset = updates[-1]['update_id'] + 1
+                    try:
+                        on_updates(updates)
+                    except Exception as e:
+                        log_error(f"Ошибка обработки обновлений: {e}", module='Telegram')
+                continue
+
+            # Короткие интервалы для быстрого реагирования на остановку
+            for _ in range(int(delay)):
+                if stop_event.is_set():
+                    return
+                await asyncio.sleep(1)
+            delay = min(delay * 2, 300)
+
+
+class TelegramClientRunner:
+    """Фоновый event loop, позволяющий использовать клиент из синхронного кода"""
+
+    def __init__(self, client: AsyncTelegramClient):
+        self.client = client
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def start(self) -> None:
+        """Запускает event loop в отдельном потоке и открывает сессию"""
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self._run_loop, name='TelegramClientLoop', daemon=True)
+        self.loop_thread.start()
+        self._ready.wait()
+        self.submit(self.client.start()).result()
+        log_info(f"✅ Telegram клиент запущен (пул соединений: {self.client.connection_limit})", module='Telegram')
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def stop(self, timeout: float = 3) -> None:
+        """Закрывает сессию и останавливает event loop"""
+        if self.loop is None or not self.loop.is_running():
+            return
+        try:
+            self.submit(self.client.close()).result(timeout=timeout)
+        except Exception as e:
+            log_warning(f"Ошибка закрытия Telegram клиента: {e}", module='Telegram')
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.loop_thread:
+            self.loop_thread.join(timeout=timeout)
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Планирует корутину в event loop клиента (потокобезопасно)"""
+        if self.loop is None:
+            raise RuntimeError("Telegram клиент не запущен")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def send_message(self, chat_id: int, text: str, **kwargs: Any) -> concurrent.futures.Future:
+        """Неблокирующая отправка сообщения; результат доступен через Future"""
+        return self.submit(self.client.send_message(chat_id, text, **kwargs))
+
+    def send_message_sync(self, chat_id: int, text: str, **kwargs: Any) -> Dict[str, Any]:
+        """Блокирующая отправка сообщения"""
+        return self.send_message(chat_id, text, **kwargs).result()
+
+    def telebot_request_sender(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                               files: Optional[Dict[str, Any]] = None, timeout: Any = None,
+                               proxies: Any = None) -> _SyncResponse:
+        """Транспорт для telebot (apihelper.CUSTOM_REQUEST_SENDER) через общий пул соединений"""
+        import requests
+        future = self.submit(self.client.raw_request(method, url, params=params, files=files, timeout=timeout))
+        try:
+            return future.result()
+        except asyncio.TimeoutError as e:
+            raise requests.exceptions.ReadTimeout(str(e))
+        except aiohttp.ClientConnectionError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+    def install_telebot_transport(self) -> None:
+        """Направляет все запросы telebot через этот клиент"""
+        from telebot import apihelper
+        apihelper.CUSTOM_REQUEST_SENDER = self.telebot_request_sender
+        log_debug("Запросы telebot направлены через пул соединений aiohttp", module='Telegram')
+
+
+def create_telegram_client(token: str, settings: Dict[str, int]) -> TelegramClientRunner:
+    """Создает и запускает клиент с настройками из config.ini"""
+    client = AsyncTelegramClient(
+        token,
+        connection_limit=settings['connection_limit'],
+        connect_timeout=settings['connect_timeout'],
+        read_timeout=settings['read_timeout'],
+        keepalive_timeout=settings['keepalive_timeout']
+    )
+    runner = TelegramClientRunner(client)
+    runner.start()
+    return runner
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Проверка и замер отчетов за период из дневных сводок (app/daily_aggregates.py)
+
+1. Отчет по всей истории сотрудника из сводок сравнивается с отчетом
+   по сырым событиям: после первого расчета, после новых событий
+   (дописывание сводок) и после события задним числом (полный пересчет).
+2. Замер на периодах 30/90/180/365 дней: выборка сырых событий + расчет
+   смен против чтения сводок по дням.
+
+Запуск: python app/tests/bench_daily_aggregates.py [--employees 300] [--days 730]
+"""
+
+import sys
+import os
+import re
+import random
+import argparse
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Добавляем каталог app в sys.path: модули проекта импортируют друг друга напрямую
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(current_dir)
+sys.path.insert(0, app_dir)
+
+from events_database import EventsDatabaseManager
+from daily_aggregates import DailyAggregates
+from report_generator import generate_html_report, render_day_blocks
+from shift_pairing import ShiftRules
+
+TARGET = 'Иванов Иван Иванович'
+GENERATION_TIME = re.compile(r'Сгенерировано: [^<]*')
+
+
+def employee_rows(name, days, missing_exit_rate=0.02, night_rate=0.05):
+    """События сотрудника за days дней до вчерашнего дня включительно"""
+    rows = []
+    start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    for offset in range(days):
+        current = start + timedelta(days=offset)
+        if current.weekday() >= 5:
+            continue
+        if random.random() < night_rate:
+            entry = current + timedelta(hours=21, minutes=random.randint(0, 59))
+            exit_time = entry + timedelta(hours=8, minutes=random.randint(0, 59))
+        else:
+            entry = current + timedelta(hours=8, minutes=random.randint(0, 59))
+            exit_time = entry + timedelta(hours=9, minutes=random.randint(0, 59))
+        rows.append((name, 'Вход', entry.isoformat(sep=' ')))
+        if random.random() >= missing_exit_rate:
+            rows.append((name, 'Выход', exit_time.isoformat(sep=' ')))
+    return rows
+
+
+def fill_database(events_db, employees, days):
+    rows = employee_rows(TARGET, days)
+    for index in range(employees):
+        rows.extend(employee_rows(f"Сотрудник{index:04d} А.А.", days))
+    conn = events_db.get_connection()
+    conn.executemany("""
+        INSERT INTO events (employee_name, direction, event_timestamp, raw_message, processed_message)
+        VALUES (?, ?, ?, '', '')
+    """, sorted(rows, key=lambda row: row[2]))
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def raw_events(events_db, name, date_from, date_to):
+    """Сырой путь: все события сотрудника за период (как get_events_by_employee_and_period)"""
+    conn = events_db.get_connection()
+    rows = conn.execute("""
+        SELECT id, employee_name, direction, event_timestamp
+        FROM events
+        WHERE employee_name LIKE ?
+          AND event_timestamp BETWEEN ? AND ?
+        ORDER BY event_timestamp ASC
+    """, (f"%{name}%", datetime.combine(date_from, datetime.min.time()).isoformat(sep=' '),
+          datetime.combine(date_to, datetime.max.time()).isoformat(sep=' '))).fetchall()
+    conn.close()
+    return [{'id': row[0], 'employee_name': row[1], 'direction': row[2], 'event_timestamp': row[3]} for row in rows]
+
+
+def raw_report(events_db, name, date_from, date_to, rules):
+    return generate_html_report(raw_events(events_db, name, date_from, date_to), name, 0, rules)
+
+
+def aggregated_report(aggregates, name, date_from, date_to, rules):
+    return ''.join(render_day_blocks(aggregates.get_day_blocks(name, date_from, date_to, rules), name))
+
+
+def check(events_db, aggregates, rules, stage):
+    date_from, date_to = date(2000, 1, 1), date.today()
+    expected = GENERATION_TIME.sub('', raw_report(events_db, TARGET, date_from, date_to, rules))
+    actual = GENERATION_TIME.sub('', aggregated_report(aggregates, TARGET, date_from, date_to, rules))
+    if expected != actual:
+        print(f"❌ {stage}: отчет из сводок отличается от отчета по событиям")
+        return False
+    print(f"✅ {stage}: отчет из сводок совпадает с отчетом по событиям")
+    return True
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка и замер отчетов из дневных сводок')
+    parser.add_argument('--employees', type=int, default=300, help='количество других сотрудников в базе')
+    parser.add_argument('--days', type=int, default=730, help='длина истории в днях')
+    parser.add_argument('--repeat', type=int, default=5, help='повторов каждого замера')
+    parser.add_argument('--seed', type=int, default=1, help='зерно генератора случайных чисел')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    temp_dir = tempfile.mkdtemp(prefix='aggregates_bench_')
+    try:
+        events_db = EventsDatabaseManager(os.path.join(temp_dir, 'events.db'))
+        total = fill_database(events_db, args.employees, args.days)
+        print(f"📊 {total} событий: {args.employees + 1} сотрудников × {args.days} дней")
+        aggregates = DailyAggregates(events_db)
+        rules = ShiftRules()
+
+        started = time.perf_counter()
+        aggregates.refresh(TARGET, rules)
+        print(f"   первый расчет сводок сотрудника: {(time.perf_counter() - started) * 1000:.1f} мс")
+        ok = check(events_db, aggregates, rules, 'первый расчет')
+
+        # Новые события сегодня (вход без выхода остается в хвосте)
+        now = datetime.now().replace(second=0, microsecond=0)
+        events_db.add_event(TARGET, 'Вход', now - timedelta(hours=3), '', '')
+        events_db.add_event(TARGET, 'Выход', now - timedelta(hours=2), '', '')
+        events_db.add_event(TARGET, 'Вход', now - timedelta(hours=1), '', '')
+        ok &= check(events_db, aggregates, rules, 'новые события')
+
+        # Событие задним числом меняет сопоставление старых смен
+        events_db.add_event(TARGET, 'Вход', now - timedelta(days=100, hours=5), '', '')
+        ok &= check(events_db, aggregates, rules, 'событие задним числом')
+        if not ok:
+            sys.exit(1)
+
+        for days in (30, 90, 180, 365):
+            date_from = date.today() - timedelta(days=days - 1)
+            raw_time = measure(lambda: raw_report(events_db, TARGET, date_from, date.today(), rules), args.repeat)
+            aggregated_time = measure(lambda: aggregated_report(aggregates, TARGET, date_from, date.today(), rules),
+                                      args.repeat)
+            print(f"   {days:3d} дней: по событиям {raw_time:7.1f} мс, из сводок {aggregated_time:6.1f} мс "
+                  f"(в {raw_time / aggregated_time:.1f} раз быстрее)")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Замер затрат TechnicalLogFilter на одну запись лога
+
+Каждая запись проходит фильтр дважды (консоль и файл):
+- прежний фильтр: getMessage() и поиск каждого ключевого слова подстрокой
+  (до 15 проверок `in`), отдельный экземпляр на каждый обработчик;
+- текущий: одно регулярное выражение с альтернативами, решение для записей
+  без аргументов кешируется по (логгер, сообщение), один экземпляр на оба
+  обработчика.
+
+Перед замером проверяется, что решения обоих фильтров совпадают для каждого
+образца и для случайной выборки записей.
+
+Запуск: python app/tests/bench_log_filter.py [--records 200000]
+"""
+
+import sys
+import os
+import argparse
+import logging
+import queue
+import random
+import time
+
+# Добавляем каталог app в sys.path: модули проекта импортируют друг друга напрямую
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(current_dir)
+sys.path.insert(0, app_dir)
+
+from logger import BoundedQueueHandler, TechnicalLogFilter
+
+# Типичные записи приложения и aiosmtpd: (логгер, уровень, шаблон, аргументы)
+SAMPLES = [
+    ('SMTP', logging.INFO, "📧 Получено новое email сообщение", ()),
+    ('SMTP', logging.INFO, "👤 Обработка события: %s", ('Иванов Иван Иванович',)),
+    ('SMTP', logging.DEBUG, "DEBUG: Начало обработки SMTP сообщения", ()),
+    ('SMTP', logging.DEBUG, "📧 Полное содержимое email: %s", ('19.10.2026 08:01:02 Доступ разрешен, режим:Вход',)),
+    ('EventsDatabase', logging.INFO, "✅ Событие добавлено: %s - %s в %s", ('Иванов И.И.', 'Вход', '2026-10-19 08:01:02')),
+    ('EventsDatabase', logging.INFO, "💾 Событие сохранено в базу данных: %s - %s", ('Иванов И.И.', 'Вход')),
+    ('Telegram', logging.INFO, "Отправка сообщения %d авторизованным пользователям", (20,)),
+    ('Telegram', logging.INFO, "Сообщение поставлено в очередь для пользователя %s", (100001,)),
+    ('Telegram', logging.INFO, "Сообщение отфильтровано для пользователя %s", (100002,)),
+    ('Delivery', logging.DEBUG, "Сообщение доставлено в чат %s", (100001,)),
+    ('Telegram', logging.WARNING, "Повтор отправки в чат %s через %s сек.", (100003, 2)),
+    ('mail.log', logging.INFO, "Peer: %r", (('127.0.0.1', 50123),)),
+    ('mail.log', logging.INFO, "%r handling connection", (('127.0.0.1', 50123),)),
+    ('mail.log', logging.INFO, "%r EOF received", (('127.0.0.1', 50123),)),
+    ('mail.log', logging.INFO, "%r Connection lost during _handle_client()", (('127.0.0.1', 50123),)),
+    ('mail.log', logging.DEBUG, "_handle_client readline: %r", (b'RCPT TO:<bot@localhost>',)),
+    # Ключевое слово ">> b'" появляется только после подстановки байтового аргумента
+    ('mail.log', logging.DEBUG, "%r >> %r", (('127.0.0.1', 50123), b'MAIL FROM:<orion@localhost>')),
+    ('mail.log', logging.INFO, "%r >> %r", (('127.0.0.1', 50123), b'DATA')),
+    ('CORE', logging.INFO, "Connection: пул Telegram клиента %d соединений", (100,)),
+]
+
+
+class LegacyTechnicalLogFilter(logging.Filter):
+    """Прежняя реализация: подстроки по списку для каждой записи"""
+
+    def __init__(self, debug_mode: bool = False):
+        super().__init__()
+        self.debug_mode = debug_mode
+
+    def filter(self, record):
+        message = record.getMessage()
+        if not self.debug_mode and record.levelno == logging.DEBUG:
+            return False
+        if self.debug_mode:
+            if any(keyword in message for keyword in TechnicalLogFilter.DEBUG_KEYWORDS):
+                return True
+            return not any(keyword in message for keyword in TechnicalLogFilter.TECHNICAL_KEYWORDS)
+        return not any(keyword in message for keyword in
+                       TechnicalLogFilter.TECHNICAL_KEYWORDS + TechnicalLogFilter.DEBUG_KEYWORDS)
+
+
+def make_record(handler, sample):
+    """Запись в том виде, в каком ее получает поток записи (после BoundedQueueHandler.prepare)"""
+    name, level, template, args = sample
+    return handler.prepare(logging.LogRecord(name, level, __file__, 0, template, args, None))
+
+
+def make_records(count):
+    handler = BoundedQueueHandler(queue.Queue())
+    return [make_record(handler, random.choice(SAMPLES)) for _ in range(count)]
+
+
+def measure(filters, records):
+    started = time.perf_counter()
+    for record in records:
+        for record_filter in filters:
+            record_filter.filter(record)
+    return (time.perf_counter() - started) / len(records) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер затрат фильтра технических сообщений')
+    parser.add_argument('--records', type=int, default=200000, help='количество записей')
+    parser.add_argument('--seed', type=int, default=1, help='зерно генератора случайных чисел')
+    args = parser.parse_args()
+    random.seed(args.seed)
+    records = make_records(args.records)
+
+    for debug_mode in (False, True):
+        legacy = [LegacyTechnicalLogFilter(debug_mode), LegacyTechnicalLogFilter(debug_mode)]
+        shared = TechnicalLogFilter(debug_mode)
+        current = [shared, shared]
+
+        handler = BoundedQueueHandler(queue.Queue())
+        checked = [make_record(handler, sample) for sample in SAMPLES] + records[:len(SAMPLES) * 20]
+        mismatches = [record.getMessage() for record in checked
+                      if legacy[0].filter(record) != current[0].filter(record)]
+        if mismatches:
+            print(f"❌ Решения фильтров различаются: {mismatches[:3]}")
+            sys.exit(1)
+
+        legacy_ns = measure(legacy, records)
+        current_ns = measure(current, records)
+        mode = 'DEBUG' if debug_mode else 'INFO '
+        print(f"📊 {mode}: прежний фильтр {legacy_ns:6.0f} нс/запись, текущий {current_ns:5.0f} нс/запись "
+              f"({legacy_ns / current_ns:.1f}x), шаблонов в кеше {len(shared._decisions)}")
+
+
+if __name__ == '__main__':
+    main()
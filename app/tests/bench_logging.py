@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Замер затрат на логирование одного события в потоке приема (SMTP)
+
+Повторяется набор вызовов SMTPHandler.handle_message для одного события
+с рассылкой N пользователям:
+- прежний путь: f-строки собираются всегда, логгеры модулей с уровнем DEBUG,
+  форматирование, фильтр и запись в файл/консоль в вызывающем потоке;
+- текущий путь: log_* с аргументами в стиле %, отсечение по уровню одним
+  сравнением, запись через очередь в отдельном потоке.
+
+Время - только в вызывающем потоке (то, что добавляется к задержке приема).
+
+Запуск: python app/tests/bench_logging.py [--events 5000] [--users 20]
+"""
+
+import sys
+import os
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+
+# Добавляем каталог app в sys.path: модули проекта импортируют друг друга напрямую
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(current_dir)
+sys.path.insert(0, app_dir)
+
+import logger as app_logger
+from logger import (FileFormatter, TechnicalLogFilter, setup_logger, shutdown_logger,
+                    log_info, log_debug, log_smtp)
+
+BODY = ("19.10.2026 08:01:02 Доступ разрешен, режим:Вход, Считыватель:Проходная 1, "
+        "Сотрудник:Иванов Иван Иванович") * 3
+EMPLOYEE = 'Иванов Иван Иванович'
+
+
+def legacy_event(loggers, users):
+    """Прежние вызовы: f-строки и logger.info/debug без проверки уровня"""
+    smtp, events, telegram = loggers
+    smtp.info("📧 Получено новое email сообщение")
+    smtp.debug("DEBUG: Начало обработки SMTP сообщения")
+    smtp.info(f"👤 Обработка события: {EMPLOYEE}")
+    smtp.debug(f"📧 Полное содержимое email: {BODY}")
+    events.info(f"✅ Событие добавлено: {EMPLOYEE} - Вход в 2026-10-19 08:01:02")
+    events.info(f"💾 Событие сохранено в базу данных: {EMPLOYEE} - Вход")
+    smtp.debug("DEBUG: Подготовка к отправке в Telegram")
+    telegram.info(f"Отправка сообщения {len(users)} авторизованным пользователям")
+    telegram.debug(f"📋 Список авторизованных пользователей: {users}")
+    for user_id in users:
+        telegram.info(f"Сообщение поставлено в очередь для пользователя {user_id}")
+
+
+def current_event(users):
+    """Текущие вызовы: аргументы в стиле %"""
+    log_smtp("📧 Получено новое email сообщение")
+    log_debug("DEBUG: Начало обработки SMTP сообщения", module='SMTP')
+    log_smtp("👤 Обработка события: %s", EMPLOYEE)
+    log_debug("📧 Полное содержимое email: %s", BODY, module='SMTP')
+    log_info("✅ Событие добавлено: %s - %s в %s", EMPLOYEE, 'Вход', '2026-10-19 08:01:02', module='EventsDatabase')
+    log_info("💾 Событие сохранено в базу данных: %s - %s", EMPLOYEE, 'Вход', module='EventsDatabase')
+    log_debug("DEBUG: Подготовка к отправке в Telegram", module='SMTP')
+    log_info("Отправка сообщения %d авторизованным пользователям", len(users), module='Telegram')
+    log_debug("📋 Список авторизованных пользователей: %s", users, module='Telegram')
+    for user_id in users:
+        log_info("Сообщение поставлено в очередь для пользователя %s", user_id, module='Telegram')
+
+
+def setup_legacy(level, log_dir):
+    """Прежняя схема: синхронные обработчики на корневом логгере"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.setLevel(level)
+    fmt = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+    handlers = [logging.StreamHandler(), logging.FileHandler(os.path.join(log_dir, 'legacy.log'), encoding='utf-8')]
+    for handler in handlers:
+        handler.setFormatter(FileFormatter(fmt))
+        handler.addFilter(TechnicalLogFilter(debug_mode=(level == logging.DEBUG)))
+        root.addHandler(handler)
+    loggers = []
+    for name in ('SMTP', 'EventsDatabase', 'Telegram'):
+        module_logger = logging.getLogger(name)
+        # Прежний get_logger выставлял DEBUG каждому логгеру модуля
+        module_logger.setLevel(logging.DEBUG)
+        loggers.append(module_logger)
+    return loggers, handlers
+
+
+def teardown_legacy(loggers, handlers):
+    root = logging.getLogger()
+    for handler in handlers:
+        root.removeHandler(handler)
+        handler.close()
+    for module_logger in loggers:
+        module_logger.setLevel(logging.NOTSET)
+
+
+def measure(func, events):
+    started = time.perf_counter()
+    for _ in range(events):
+        func()
+    return (time.perf_counter() - started) / events * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер затрат на логирование события')
+    parser.add_argument('--events', type=int, default=5000, help='количество событий')
+    parser.add_argument('--users', type=int, default=20, help='получателей события')
+    args = parser.parse_args()
+    users = list(range(100000, 100000 + args.users))
+
+    temp_dir = tempfile.mkdtemp(prefix='logging_bench_')
+    # Консольный вывод обоих вариантов - в /dev/null, результаты - в stdout
+    saved_stderr = sys.stderr
+    try:
+        for level_name in ('INFO', 'WARNING'):
+            level = getattr(logging, level_name)
+            sys.stderr = open(os.devnull, 'w', encoding='utf-8')
+
+            loggers, handlers = setup_legacy(level, temp_dir)
+            legacy_us = measure(lambda: legacy_event(loggers, users), args.events)
+            teardown_legacy(loggers, handlers)
+
+            setup_logger(level_name, backup_days=1, queue_size=args.events * (args.users + 10),
+                         queue_policy='block', log_dir=temp_dir)
+            current_us = measure(lambda: current_event(users), args.events)
+            drain_started = time.perf_counter()
+            dropped = app_logger.get_logging_metrics()['dropped']
+            shutdown_logger()
+            drain_ms = (time.perf_counter() - drain_started) * 1000
+
+            sys.stderr.close()
+            sys.stderr = saved_stderr
+            print(f"📊 {level_name}, {args.users} получателей: прежний путь {legacy_us:7.1f} мкс/событие, "
+                  f"текущий {current_us:6.1f} мкс/событие ({legacy_us / current_us:.1f}x); "
+                  f"дозапись очереди {drain_ms:.0f} мс, потеряно {dropped}")
+    finally:
+        if sys.stderr is not saved_stderr:
+            sys.stderr.close()
+            sys.stderr = saved_stderr
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Замер размера HTML-отчета за 1, 3 и 6 месяцев
+
+Сравниваются:
+- прежний формат: полный inline SVG в каждой строке, шаблон без минификации;
+- текущий формат: иконки через <symbol>/<use>, минифицированный шаблон;
+- текущий формат, упакованный в gzip и zip.
+
+Запуск: python app/tests/bench_report_size.py [--missing-exit 0.02]
+"""
+
+import sys
+import os
+import random
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+# Добавляем каталог app в sys.path: report_generator импортирует соседние модули напрямую
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(current_dir)
+sys.path.insert(0, app_dir)
+
+import report_generator
+from report_generator import CompiledTemplate, TEMPLATE_PATH, generate_html_report, pack_report
+
+# Прежние inline-иконки строк отчета
+LEGACY_ICONS = {
+    'CALENDAR_ICON': "<svg viewBox='0 0 24 24' fill='none' xmlns='http://www.w3.org/2000/svg'><path d='M19 3H5C3.89 3 3 3.89 3 5V19C3 20.11 3.89 21 5 21H19C20.11 21 21 20.11 21 19V5C21 3.89 20.11 3 19 3M19 19H5V9H19V19M19 7H5V5H19V7Z' fill='currentColor'/></svg>",
+    'IN_ICON': "<svg width='16' height='16' viewBox='0 0 24 24' fill='none' xmlns='http://www.w3.org/2000/svg'><path d='M8.59 16.59L13.17 12L8.59 7.41L10 6L16 12L10 18L8.59 16.59Z' fill='currentColor'/></svg>",
+    'OUT_ICON': "<svg width='16' height='16' viewBox='0 0 24 24' fill='none' xmlns='http://www.w3.org/2000/svg'><path d='M15.41 16.59L10.83 12L15.41 7.41L14 6L8 12L14 18L15.41 16.59Z' fill='currentColor'/></svg>",
+    'NO_EXIT_ICON': "<svg width='16' height='16' viewBox='0 0 24 24' fill='none' xmlns='http://www.w3.org/2000/svg'><path d='M12 2C6.48 2 2 6.48 2 12C2 17.52 6.48 22 12 22C17.52 22 22 17.52 22 12C22 6.48 17.52 2 12 2M12 20C7.59 20 4 16.41 4 12C4 7.59 7.59 4 12 4C16.41 4 20 7.59 20 12C20 16.41 16.41 20 12 20M12 6C10.9 6 10 6.9 10 8C10 9.1 10.9 10 12 10C13.1 10 14 9.1 14 8C14 6.9 13.1 6 12 6M12 12C10.9 12 10 12.9 10 14C10 15.1 10.9 16 12 16C13.1 16 14 15.1 14 14C14 12.9 13.1 12 12 12Z' fill='currentColor'/></svg>"
+}
+
+
+def employee_events(days, missing_exit_rate):
+    """События сотрудника за days дней: вход утром, выход вечером, иногда без выхода"""
+    events = []
+    start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    for offset in range(days):
+        current = start + timedelta(days=offset)
+        if current.weekday() >= 5:
+            continue
+        entry = current + timedelta(hours=8, minutes=random.randint(0, 60))
+        events.append({'direction': 'Вход', 'event_timestamp': entry.strftime('%Y-%m-%d %H:%M:%S')})
+        # Обеденный выход и возврат
+        if random.random() < 0.5:
+            lunch = entry + timedelta(hours=4, minutes=random.randint(0, 30))
+            events.append({'direction': 'Выход', 'event_timestamp': lunch.strftime('%Y-%m-%d %H:%M:%S')})
+            events.append({'direction': 'Вход', 'event_timestamp': (lunch + timedelta(minutes=40)).strftime('%Y-%m-%d %H:%M:%S')})
+        if random.random() >= missing_exit_rate:
+            exit_time = entry + timedelta(hours=9, minutes=random.randint(0, 60))
+            events.append({'direction': 'Выход', 'event_timestamp': exit_time.strftime('%Y-%m-%d %H:%M:%S')})
+    return events
+
+
+def render_legacy(events, days):
+    """Отчет в прежнем формате (inline SVG в каждой строке, шаблон как есть)"""
+    saved = {name: getattr(report_generator, name) for name in LEGACY_ICONS}
+    saved_rows = {name: getattr(report_generator, name) for name in ('IN_ROW_END', 'OUT_ROW_END', 'NO_EXIT_ROW')}
+    saved_template, saved_sprite = report_generator.report_template, report_generator.ICON_SPRITE
+    try:
+        for name, icon in LEGACY_ICONS.items():
+            setattr(report_generator, name, icon)
+        report_generator.IN_ROW_END = f"</span></td><td class='event-in'>{LEGACY_ICONS['IN_ICON']}Вход</td></tr>"
+        report_generator.OUT_ROW_END = f"</td><td class='event-out'>{LEGACY_ICONS['OUT_ICON']}Выход</td></tr>"
+        report_generator.NO_EXIT_ROW = f"<tr><td class='time'>-</td><td class='event-no-exit'>{LEGACY_ICONS['NO_EXIT_ICON']}Нет выхода</td></tr>"
+        report_generator.report_template = CompiledTemplate(TEMPLATE_PATH, minify=False)
+        report_generator.ICON_SPRITE = ''
+        return generate_html_report([dict(e) for e in events], 'Иванов Иван Иванович', days)
+    finally:
+        for name, value in list(saved.items()) + list(saved_rows.items()):
+            setattr(report_generator, name, value)
+        report_generator.report_template, report_generator.ICON_SPRITE = saved_template, saved_sprite
+
+
+def kb(size):
+    return f"{size / 1024:7.1f} КБ"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер размера HTML-отчета')
+    parser.add_argument('--missing-exit', type=float, default=0.02, help='доля дней без выхода')
+    parser.add_argument('--seed', type=int, default=1, help='зерно генератора случайных чисел')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    for days in (30, 90, 180):
+        events = employee_events(days, args.missing_exit)
+        legacy = render_legacy(events, days).encode('utf-8')
+        started = time.perf_counter()
+        html_content = generate_html_report([dict(e) for e in events], 'Иванов Иван Иванович', days)
+        render_time = (time.perf_counter() - started) * 1000
+        compact = html_content.encode('utf-8')
+        gzipped = pack_report(html_content, 'report.html', 'gzip')[0].getvalue()
+        zipped = pack_report(html_content, 'report.html', 'zip')[0].getvalue()
+
+        print(f"📊 {days} дней, {len(events)} событий (формирование {render_time:.1f} мс)")
+        print(f"   прежний формат: {kb(len(legacy))}")
+        print(f"   symbol/use + минификация: {kb(len(compact))} ({len(compact) / len(legacy):.0%} от прежнего)")
+        print(f"   gzip: {kb(len(gzipped))} ({len(gzipped) / len(legacy):.1%})")
+        print(f"   zip:  {kb(len(zipped))} ({len(zipped) / len(legacy):.1%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Проверка и замер сопоставления смен (app/shift_pairing.py)
+
+1. Случайные последовательности событий сравниваются с прежним алгоритмом
+   из generate_html_report - результаты должны совпадать полностью.
+2. Замер на 6 месяцах событий для 1000 сотрудников: прежний алгоритм
+   против однопроходного автомата.
+
+Запуск: python app/tests/bench_shift_pairing.py [--cases 2000] [--employees 1000]
+"""
+
+import sys
+import os
+import random
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+# Добавляем корень проекта в sys.path для работы с модулями проекта
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+project_root = os.path.dirname(parent_dir)
+sys.path.insert(0, project_root)
+
+from app.shift_pairing import pair_shifts
+
+
+def legacy_pair_shifts(events_sorted, today):
+    """Прежний алгоритм из generate_html_report (O(n²) при пропущенных выходах)"""
+    yesterday = today - timedelta(days=1)
+    pairs = []
+    incomplete_shifts = []
+    i = 0
+    n = len(events_sorted)
+    while i < n:
+        ev = events_sorted[i]
+        if ev['direction'].lower() == 'вход':
+            entry = ev
+            entry_date = entry['ts_dt'].date()
+            exit_ev = None
+            for j in range(i+1, n):
+                if events_sorted[j]['direction'].lower() == 'выход':
+                    exit_ev = events_sorted[j]
+                    break
+            if exit_ev:
+                pairs.append((entry, exit_ev))
+                i = events_sorted.index(exit_ev, i+1) + 1
+            else:
+                if entry_date >= yesterday:
+                    i += 1
+                else:
+                    incomplete_shifts.append((entry, None))
+                    i += 1
+        else:
+            i += 1
+    return pairs, incomplete_shifts
+
+
+def random_events(count, start, span_days):
+    """Случайная последовательность событий: входы, выходы, повторы и посторонние режимы"""
+    directions = ['вход', 'выход', 'Вход', 'ВЫХОД', 'проход']
+    weights = [45, 40, 5, 5, 5]
+    events = []
+    for event_id in range(count):
+        ts = start + timedelta(seconds=random.randint(0, span_days * 86400))
+        events.append({'id': event_id, 'direction': random.choices(directions, weights)[0], 'ts_dt': ts})
+    events.sort(key=lambda e: e['ts_dt'])
+    return events
+
+
+def check_equivalence(cases):
+    """Сравнение с прежним алгоритмом на случайных данных"""
+    today = date.today()
+    for case in range(cases):
+        span = random.randint(1, 10)
+        start = datetime.combine(today - timedelta(days=span), datetime.min.time())
+        events = random_events(random.randint(0, 40), start, span + 1)
+        expected = legacy_pair_shifts(events, today)
+        actual = pair_shifts(events, today=today)
+        if expected != actual:
+            print(f"❌ Расхождение в случае {case}:")
+            for event in events:
+                print(f"   {event['ts_dt']} {event['direction']}")
+            return False
+    print(f"✅ {cases} случайных последовательностей совпали с прежним алгоритмом")
+    return True
+
+
+def employee_events(days, missing_exit_rate, exit_outage_days=0):
+    """События одного сотрудника за days дней (иногда без выхода; последние exit_outage_days дней - без выходов)"""
+    events = []
+    day = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    for offset in range(days):
+        current = day + timedelta(days=offset)
+        if current.weekday() >= 5:
+            continue
+        entry = current + timedelta(hours=8, minutes=random.randint(0, 60))
+        events.append({'direction': 'вход', 'ts_dt': entry})
+        if offset < days - exit_outage_days and random.random() >= missing_exit_rate:
+            events.append({'direction': 'выход', 'ts_dt': entry + timedelta(hours=9, minutes=random.randint(0, 60))})
+    for event_id, event in enumerate(events):
+        event['id'] = event_id
+    return events
+
+
+def benchmark(employees, days, missing_exit_rate, exit_outage_days=0):
+    today = date.today()
+    data = [employee_events(days, missing_exit_rate, exit_outage_days) for _ in range(employees)]
+    total = sum(len(events) for events in data)
+    print(f"📊 {employees} сотрудников × {days} дней = {total} событий, без выхода {missing_exit_rate:.0%}, "
+          f"последние {exit_outage_days} дней без выходов")
+
+    started = time.perf_counter()
+    for events in data:
+        legacy_pair_shifts(events, today)
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for events in data:
+        pair_shifts(events, today=today)
+    new_time = time.perf_counter() - started
+
+    print(f"   прежний алгоритм: {legacy_time:.2f} сек")
+    print(f"   однопроходный:    {new_time:.2f} сек (в {legacy_time / new_time:.1f} раз быстрее)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка и замер сопоставления смен')
+    parser.add_argument('--cases', type=int, default=2000, help='количество случайных последовательностей')
+    parser.add_argument('--employees', type=int, default=1000, help='количество сотрудников для замера')
+    parser.add_argument('--days', type=int, default=180, help='длина периода в днях')
+    parser.add_argument('--seed', type=int, default=None, help='зерно генератора случайных чисел')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    if not check_equivalence(args.cases):
+        sys.exit(1)
+    benchmark(args.employees, args.days, 0.02)
+    # Длинный хвост без выходов (например, сломан считыватель) - худший случай для прежнего алгоритма
+    benchmark(args.employees, args.days, 0.02, exit_outage_days=90)
+
+
+if __name__ == '__main__':
+    main()
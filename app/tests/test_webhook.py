@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Проверка приема обновлений через webhook (app/webhook.py) с локальным
+поддельным Bot API на aiohttp
+
+1. set_webhook: поддельный API сначала отвечает 429 с retry_after, затем
+   ошибкой 500 без JSON - регистрация повторяется и завершается успешно
+   с переданными url и secret_token.
+2. WebhookServer: после setWebhook поддельный API сам отправляет обновление
+   на зарегистрированный адрес с секретом - обновление передается
+   обработчику; неверный или отсутствующий секрет - 401, неизвестный бот -
+   404, тело не JSON - 400, во всех этих случаях обработчик не вызывается.
+
+Запуск: python app/tests/test_webhook.py
+"""
+
+import sys
+import os
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+
+# Добавляем каталог app в sys.path: модули проекта импортируют друг друга напрямую
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(current_dir)
+sys.path.insert(0, app_dir)
+
+from telegram_client import AsyncTelegramClient
+from webhook import SECRET_HEADER, WebhookServer, set_webhook
+
+HOST = '127.0.0.1'
+TOKEN = '123456:TEST'
+BOT_ID = '123456'
+SECRET = 'webhook-secret'
+UPDATE = {'update_id': 1001, 'message': {'message_id': 1, 'chat': {'id': 42, 'type': 'private'}, 'text': '/start'}}
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+class FakeBotAPI:
+    """Поддельный Bot API: ответы на setWebhook по сценарию, после успеха - доставка обновления"""
+
+    def __init__(self):
+        # Ответы на попытки setWebhook по порядку: (HTTP статус, тело)
+        self.set_webhook_responses = [
+            (429, json.dumps({'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                              'parameters': {'retry_after': 1}})),
+            (500, '<html>Internal Server Error</html>'),
+        ]
+        self.calls = []
+        self.delivered = None
+        self._runner = None
+
+    async def start(self, port):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, HOST, port).start()
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _handle(self, request):
+        params = await request.json()
+        method = request.match_info['method']
+        self.calls.append((request.match_info['token'], method, params))
+        if method != 'setWebhook':
+            return web.json_response({'ok': True, 'result': True})
+        if self.set_webhook_responses:
+            status, body = self.set_webhook_responses.pop(0)
+            return web.Response(status=status, text=body)
+        # Как настоящий Telegram: обновления идут на url с заголовком секрета
+        asyncio.get_running_loop().create_task(self._deliver(params['url'], params['secret_token']))
+        return web.json_response({'ok': True, 'result': True, 'description': 'Webhook was set'})
+
+    async def _deliver(self, url, secret_token):
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=UPDATE, headers={SECRET_HEADER: secret_token}) as response:
+                self.delivered = response.status
+
+
+class Checks:
+    def __init__(self):
+        self.failed = 0
+
+    def expect(self, name, actual, expected):
+        if actual == expected:
+            print(f"✅ {name}")
+        else:
+            self.failed += 1
+            print(f"❌ {name}: получено {actual!r}, ожидалось {expected!r}")
+
+
+async def run(checks):
+    api_port, webhook_port = free_port(), free_port()
+    api = FakeBotAPI()
+    await api.start(api_port)
+
+    received = []
+    server = WebhookServer(HOST, webhook_port, '/telegram', SECRET)
+    path = server.add_bot(BOT_ID, received.extend)
+    await server.start()
+    url = f"http://{HOST}:{webhook_port}{path}"
+
+    client = AsyncTelegramClient(TOKEN, api_url=f"http://{HOST}:{api_port}")
+    await client.start()
+    try:
+        # 1. Регистрация webhook с повторами
+        started = time.monotonic()
+        result = await asyncio.wait_for(set_webhook(client, url, SECRET, threading.Event()), timeout=20)
+        attempts = [params for token, method, params in api.calls if method == 'setWebhook']
+        checks.expect("setWebhook успешен после 429 и 500", result, True)
+        checks.expect("setWebhook: три попытки", len(attempts), 3)
+        checks.expect("setWebhook: url и secret_token переданы",
+                      (attempts[-1].get('url'), attempts[-1].get('secret_token')), (url, SECRET))
+        checks.expect("setWebhook: повтор по retry_after, а не через 5 сек", time.monotonic() - started < 5, True)
+
+        # 2. Обновление от поддельного Telegram с верным секретом
+        for _ in range(50):
+            if api.delivered is not None:
+                break
+            await asyncio.sleep(0.1)
+        checks.expect("верный секрет: ответ 200", api.delivered, 200)
+        checks.expect("верный секрет: обновление передано обработчику", received, [UPDATE])
+
+        # 3. Отклоняемые запросы
+        received.clear()
+        async with aiohttp.ClientSession() as session:
+            cases = [
+                ("неверный секрет: 401", url, {SECRET_HEADER: 'wrong'}, json.dumps(UPDATE), 401),
+                ("без секрета: 401", url, {}, json.dumps(UPDATE), 401),
+                ("неизвестный бот: 404", f"http://{HOST}:{webhook_port}/telegram/999", {SECRET_HEADER: SECRET},
+                 json.dumps(UPDATE), 404),
+                ("тело не JSON: 400", url, {SECRET_HEADER: SECRET}, 'not json', 400),
+            ]
+            for name, target, headers, body, expected in cases:
+                async with session.post(target, data=body, headers=headers) as response:
+                    checks.expect(name, response.status, expected)
+        checks.expect("отклоненные запросы не переданы обработчику", received, [])
+        checks.expect("счетчики сервера (принято, отклонено)", (server.received, server.rejected), (1, 2))
+    finally:
+        await client.close()
+        await server.stop()
+        await api.stop()
+
+
+def main():
+    checks = Checks()
+    asyncio.run(run(checks))
+    if checks.failed:
+        print(f"❌ Проверок не пройдено: {checks.failed}")
+        sys.exit(1)
+    print("✅ Все проверки webhook пройдены")
+
+
+if __name__ == '__main__':
+    main()
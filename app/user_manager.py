@@ -2,42 +2,39 @@
 Модуль управления пользователями и фильтрами с использованием SQLite
 """
 
-import os
 from typing import Set, Dict, Optional, List, Tuple, Any
 from datetime import datetime
 
-# Простые функции логирования для Windows
-def log_info(message: str, module: str = 'UserManager') -> None:
-    print(f"[INFO] {module}: {message}")
+from logger import log_info, log_warning, log_error
 
-def log_warning(message: str, module: str = 'UserManager') -> None:
-    print(f"[WARNING] {module}: {message}")
 
-def log_error(message: str, module: str = 'UserManager') -> None:
-    print(f"[ERROR] {module}: {message}")
+# Классы ошибок доставки, при которых чат может быть приостановлен
+SUSPENDABLE_ERROR_CLASSES = ('blocked', 'deactivated', 'chat_not_found', 'forbidden', 'bad_request')
 
-# Пытаемся получить логгер только для Unix систем
-logger = None
-if os.name != 'nt':  # Не Windows
-    try:
-        from logger import get_logger
-        logger = get_logger('UserManager')
-        # Переопределяем функции если логгер доступен
-        def log_info(message: str, module: str = 'UserManager') -> None:
-            logger.info(message)
-        def log_warning(message: str, module: str = 'UserManager') -> None:
-            logger.warning(message)
-        def log_error(message: str, module: str = 'UserManager') -> None:
-            logger.error(message)
-    except ImportError:
-        pass  # Используем простые функции
+
+def classify_delivery_error(error_code: int, description: str) -> Optional[str]:
+    """Определение класса ошибки доставки по ответу Telegram API"""
+    text = (description or '').lower()
+    if error_code == 403:
+        if 'blocked' in text:
+            return 'blocked'
+        if 'deactivated' in text:
+            return 'deactivated'
+        return 'forbidden'
+    if error_code == 400:
+        if 'chat not found' in text:
+            return 'chat_not_found'
+        return 'bad_request'
+    # Остальные ошибки временные и не приводят к приостановке
+    return None
 
 
 class UserManager:
     """Менеджер пользователей и фильтров с SQLite"""
     
-    def __init__(self, db_manager: Any):
+    def __init__(self, db_manager: Any, suspend_after_failures: int = 3):
         self.db_manager = db_manager
+        self.suspend_after_failures = suspend_after_failures
         # База данных будет инициализирована через DatabaseManager
     
     def get_authorized_users(self) -> Set[int]:
@@ -53,6 +50,22 @@ class UserManager:
             log_error(f"Ошибка чтения авторизованных пользователей: {e}", module='UserManager')
             return set()
     
+    def get_active_users(self) -> Set[int]:
+        """Получение авторизованных пользователей, доставка которым не приостановлена"""
+        try:
+            cursor = self.db_manager.execute_query("""
+                SELECT user_id FROM authorized_users
+                WHERE user_id NOT IN (SELECT user_id FROM suspended_chats)
+            """)
+            if cursor:
+                users = {row[0] for row in cursor.fetchall()}
+                cursor.connection.close()
+                return users
+            return set()
+        except Exception as e:
+            log_error(f"Ошибка чтения активных пользователей: {e}", module='UserManager')
+            return set()
+    
     def add_authorized_user(self, user_id: int, username: Optional[str] = None, 
                            first_name: Optional[str] = None, last_name: Optional[str] = None, 
                            added_by: Optional[int] = None) -> bool:
@@ -85,6 +98,10 @@ class UserManager:
         try:
             queries = [
                 ("DELETE FROM user_filters WHERE user_id = ?", (user_id,)),
+                ("DELETE FROM user_digest WHERE user_id = ?", (user_id,)),
+                ("DELETE FROM delivery_failures WHERE user_id = ?", (user_id,)),
+                ("DELETE FROM suspended_chats WHERE user_id = ?", (user_id,)),
+                ("DELETE FROM user_bots WHERE user_id = ?", (user_id,)),
                 ("DELETE FROM authorized_users WHERE user_id = ?", (user_id,))
             ]
             
@@ -327,6 +344,209 @@ class UserManager:
         filters = self.get_user_filters()
         return filters.get(user_id)
     
+    def get_user_digest_windows(self) -> Dict[int, int]:
+        """Получение окон дайджеста пользователей (в секундах)"""
+        try:
+            cursor = self.db_manager.execute_query("SELECT user_id, window_seconds FROM user_digest")
+            
+            windows = {}
+            if cursor:
+                for row in cursor.fetchall():
+                    windows[row[0]] = row[1]
+                cursor.connection.close()
+            return windows
+        except Exception as e:
+            log_error(f"Ошибка чтения настроек дайджеста: {e}", module='UserManager')
+            return {}
+    
+    def get_user_digest(self, user_id: int) -> Optional[int]:
+        """Получение окна дайджеста пользователя"""
+        return self.get_user_digest_windows().get(user_id)
+    
+    def set_user_digest(self, user_id: int, window_seconds: int) -> bool:
+        """Включение режима дайджеста для пользователя"""
+        try:
+            if not self.is_authorized(user_id):
+                log_warning(f"Попытка включить дайджест для неавторизованного пользователя {user_id}", module='UserManager')
+                return False
+            
+            cursor = self.db_manager.execute_query("""
+                INSERT OR REPLACE INTO user_digest (user_id, window_seconds, created_at)
+                VALUES (?, ?, ?)
+            """, (user_id, window_seconds, datetime.now()))
+            
+            if cursor:
+                cursor.connection.commit()
+                cursor.connection.close()
+                log_info(f"Дайджест ({window_seconds} сек) включен для пользователя {user_id}", module='UserManager')
+                return True
+            return False
+        except Exception as e:
+            log_error(f"Ошибка включения дайджеста: {e}", module='UserManager')
+            return False
+    
+    def remove_user_digest(self, user_id: int) -> bool:
+        """Отключение режима дайджеста пользователя"""
+        try:
+            cursor = self.db_manager.execute_query("DELETE FROM user_digest WHERE user_id = ?", (user_id,))
+            
+            if cursor:
+                success = cursor.rowcount > 0
+                cursor.connection.commit()
+                cursor.connection.close()
+                
+                if success:
+                    log_info(f"Дайджест отключен для пользователя {user_id}", module='UserManager')
+                return success
+            return False
+        except Exception as e:
+            log_error(f"Ошибка отключения дайджеста: {e}", module='UserManager')
+            return False
+    
+    def get_bot_assignments(self) -> Dict[int, str]:
+        """Получение закрепленных за пользователями ботов (user_id -> bot_id)"""
+        try:
+            cursor = self.db_manager.execute_query("SELECT user_id, bot_id FROM user_bots")
+            
+            assignments = {}
+            if cursor:
+                for row in cursor.fetchall():
+                    assignments[row[0]] = row[1]
+                cursor.connection.close()
+            return assignments
+        except Exception as e:
+            log_error(f"Ошибка чтения привязки пользователей к ботам: {e}", module='UserManager')
+            return {}
+    
+    def set_bot_assignment(self, user_id: int, bot_id: str) -> bool:
+        """Закрепление пользователя за ботом"""
+        try:
+            cursor = self.db_manager.execute_query("""
+                INSERT OR REPLACE INTO user_bots (user_id, bot_id, assigned_at)
+                VALUES (?, ?, ?)
+            """, (user_id, bot_id, datetime.now()))
+            
+            if cursor:
+                cursor.connection.commit()
+                cursor.connection.close()
+                return True
+            return False
+        except Exception as e:
+            log_error(f"Ошибка привязки пользователя к боту: {e}", module='UserManager')
+            return False
+    
+    def get_suspended_users(self) -> Set[int]:
+        """Получение пользователей с приостановленной доставкой"""
+        try:
+            cursor = self.db_manager.execute_query("SELECT user_id FROM suspended_chats")
+            if cursor:
+                users = {row[0] for row in cursor.fetchall()}
+                cursor.connection.close()
+                return users
+            return set()
+        except Exception as e:
+            log_error(f"Ошибка чтения приостановленных чатов: {e}", module='UserManager')
+            return set()
+    
+    def is_suspended(self, user_id: int) -> bool:
+        """Проверка, приостановлена ли доставка пользователю"""
+        return user_id in self.get_suspended_users()
+    
+    def get_users_with_delivery_failures(self) -> Set[int]:
+        """Получение пользователей, у которых есть незакрытые ошибки доставки"""
+        try:
+            cursor = self.db_manager.execute_query("SELECT DISTINCT user_id FROM delivery_failures")
+            if cursor:
+                users = {row[0] for row in cursor.fetchall()}
+                cursor.connection.close()
+                return users
+            return set()
+        except Exception as e:
+            log_error(f"Ошибка чтения ошибок доставки: {e}", module='UserManager')
+            return set()
+    
+    def record_delivery_failure(self, user_id: int, error_class: str, description: str = "") -> bool:
+        """Учет ошибки доставки. Возвращает True, если чат только что приостановлен"""
+        try:
+            cursor = self.db_manager.execute_query("""
+                INSERT INTO delivery_failures (user_id, error_class, failure_count, last_error, last_failure_at)
+                VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT(user_id, error_class) DO UPDATE SET
+                    failure_count = failure_count + 1,
+                    last_error = excluded.last_error,
+                    last_failure_at = excluded.last_failure_at
+            """, (user_id, error_class, description, datetime.now()))
+            if not cursor:
+                return False
+            cursor.connection.commit()
+            cursor.connection.close()
+            
+            cursor = self.db_manager.execute_query("""
+                SELECT failure_count FROM delivery_failures WHERE user_id = ? AND error_class = ?
+            """, (user_id, error_class))
+            if not cursor:
+                return False
+            row = cursor.fetchone()
+            cursor.connection.close()
+            failure_count = row[0] if row else 0
+            
+            log_warning(f"Ошибка доставки пользователю {user_id} ({error_class}): {failure_count}/{self.suspend_after_failures}", module='UserManager')
+            if error_class in SUSPENDABLE_ERROR_CLASSES and failure_count >= self.suspend_after_failures:
+                return self.suspend_user(user_id, error_class, description)
+            return False
+        except Exception as e:
+            log_error(f"Ошибка учета неудачной доставки: {e}", module='UserManager')
+            return False
+    
+    def reset_delivery_failures(self, user_id: int) -> None:
+        """Сброс счетчиков ошибок после успешной доставки"""
+        try:
+            cursor = self.db_manager.execute_query("DELETE FROM delivery_failures WHERE user_id = ?", (user_id,))
+            if cursor:
+                cursor.connection.commit()
+                cursor.connection.close()
+        except Exception as e:
+            log_error(f"Ошибка сброса счетчиков доставки: {e}", module='UserManager')
+    
+    def suspend_user(self, user_id: int, error_class: str, reason: str = "") -> bool:
+        """Приостановка доставки пользователю. Возвращает True, если чат не был приостановлен ранее"""
+        try:
+            cursor = self.db_manager.execute_query("""
+                INSERT OR IGNORE INTO suspended_chats (user_id, error_class, reason, suspended_at)
+                VALUES (?, ?, ?, ?)
+            """, (user_id, error_class, reason, datetime.now()))
+            
+            if cursor:
+                suspended = cursor.rowcount > 0
+                cursor.connection.commit()
+                cursor.connection.close()
+                if suspended:
+                    log_warning(f"⏸ Доставка пользователю {user_id} приостановлена ({error_class})", module='UserManager')
+                return suspended
+            return False
+        except Exception as e:
+            log_error(f"Ошибка приостановки доставки: {e}", module='UserManager')
+            return False
+    
+    def reactivate_user(self, user_id: int) -> bool:
+        """Возобновление доставки пользователю. Возвращает True, если чат был приостановлен"""
+        try:
+            queries = [
+                ("DELETE FROM delivery_failures WHERE user_id = ?", (user_id,)),
+                ("DELETE FROM suspended_chats WHERE user_id = ?", (user_id,))
+            ]
+            if not self.is_suspended(user_id):
+                self.db_manager.execute_transaction(queries[:1])
+                return False
+            
+            success = self.db_manager.execute_transaction(queries)
+            if success:
+                log_info(f"▶️ Доставка пользователю {user_id} возобновлена", module='UserManager')
+            return success
+        except Exception as e:
+            log_error(f"Ошибка возобновления доставки: {e}", module='UserManager')
+            return False
+    
     def should_send_message(self, user_id: int, message_text: str) -> bool:
         """Проверка, нужно ли отправлять сообщение пользователю"""
         if not self.is_authorized(user_id):
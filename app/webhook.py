@@ -0,0 +1,113 @@
+"""
+Прием обновлений Telegram через webhook (локальный HTTP сервер aiohttp)
+
+Сервер слушает локальный адрес за обратным прокси. Каждый бот пула получает
+свой путь `/<префикс>/<bot_id>`, подлинность запросов проверяется по заголовку
+X-Telegram-Bot-Api-Secret-Token. Обновления передаются обработчикам сразу,
+без задержки long polling.
+"""
+
+import asyncio
+import hmac
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from logger import log_info, log_warning, log_error, log_debug
+from telegram_client import AsyncTelegramClient, TelegramAPIError
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """HTTP сервер, принимающий обновления для нескольких ботов"""
+
+    def __init__(self, listen_host: str, listen_port: int, path: str, secret_token: str):
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.path = '/' + path.strip('/')
+        self.secret_token = secret_token
+        self._handlers: Dict[str, Callable[[List[Dict[str, Any]]], None]] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.received = 0
+        self.rejected = 0
+
+    def add_bot(self, bot_id: str, on_updates: Callable[[List[Dict[str, Any]]], None]) -> str:
+        """Регистрирует бота и возвращает его путь на сервере"""
+        self._handlers[bot_id] = on_updates
+        return f"{self.path}/{bot_id}"
+
+    async def start(self) -> None:
+        """Запускает сервер (вызывается внутри event loop)"""
+        app = web.Application()
+        app.router.add_post(self.path + '/{bot_id}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen_host, self.listen_port).start()
+        log_info(f"🌐 Webhook сервер слушает на {self.listen_host}:{self.listen_port}{self.path}", module='Webhook')
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        on_updates = self._handlers.get(request.match_info['bot_id'])
+        if on_updates is None:
+            return web.Response(status=404)
+        # Сравнение за постоянное время, чтобы не раскрывать секрет по таймингу
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret_token):
+            self.rejected += 1
+            log_warning(f"Отклонен запрос webhook без верного секрета от {request.remote}", module='Webhook')
+            return web.Response(status=401)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        self.received += 1
+        try:
+            on_updates([update])
+        except Exception as e:
+            # Telegram повторяет запрос при ошибке - отвечаем 200, чтобы не зациклить обновление
+            log_error(f"Ошибка обработки обновления webhook: {e}", module='Webhook')
+        return web.Response()
+
+
+async def set_webhook(client: AsyncTelegramClient, url: str, secret_token: str,
+                      stop_event: threading.Event) -> bool:
+    """Регистрирует webhook в Telegram, повторяя попытки с нарастающей задержкой"""
+    delay = 5  # стартовая задержка между попытками (сек)
+    while not stop_event.is_set():
+        try:
+            await client.call('setWebhook', {
+                'url': url,
+                'secret_token': secret_token,
+                'drop_pending_updates': True
+            })
+            log_info(f"✅ Webhook установлен: {url}", module='Webhook')
+            return True
+        except TelegramAPIError as e:
+            if e.retry_after:
+                delay = e.retry_after
+            log_warning(f"Ошибка установки webhook: {e}. Повтор через {delay} сек.", module='Webhook')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log_warning(f"Проблема с подключением к Telegram API: {e!r}. Повтор через {delay} сек.", module='Webhook')
+
+        # Короткие интервалы для быстрого реагирования на остановку
+        for _ in range(int(delay)):
+            if stop_event.is_set():
+                return False
+            await asyncio.sleep(1)
+        delay = min(delay * 2, 300)
+    return False
+
+
+async def delete_webhook(client: AsyncTelegramClient) -> None:
+    """Снимает webhook, чтобы снова работал getUpdates"""
+    try:
+        await client.call('deleteWebhook')
+        log_debug("Webhook снят", module='Webhook')
+    except Exception as e:
+        log_warning(f"Не удалось снять webhook: {e}", module='Webhook')